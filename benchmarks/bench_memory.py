@@ -0,0 +1,112 @@
+"""Memory benchmark for origin rules and compiled policies.
+
+Reports bytes per rule retained (traced by :mod:`tracemalloc`) by a sequence
+of :class:`OriginRule` objects and by the same sequence of compact
+:class:`FrozenOriginRule` tuples, and size of policy pickled with each of
+them, for policies with different number of rules and different mix of rule
+kinds. Compiled policy keeps rules in frozen form whatever it was built
+from, so it is measured once per case. Module level caches (parsed origins
+and compiled regular expressions) are cleared and warmed up before compiled
+policy is measured, so they are not counted in::
+
+    python benchmarks/bench_memory.py --rules 1000 100000 --mix str path
+"""
+
+import argparse
+import gc
+import pickle
+import re
+import tracemalloc
+
+from corslib.origin import canonical_origin, parse_origin
+from corslib.policy import OriginRule, Policy, RuleKind
+
+RULE_COUNTS = [1_000, 10_000, 100_000]
+MIXES = ["str", "path", "regex", "mixed"]
+
+
+def make_rule(kind, num):
+    if kind == "str":
+        return OriginRule(rule=f"https://app.tenant-{num}.example.com")
+    if kind == "path":
+        return OriginRule(
+            rule=f"https://*.tenant-{num}.example.com", kind=RuleKind.PATH
+        )
+    return OriginRule(
+        rule=rf"^https://[a-z]+\.tenant-{num}\.example\.com$", kind=RuleKind.REGEX
+    )
+
+
+def make_rules(mix, count):
+    kinds = ["str", "path", "regex"] if mix == "mixed" else [mix]
+    return [make_rule(kinds[num % len(kinds)], num) for num in range(count)]
+
+
+def reset_caches():
+    canonical_origin.cache_clear()
+    parse_origin.cache_clear()
+    re.purge()
+
+
+def retained(build):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        obj = build()
+        gc.collect()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return obj, size
+
+
+def cases(counts, mixes):
+    for mix in mixes:
+        for count in counts:
+            rules, rules_size = retained(lambda: make_rules(mix, count))
+            frozen, frozen_size = retained(
+                lambda: tuple(rule.frozen() for rule in make_rules(mix, count))
+            )
+            result = {
+                "name": f"{mix}/{count}",
+                "rules": rules_size / count,
+                "frozen": frozen_size / count,
+            }
+            for variant, items in [("rules", rules), ("frozen", frozen)]:
+                policy = Policy(name=f"{mix}-{count}", allow_origin=items)
+                if variant == "rules":
+                    reset_caches()
+                    policy.compile()
+                    _, compiled_size = retained(policy.compile)
+                    result["compiled"] = compiled_size / count
+                policy.compiled
+                pickled = len(pickle.dumps(policy, pickle.HIGHEST_PROTOCOL))
+                result[f"pickle_{variant}"] = pickled / count
+            yield result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "--rules",
+        type=int,
+        nargs="+",
+        default=RULE_COUNTS,
+        help="rule counts to benchmark",
+    )
+    parser.add_argument(
+        "--mix", nargs="+", choices=MIXES, default=MIXES, help="rule kind mixes"
+    )
+    args = parser.parse_args()
+    columns = ["rules", "frozen", "compiled", "pickle_rules", "pickle_frozen"]
+    print(f"{'case (B/rule)':<16}" + "".join(f"{name:>15}" for name in columns))
+    for result in cases(args.rules, args.mix):
+        print(
+            f"{result['name']:<16}"
+            + "".join(f"{result[name]:>15,.1f}" for name in columns),
+            flush=True,
+        )
+
+
+if __name__ == "__main__":
+    main()
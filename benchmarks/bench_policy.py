@@ -0,0 +1,193 @@
+"""Throughput benchmark for policy header generation.
+
+Measures :meth:`Policy.preflight_response_headers` and
+:meth:`Policy.response_headers` for policies with different number of rules
+and different mix of rule kinds, for origins that match the last rule
+(``hit``), match no rule (``miss``) and for ``null`` origin, with and without
+credentials. Reported are operations per second and number of bytes
+allocated per call (peak traced by :mod:`tracemalloc`).
+
+Results are written as JSON, run with ``--compare`` pointing to results of
+previous run to see relative change::
+
+    python benchmarks/bench_policy.py --output before.json
+    python benchmarks/bench_policy.py --output after.json --compare before.json
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+import timeit
+import tracemalloc
+
+import corslib
+from corslib.policy import OriginRule, Policy, RuleKind
+
+RULE_COUNTS = [1, 10, 100, 1_000, 10_000, 100_000]
+MIXES = ["str", "path", "regex", "mixed"]
+ORIGINS = ["hit", "miss", "null"]
+
+
+def make_rule(kind, num):
+    if kind == "str":
+        return OriginRule(rule=f"https://app.tenant-{num}.example.com")
+    if kind == "path":
+        return OriginRule(
+            rule=f"https://*.tenant-{num}.example.com", kind=RuleKind.PATH
+        )
+    return OriginRule(
+        rule=rf"^https://[a-z]+\.tenant-{num}\.example\.com$", kind=RuleKind.REGEX
+    )
+
+
+def make_policy(mix, count):
+    kinds = ["str", "path", "regex"] if mix == "mixed" else [mix]
+    rules = [make_rule(kinds[num % len(kinds)], num) for num in range(count)]
+    return Policy(name=f"{mix}-{count}", allow_credentials=True, allow_origin=rules)
+
+
+def make_origin(kind, count):
+    if kind == "hit":
+        return f"https://app.tenant-{count - 1}.example.com"
+    if kind == "miss":
+        return "https://app.unknown.example.com"
+    return "null"
+
+
+def ops_per_sec(func, min_time):
+    number = 1
+    while True:
+        elapsed = timeit.timeit(func, number=number)
+        if elapsed >= min_time:
+            return number / elapsed
+        number *= 2 if elapsed == 0 else max(2, int(min_time / elapsed))
+
+
+def alloc_per_call(func, calls=20):
+    func()
+    peaks = []
+    for _ in range(calls):
+        # restarted for each sample, tracemalloc.reset_peak needs Python 3.9
+        tracemalloc.start()
+        try:
+            func()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        peaks.append(peak)
+    return min(peaks)
+
+
+def cases(counts, mixes):
+    for mix in mixes:
+        for count in counts:
+            started = time.perf_counter()
+            policy = make_policy(mix, count)
+            policy.compiled
+            build = time.perf_counter() - started
+            for origin_kind in ORIGINS:
+                origin = make_origin(origin_kind, count)
+                for credentialed in (False, True):
+                    for method in ("preflight", "response"):
+                        if method == "preflight":
+
+                            def func(origin=origin, credentialed=credentialed):
+                                policy.preflight_response_headers(
+                                    origin,
+                                    request_credentials=credentialed,
+                                    request_method="PUT",
+                                    request_headers="X-Custom",
+                                )
+
+                        else:
+
+                            def func(origin=origin, credentialed=credentialed):
+                                policy.response_headers(
+                                    origin, request_credentials=credentialed
+                                )
+
+                        yield {
+                            "name": (
+                                f"{method}/{mix}/{count}/{origin_kind}"
+                                f"/{'cred' if credentialed else 'anon'}"
+                            ),
+                            "method": method,
+                            "mix": mix,
+                            "rules": count,
+                            "origin": origin_kind,
+                            "credentialed": credentialed,
+                            "build_seconds": build,
+                        }, func
+
+
+def run(counts, mixes, min_time):
+    results = []
+    for meta, func in cases(counts, mixes):
+        meta["ops_per_sec"] = ops_per_sec(func, min_time)
+        meta["alloc_bytes"] = alloc_per_call(func)
+        print(
+            f"{meta['name']:<40}{meta['ops_per_sec']:>14,.0f} ops/s"
+            f"{meta['alloc_bytes']:>8} B",
+            flush=True,
+        )
+        results.append(meta)
+    return results
+
+
+def compare(results, path):
+    with open(path) as fp:
+        previous = {r["name"]: r for r in json.load(fp)["results"]}
+    print(f"\n{'case':<40}{'previous':>14}{'current':>14}{'change':>9}")
+    for result in results:
+        old = previous.get(result["name"])
+        if old is None:
+            continue
+        change = result["ops_per_sec"] / old["ops_per_sec"] - 1
+        print(
+            f"{result['name']:<40}{old['ops_per_sec']:>14,.0f}"
+            f"{result['ops_per_sec']:>14,.0f}{change:>+9.1%}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "--rules",
+        type=int,
+        nargs="+",
+        default=RULE_COUNTS,
+        help="rule counts to benchmark",
+    )
+    parser.add_argument(
+        "--mix", nargs="+", choices=MIXES, default=MIXES, help="rule kind mixes"
+    )
+    parser.add_argument(
+        "--min-time",
+        type=float,
+        default=0.2,
+        help="minimum measurement time per case in seconds",
+    )
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="compare with results from this file")
+    args = parser.parse_args()
+    results = run(args.rules, args.mix, args.min_time)
+    if args.output:
+        data = {
+            "meta": {
+                "corslib": corslib.__version__,
+                "python": sys.version,
+                "platform": platform.platform(),
+                "timestamp": time.time(),
+            },
+            "results": results,
+        }
+        with open(args.output, "w") as fp:
+            json.dump(data, fp, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
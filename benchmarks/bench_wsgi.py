@@ -0,0 +1,65 @@
+"""Measure overhead of WSGI middleware compared with bare application.
+
+Run with ``python benchmarks/bench_wsgi.py``.
+"""
+
+import timeit
+
+from corslib.policy import OriginRule, Policy
+from corslib.wsgi import CORSMiddleware
+
+NUMBER = 100_000
+
+
+def app(environ, start_response):
+    start_response("200 OK", [("Content-Type", "text/plain")])
+    return [b"ok"]
+
+
+def start_response(status, headers, exc_info=None):
+    return None
+
+
+ENVIRONS = {
+    "no-origin": {"REQUEST_METHOD": "GET"},
+    "simple": {"REQUEST_METHOD": "GET", "HTTP_ORIGIN": "http://website.com"},
+    "credentialed": {
+        "REQUEST_METHOD": "GET",
+        "HTTP_ORIGIN": "http://website.com",
+        "HTTP_COOKIE": "session=x",
+    },
+    "denied": {"REQUEST_METHOD": "GET", "HTTP_ORIGIN": "http://other.com"},
+    "preflight": {
+        "REQUEST_METHOD": "OPTIONS",
+        "HTTP_ORIGIN": "http://website.com",
+        "HTTP_ACCESS_CONTROL_REQUEST_METHOD": "PUT",
+        "HTTP_ACCESS_CONTROL_REQUEST_HEADERS": "X-Custom",
+    },
+}
+
+
+def run(wrapped, environ):
+    def call():
+        wrapped(environ, start_response)
+
+    return min(timeit.repeat(call, number=NUMBER, repeat=5)) / NUMBER
+
+
+def main():
+    policy = Policy(
+        name="bench",
+        allow_credentials=True,
+        allow_origin=[OriginRule(rule="http://website.com")],
+        allow_methods=["GET", "PUT"],
+        cache_size=1024,
+    )
+    middleware = CORSMiddleware(app, policy)
+    print(f"{'case':<14}{'bare (us)':>12}{'wrapped (us)':>14}{'overhead (us)':>15}")
+    for name, environ in ENVIRONS.items():
+        bare = run(app, environ) * 1e6
+        wrapped = run(middleware, environ) * 1e6
+        print(f"{name:<14}{bare:>12.3f}{wrapped:>14.3f}{wrapped - bare:>15.3f}")
+
+
+if __name__ == "__main__":
+    main()
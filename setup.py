@@ -22,10 +22,12 @@ def find_version(*where):
 
 base_reqs = ['dataclasses ; python_version < "3.7"']
 
+toml_reqs = ['tomli ; python_version < "3.11"']
+
 test_reqs = [
     "pytest",
     "pytest-cov",
-]
+] + toml_reqs
 
 docs_reqs = [
     "Sphinx",
@@ -89,6 +91,12 @@ setup(
         "dev": dev_reqs,
         "test": test_reqs,
         "docs": docs_reqs,
+        "toml": toml_reqs,
     },
     python_requires="~=3.6",
+    entry_points={
+        "console_scripts": [
+            "corslib = corslib.cli:main",
+        ],
+    },
 )
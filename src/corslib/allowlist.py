@@ -0,0 +1,128 @@
+import mmap
+import os
+import struct
+import tempfile
+from typing import Any, Iterable, Iterator, Union
+
+from .origin import canonical_origin
+
+MAGIC = b"corslib-allowlist-1\n"
+_COUNT = struct.Struct("<Q")
+_OFFSET = struct.Struct("<Q")
+
+
+def write_allowlist(path: str, origins: Iterable[str]) -> int:
+    """Write exact-origin allowlist file.
+
+    File consists of header, table of offsets and sorted, deduplicated
+    UTF-8 encoded origins in canonical form (see
+    :func:`~corslib.origin.canonical_origin`). File is replaced atomically.
+
+    :param path: allowlist file path
+    :type path: str
+    :param origins: allowed origins
+    :type origins: Iterable[str]
+    :return: number of stored origins
+    :rtype: int
+    """
+    items = sorted({canonical_origin(origin).encode("utf-8") for origin in origins})
+    offsets = [0]
+    for item in items:
+        offsets.append(offsets[-1] + len(item))
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".corslib-")
+    try:
+        with os.fdopen(fd, "wb") as fp:
+            fp.write(MAGIC)
+            fp.write(_COUNT.pack(len(items)))
+            fp.write(struct.pack(f"<{len(offsets)}Q", *offsets))
+            fp.writelines(items)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return len(items)
+
+
+class MappedAllowlist:
+    """Read-only exact-origin allowlist backed by memory-mapped file.
+
+    Lookups are binary searches performed directly on mapped file, no
+    per-origin Python objects are created, so all processes that map the
+    same file share its memory through the page cache. File is created with
+    :func:`write_allowlist`.
+
+    Allowlist may be used as :attr:`~corslib.policy.Policy.origin_allowlist`.
+    Pickled allowlist is reopened from the same path when unpickled.
+
+    :param path: allowlist file path
+    :type path: str
+    :raises ValueError: if file is not a valid allowlist
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as fp:
+            st = os.fstat(fp.fileno())
+            self.identity = (st.st_ino, st.st_mtime_ns, st.st_size)
+            self._map = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[: len(MAGIC)] != MAGIC:
+            self._map.close()
+            raise ValueError(f"Not an allowlist file: {path}")
+        (self.count,) = _COUNT.unpack_from(self._map, len(MAGIC))
+        self._offsets = len(MAGIC) + _COUNT.size
+        self._data = self._offsets + (self.count + 1) * _OFFSET.size
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, MappedAllowlist):
+            return NotImplemented
+        return (self.path, self.identity) == (other.path, other.identity)
+
+    def __hash__(self) -> int:
+        return hash((self.path, self.identity))
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.path!r})"
+
+    def __reduce__(self):
+        return self.__class__, (self.path,)
+
+    def _item(self, index: int) -> bytes:
+        start, end = struct.unpack_from(
+            "<2Q", self._map, self._offsets + index * _OFFSET.size
+        )
+        start += self._data
+        end += self._data
+        return self._map[start:end]
+
+    def __contains__(self, origin: Union[str, bytes]) -> bool:
+        if isinstance(origin, str):
+            origin = origin.encode("utf-8")
+        low, high = 0, self.count
+        while low < high:
+            mid = (low + high) // 2
+            item = self._item(mid)
+            if item < origin:
+                low = mid + 1
+            elif item > origin:
+                high = mid
+            else:
+                return True
+        return False
+
+    def __iter__(self) -> Iterator[str]:
+        for index in range(self.count):
+            yield self._item(index).decode("utf-8")
+
+    def close(self) -> None:
+        """Unmap file."""
+        self._map.close()
+
+    def __enter__(self) -> "MappedAllowlist":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
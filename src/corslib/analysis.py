@@ -0,0 +1,273 @@
+import dataclasses
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from .matching import OriginMatcher, literal_affixes
+from .origin import DEFAULT_PORTS, canonical_origin, canonical_pattern
+from .policy import FrozenOriginRule, OriginRule, Policy, PolicyError, RuleKind
+
+DUPLICATE = "duplicate"
+SHADOWED = "shadowed"
+UNREACHABLE = "unreachable"
+
+_GLOB_META = "*?["
+
+
+class Finding(NamedTuple):
+    """Rule that never decides about any origin.
+
+    :ivar kind: :data:`DUPLICATE` (same as earlier rule), :data:`SHADOWED`
+                (exact origin matched by earlier rule) or :data:`UNREACHABLE`
+                (every origin it matches is matched by earlier rule)
+    :vartype kind: str
+    :ivar index: position of rule in policy rules
+    :vartype index: int
+    :ivar rule: redundant rule
+    :vartype rule: FrozenOriginRule
+    :ivar cause: position of earlier rule that covers it
+    :vartype cause: int
+    """
+
+    kind: str
+    index: int
+    rule: FrozenOriginRule
+    cause: int
+
+
+@dataclass
+class Analysis:
+    """Result of policy analysis.
+
+    :ivar policy: analyzed policy
+    :vartype policy: Policy
+    :ivar findings: redundant rules in order of declaration
+    :vartype findings: List[Finding]
+    """
+
+    policy: Policy
+    findings: List[Finding]
+
+    @property
+    def redundant(self) -> Set[int]:
+        """Positions of redundant rules.
+
+        :return: set of positions in policy rules
+        :rtype: Set[int]
+        """
+        return {finding.index for finding in self.findings}
+
+    def minimized(self) -> Policy:
+        """Build copy of policy without redundant rules.
+
+        :return: equivalent policy
+        :rtype: Policy
+        """
+        redundant = self.redundant
+        rules = tuple(
+            rule.frozen()
+            for index, rule in enumerate(self.policy.allow_origin or [])
+            if index not in redundant
+        )
+        return dataclasses.replace(self.policy, allow_origin=rules)
+
+
+def _glob_literal(rule: OriginRule) -> Optional[str]:
+    # glob without wildcards matches only origins equal to it in canonical form
+    pattern = canonical_pattern(rule.rule)
+    if any(c in pattern for c in _GLOB_META) or canonical_origin(pattern) != pattern:
+        return None
+    return pattern
+
+
+def _single_star(rule: OriginRule) -> Optional[Tuple[str, str]]:
+    pattern = canonical_pattern(rule.rule)
+    if pattern.count("*") != 1 or "?" in pattern or "[" in pattern:
+        return None
+    prefix, _, suffix = pattern.partition("*")
+    return prefix, suffix
+
+
+def analyze(policy: Policy) -> Analysis:
+    """Find rules of policy that never decide about any origin.
+
+    Origin is allowed if any rule matches it, so rule that matches only
+    origins matched by earlier rule may be removed without changing
+    decisions. Analysis finds:
+
+    * duplicates: rules of the same kind with the same canonical value as
+      earlier rule,
+    * shadowed rules: ``STR`` rules (and ``PATH`` rules without wildcards)
+      whose origin is matched by earlier rule,
+    * unreachable rules: ``PATH`` rules whose every origin is matched by
+      earlier ``PATH`` rule with single wildcard, eg.
+      ``https://*.api.example.com`` after ``https://*.example.com``.
+
+    Coverage of ``REGEX`` rules is not analyzed beyond duplicates, so
+    analysis may miss redundant rules, but never reports rule that decides
+    about some origin.
+
+    :param policy: analyzed policy
+    :type policy: Policy
+    :return: analysis result
+    :rtype: Analysis
+    """
+    rules = list(policy.allow_origin or [])
+    matcher = OriginMatcher(rules)
+    seen: Dict[Tuple[RuleKind, str], int] = {}
+    globs: List[Tuple[int, str, str]] = []
+    findings = []
+    for index, rule in enumerate(rules):
+        if rule.kind == RuleKind.STR:
+            key = canonical_origin(rule.rule)
+        elif rule.kind == RuleKind.PATH:
+            key = canonical_pattern(rule.rule)
+        else:
+            key = rule.rule
+        cause = seen.setdefault((rule.kind, key), index)
+        if cause != index:
+            findings.append(Finding(DUPLICATE, index, rule.frozen(), cause))
+            continue
+        if rule.kind == RuleKind.STR:
+            origin: Optional[str] = key
+        elif rule.kind == RuleKind.PATH:
+            origin = _glob_literal(rule)
+        else:
+            origin = None
+        if origin is not None:
+            cause = matcher.match(origin) if origin != "null" else None
+            if cause is not None and cause < index:
+                findings.append(Finding(SHADOWED, index, rule.frozen(), cause))
+            continue
+        if rule.kind != RuleKind.PATH:
+            continue
+        prefix, suffix = literal_affixes(rule)
+        for cause, glob_prefix, glob_suffix in globs:
+            if prefix.startswith(glob_prefix) and suffix.endswith(glob_suffix):
+                findings.append(Finding(UNREACHABLE, index, rule.frozen(), cause))
+                break
+        else:
+            star = _single_star(rule)
+            if star is not None:
+                globs.append((index, *star))
+    return Analysis(policy, findings)
+
+
+def _glob_samples(pattern: str) -> List[str]:
+    samples = []
+    for fill in ["x", "a.b", ""]:
+        sample = []
+        pos = 0
+        while pos < len(pattern):
+            char = pattern[pos]
+            end = pattern.find("]", pos + 2) if char == "[" else -1
+            if char == "*":
+                sample.append(fill)
+            elif char == "?":
+                sample.append(fill[:1] or "z")
+            elif end > 0:
+                start = pos + 1
+                chars = pattern[start:end]
+                if chars.startswith("!"):
+                    sample.append(next(c for c in "z0_~" if c not in chars))
+                else:
+                    sample.append(chars[0])
+                pos = end
+            else:
+                sample.append(char)
+            pos += 1
+        samples.append("".join(sample))
+    return samples
+
+
+def _variants(origin: str) -> List[str]:
+    scheme, sep, rest = origin.partition("://")
+    if not sep:
+        return [origin, origin.upper()]
+    other = "https" if scheme == "http" else "http"
+    variants = [
+        origin,
+        origin.upper(),
+        f"{other}://{rest}",
+        f"{scheme}://sub.{rest}",
+        f"{scheme}://{rest}:8443",
+        f"{origin}.evil.net",
+    ]
+    port = DEFAULT_PORTS.get(scheme)
+    if port is not None and ":" not in rest:
+        variants.append(f"{origin}:{port}")
+    return variants
+
+
+def origin_corpus(rules: Iterable[OriginRule]) -> List[str]:
+    """Generate origins that exercise rules.
+
+    Corpus contains origins derived from each rule (its exact value, glob
+    pattern with wildcards filled in, literal prefix and suffix of regular
+    expression), their variants (changed case, scheme and port, extra
+    subdomain and suffix) and few origins that match no typical rule.
+
+    :param rules: origin rules
+    :type rules: Iterable[OriginRule]
+    :return: unique origins
+    :rtype: List[str]
+    """
+    origins = ["null", "", "https://unknown.invalid", "http://localhost:8000"]
+    for rule in rules:
+        if rule.kind == RuleKind.STR:
+            seeds = [rule.rule]
+        elif rule.kind == RuleKind.PATH:
+            seeds = _glob_samples(canonical_pattern(rule.rule))
+        else:
+            prefix, suffix = literal_affixes(rule)
+            seeds = [prefix + fill + suffix for fill in ["", "x", "1", "a.b"]]
+        for seed in seeds:
+            origins.extend(_variants(seed))
+    return list(dict.fromkeys(origins))
+
+
+def differential_check(
+    policy: Policy, other: Policy, origins: Optional[Iterable[str]] = None
+) -> List[str]:
+    """Find origins that policies decide differently.
+
+    :param policy: reference policy
+    :type policy: Policy
+    :param other: compared policy
+    :type other: Policy
+    :param origins: origins to check, defaults to :func:`origin_corpus` of
+                    reference policy rules
+    :type origins: Optional[Iterable[str]]
+    :return: origins with different value of Access-Control-Allow-Origin
+    :rtype: List[str]
+    """
+    if origins is None:
+        origins = origin_corpus(policy.allow_origin or [])
+    compiled, other_compiled = policy.compiled, other.compiled
+    return [
+        origin
+        for origin in origins
+        if compiled.allow_origin(origin) != other_compiled.allow_origin(origin)
+    ]
+
+
+def minimize(policy: Policy, origins: Optional[Iterable[str]] = None) -> Policy:
+    """Build equivalent policy without redundant rules.
+
+    Minimized policy is verified with :func:`differential_check`.
+
+    :param policy: source policy
+    :type policy: Policy
+    :param origins: origins to verify, defaults to generated corpus
+    :type origins: Optional[Iterable[str]]
+    :raises PolicyError: if minimized policy decides differently
+    :return: minimized policy
+    :rtype: Policy
+    """
+    minimized = analyze(policy).minimized()
+    mismatches = differential_check(policy, minimized, origins)
+    if mismatches:
+        raise PolicyError(
+            f"Minimized policy {policy.name} differs for origins: "
+            + ", ".join(mismatches[:10])
+        )
+    return minimized
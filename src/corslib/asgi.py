@@ -0,0 +1,157 @@
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    MutableMapping,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from .compiled import HeaderTuples
+from .headers import apply_header_list
+from .origin import canonical_origin
+from .policy import Policy
+from .preflight import PreflightResponder
+from .resolver import OriginResolver
+from .utils import CORSRequest, parse_request_headers
+
+if TYPE_CHECKING:  # pragma: nocover
+    from .registry import PolicyResolver
+
+Scope = MutableMapping[str, Any]
+Message = MutableMapping[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+ASGIApp = Callable[[Scope, Receive, Send], Awaitable[None]]
+
+
+def _has_origin(headers: Iterable[Tuple[bytes, bytes]]) -> bool:
+    # ASGI header names are lowercased
+    for name, _ in headers:
+        if name == b"origin":
+            return True
+    return False
+
+
+class CORSMiddleware:
+    """ASGI middleware that applies policy to HTTP requests.
+
+    Requests without ``Origin`` header are passed to application unchanged,
+    after single comparison of each header name. Headers of other requests
+    are scanned once in raw form as provided in ASGI scope, with
+    :func:`~corslib.utils.parse_request_headers`.
+    Preflight requests (``OPTIONS`` with ``Access-Control-Request-Method``
+    header) are answered with ``204`` status by middleware itself and never
+    reach application. For other requests generated headers are applied to
+    ``http.response.start`` message sent by application with
+    :func:`~corslib.headers.apply_header_list`, so ``Vary`` tokens are
+    merged with application ones.
+
+    Headers are generated with bytes API of policy
+    (:meth:`~corslib.policy.Policy.preflight_response_header_list` and
+    :meth:`~corslib.policy.Policy.response_header_list`), so with policy
+    decision cache enabled repeated requests do not need any decoding or
+    encoding.
+
+    If policy :attr:`~corslib.policy.Policy.origin_allowlist` is
+    :class:`~corslib.resolver.OriginResolver`, request origin is resolved
+    before policy is applied.
+
+    With ``preflight`` responder complete preflight responses are cached and
+    sent without generating headers again.
+
+    :param app: ASGI application
+    :type app: ASGIApp
+    :param policy: policy to be applied to requests, or resolver that
+                   provides policy by request path and host, like
+                   :class:`~corslib.registry.PolicyRegistry` or
+                   :class:`~corslib.reload.NamedPolicy`
+    :type policy: Union[Policy, PolicyRegistry, NamedPolicy]
+    :param strict: flag if strict security has to be applied, defaults to
+                   False
+    :type strict: bool, optional
+    :param preflight: optional cache of preflight responses
+    :type preflight: Optional[PreflightResponder]
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        policy: Union[Policy, "PolicyResolver"],
+        *,
+        strict: bool = False,
+        preflight: Optional[PreflightResponder] = None,
+    ):
+        self.app = app
+        self.policy = policy
+        self.strict = strict
+        self.preflight = preflight
+        self.registry: Optional["PolicyResolver"] = None
+        if not isinstance(policy, Policy):
+            self.registry = policy
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = scope["headers"]
+        if not _has_origin(headers):
+            await self.app(scope, receive, send)
+            return
+        request = parse_request_headers(headers, scope["method"])
+        origin = request.origin
+        policy = self.policy
+        if self.registry is not None:
+            host = request.host
+            policy = self.registry.resolve(
+                scope["path"], host and host.decode("latin-1")
+            )
+            if policy is None:
+                await self.app(scope, receive, send)
+                return
+        allowlist = policy.origin_allowlist
+        if isinstance(allowlist, OriginResolver):
+            await allowlist.resolve(canonical_origin(origin.decode("latin-1")))
+        if request.is_preflight:
+            cors_headers = self._preflight_headers(policy, request)
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": 204,
+                    "headers": cors_headers,
+                }
+            )
+            await send({"type": "http.response.body", "body": b""})
+            return
+        cors_headers = policy.response_header_list(
+            origin, strict=self.strict, request_credentials=request.credentialed
+        )
+        if not cors_headers:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cors(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", ()))
+                apply_header_list(headers, cors_headers)
+                message["headers"] = headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_cors)
+
+    def _preflight_headers(self, policy: Policy, request: CORSRequest) -> HeaderTuples:
+        # preflight requests never carry credentials, allowing them is
+        # decided for actual request
+        kw: Dict[str, Any] = {
+            "strict": self.strict,
+            "request_credentials": True,
+            "request_method": request.request_method,
+            "request_headers": request.request_headers,
+        }
+        if self.preflight is not None:
+            return self.preflight.respond(policy, request.origin, **kw).headers
+        return policy.preflight_response_header_list(request.origin, **kw)
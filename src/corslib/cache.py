@@ -0,0 +1,99 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, NamedTuple, Optional
+
+
+class CacheInfo(NamedTuple):
+    """Cache statistics snapshot."""
+
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+    maxsize: int
+
+
+class LRUCache:
+    """Thread safe, size bounded least recently used cache.
+
+    When cache is full, adding new entry evicts the one that has not been
+    accessed for the longest time, so the number of stored entries never
+    exceeds ``maxsize`` no matter what keys are used. Optionally entries
+    expire after ``ttl`` seconds.
+
+    :param maxsize: maximum number of stored entries
+    :type maxsize: int
+    :param ttl: optional entry lifetime in seconds, defaults to None
+    :type ttl: Optional[float]
+    """
+
+    def __init__(self, maxsize: int, *, ttl: Optional[float] = None):
+        if maxsize < 1:
+            raise ValueError("Cache size must be positive")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = self.misses = self.evictions = 0
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Fetch value from cache.
+
+        :param key: entry key
+        :type key: Hashable
+        :param default: value returned if key is not found, defaults to None
+        :type default: Any
+        :return: cached value or default
+        :rtype: Any
+        """
+        with self._lock:
+            try:
+                expires, value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            if expires is not None and expires < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:  # noqa: A003
+        """Store value in cache, evicting least recently used entry if needed.
+
+        :param key: entry key
+        :type key: Hashable
+        :param value: value to be stored
+        :type value: Any
+        """
+        expires = None
+        if self.ttl is not None:
+            expires = time.monotonic() + self.ttl
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Remove all entries, statistics counters are preserved."""
+        with self._lock:
+            self._data.clear()
+
+    def info(self) -> CacheInfo:
+        """Get cache statistics.
+
+        :return: statistics snapshot
+        :rtype: CacheInfo
+        """
+        with self._lock:
+            return CacheInfo(
+                self.hits, self.misses, self.evictions, len(self._data), self.maxsize
+            )
@@ -0,0 +1,475 @@
+import argparse
+import gzip
+import io
+import json
+import os
+import sys
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    TextIO,
+    Tuple,
+)
+
+from .analysis import analyze, differential_check
+from .config import ConfigError, load_policies
+from .policy import Policy
+from .utils import parse_request_headers
+
+DEFAULT_CHUNK_SIZE = 2000
+DEFAULT_CACHE_SIZE = 4096
+
+ALLOWED = "allowed"
+DENIED = "denied"
+CREDENTIALS_DENIED = "credentials-denied"
+METHOD_DENIED = "method-denied"
+HEADERS_DENIED = "headers-denied"
+
+# origin, request kind, outcome with current policy, outcome with candidate
+Change = Tuple[str, str, str, str]
+
+
+class LogRequest(NamedTuple):
+    """CORS-relevant values of logged request."""
+
+    origin: Optional[str]
+    method: str
+    request_method: Optional[str]
+    request_headers: Optional[str]
+    credentialed: bool
+
+    @property
+    def preflight(self) -> bool:
+        return self.method == "OPTIONS" and self.request_method is not None
+
+
+class PolicyPair(NamedTuple):
+    """Location of current and candidate policy."""
+
+    current: str
+    candidate: str
+    name: Optional[str] = None
+    cache_size: int = DEFAULT_CACHE_SIZE
+
+
+@dataclass
+class Report:
+    """Aggregated result of log replay.
+
+    :ivar requests: number of parsed requests
+    :vartype requests: int
+    :ivar skipped: number of lines that could not be parsed
+    :vartype skipped: int
+    :ivar no_origin: number of requests without Origin header
+    :vartype no_origin: int
+    :ivar changes: number of requests by origin, request kind and outcomes,
+                   for requests with different outcome
+    :vartype changes: Dict[Tuple[str, str, str, str], int]
+    """
+
+    requests: int = 0
+    skipped: int = 0
+    no_origin: int = 0
+    changes: Dict[Change, int] = field(default_factory=Counter)
+
+    def update(self, other: "Report") -> None:
+        """Add results from other report.
+
+        :param other: partial report
+        :type other: Report
+        """
+        self.requests += other.requests
+        self.skipped += other.skipped
+        self.no_origin += other.no_origin
+        self.changes.update(other.changes)
+
+
+def open_log(path: str) -> Iterator[str]:
+    """Iterate over lines of log file.
+
+    Gzip compressed files are detected by content. Path ``-`` denotes
+    standard input.
+
+    :param path: log file path
+    :type path: str
+    :return: iterator of lines
+    :rtype: Iterator[str]
+    """
+    if path == "-":
+        yield from sys.stdin
+        return
+    with open(path, "rb") as fp:
+        gzipped = fp.read(2) == b"\x1f\x8b"
+        fp.seek(0)
+        if gzipped:
+            text = gzip.open(fp, "rt", encoding="utf-8", errors="replace")
+        else:
+            text = io.TextIOWrapper(fp, encoding="utf-8", errors="replace")
+        with text:
+            yield from text
+
+
+def read_logs(paths: Iterable[str]) -> Iterator[str]:
+    """Iterate over lines of all log files.
+
+    :param paths: log file paths
+    :type paths: Iterable[str]
+    :return: iterator of lines
+    :rtype: Iterator[str]
+    """
+    for path in paths:
+        yield from open_log(path)
+
+
+def parse_line(line: str) -> Optional[LogRequest]:
+    """Extract CORS-relevant values from log line.
+
+    Lines are JSON objects with request ``method`` and ``headers`` object
+    mapping request header names (in any case) to string values::
+
+        {"method": "GET", "headers": {"Origin": "https://example.com"}}
+
+    :param line: log line
+    :type line: str
+    :return: extracted values or None if line is not valid
+    :rtype: Optional[LogRequest]
+    """
+    try:
+        record = json.loads(line)
+        method = record["method"].upper()
+        request = parse_request_headers(record["headers"].items(), method)
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return None
+    values = (request.origin, request.request_method, request.request_headers)
+    if any(value is not None and not isinstance(value, str) for value in values):
+        return None
+    return LogRequest(
+        origin=request.origin,
+        method=method,
+        request_method=request.request_method,
+        request_headers=request.request_headers,
+        credentialed=request.credentialed,
+    )
+
+
+def _split(value: Any) -> List[str]:
+    return [item.strip() for item in str(value).split(",") if item.strip()]
+
+
+def outcome(policy: Policy, request: LogRequest) -> str:
+    """Determine how browser would treat response to request.
+
+    Preflight requests never carry credentials, so credentials are allowed in
+    preflight responses whenever policy allows them, like middlewares do.
+
+    :param policy: evaluated policy
+    :type policy: Policy
+    :param request: logged request with origin
+    :type request: LogRequest
+    :return: outcome name
+    :rtype: str
+    """
+    if request.preflight:
+        headers: Mapping[str, Any] = policy.preflight_response_headers(
+            request.origin,
+            request_credentials=True,
+            request_method=request.request_method,
+            request_headers=request.request_headers,
+        )
+    else:
+        headers = policy.response_headers(
+            request.origin, request_credentials=request.credentialed
+        )
+    if not headers:
+        return DENIED
+    if request.credentialed and Policy.ACCESS_CONTROL_ALLOW_CREDENTIALS not in headers:
+        return CREDENTIALS_DENIED
+    if not request.preflight:
+        return ALLOWED
+    wildcard = not request.credentialed
+    methods = _split(headers.get(Policy.ACCESS_CONTROL_ALLOW_METHODS, ""))
+    if (
+        request.request_method not in methods
+        and request.request_method not in Policy.SIMPLE_METHODS
+        and not (wildcard and "*" in methods)
+    ):
+        return METHOD_DENIED
+    allowed = {
+        name.lower()
+        for name in _split(headers.get(Policy.ACCESS_CONTROL_ALLOW_HEADERS, ""))
+    }
+    allowed.update(Policy.SAFELIST_HEADERS)
+    if not (wildcard and "*" in allowed):
+        for name in _split(request.request_headers or ""):
+            if name.lower() not in allowed:
+                return HEADERS_DENIED
+    return ALLOWED
+
+
+def load_policy(path: str, name: Optional[str] = None, cache_size: int = 0) -> Policy:
+    """Load single policy from configuration file.
+
+    :param path: configuration file path
+    :type path: str
+    :param name: policy name, may be omitted if file defines single policy
+    :type name: Optional[str]
+    :param cache_size: decision cache size, defaults to 0 (no cache)
+    :type cache_size: int, optional
+    :raises ConfigError: if policy can not be found
+    :return: policy
+    :rtype: Policy
+    """
+    policies = load_policies(path)
+    if name is None:
+        if len(policies) != 1:
+            raise ConfigError(f"Policy name required, {path} defines many policies")
+        (policy,) = policies.values()
+    elif name in policies:
+        policy = policies[name]
+    else:
+        raise ConfigError(f"Policy {name} not found in {path}")
+    policy.cache_size = cache_size or None
+    return policy
+
+
+_loaded: Dict[PolicyPair, Tuple[Policy, Policy]] = {}
+
+
+def _load_pair(pair: PolicyPair) -> Tuple[Policy, Policy]:
+    # policies are kept per process, so decision cache is reused by chunks
+    policies = _loaded.get(pair)
+    if policies is None:
+        policies = _loaded[pair] = (
+            load_policy(pair.current, pair.name, pair.cache_size),
+            load_policy(pair.candidate, pair.name, pair.cache_size),
+        )
+    return policies
+
+
+def process_chunk(pair: PolicyPair, lines: Sequence[str]) -> Report:
+    """Evaluate both policies for chunk of log lines.
+
+    :param pair: policies to compare
+    :type pair: PolicyPair
+    :param lines: log lines
+    :type lines: Sequence[str]
+    :return: partial report
+    :rtype: Report
+    """
+    current, candidate = _load_pair(pair)
+    report = Report()
+    for line in lines:
+        request = parse_line(line)
+        if request is None:
+            report.skipped += 1
+            continue
+        report.requests += 1
+        if not request.origin:
+            report.no_origin += 1
+            continue
+        before, after = outcome(current, request), outcome(candidate, request)
+        if before != after:
+            kind = "preflight" if request.preflight else "response"
+            report.changes[(request.origin, kind, before, after)] += 1
+    return report
+
+
+def chunked(lines: Iterable[str], size: int) -> Iterator[List[str]]:
+    """Split lines into lists of at most specified size.
+
+    :param lines: lines
+    :type lines: Iterable[str]
+    :param size: chunk size
+    :type size: int
+    :return: iterator of chunks
+    :rtype: Iterator[List[str]]
+    """
+    lines = iter(lines)
+    while True:
+        chunk = list(islice(lines, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def replay(
+    pair: PolicyPair,
+    lines: Iterable[str],
+    *,
+    jobs: int = 1,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Report:
+    """Compare outcomes of current and candidate policy for logged requests.
+
+    Lines are consumed lazily in chunks. With more than one job chunks are
+    evaluated in process pool, with at most two chunks per worker in flight
+    so memory use does not depend on log size.
+
+    :param pair: policies to compare
+    :type pair: PolicyPair
+    :param lines: log lines
+    :type lines: Iterable[str]
+    :param jobs: number of worker processes, defaults to 1 (no pool)
+    :type jobs: int, optional
+    :param chunk_size: number of lines per chunk
+    :type chunk_size: int, optional
+    :return: aggregated report
+    :rtype: Report
+    """
+    report = Report()
+    if jobs <= 1:
+        for chunk in chunked(lines, chunk_size):
+            report.update(process_chunk(pair, chunk))
+        return report
+    with ProcessPoolExecutor(jobs) as executor:
+        pending = set()
+        for chunk in chunked(lines, chunk_size):
+            if len(pending) >= jobs * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    report.update(future.result())
+            pending.add(executor.submit(process_chunk, pair, chunk))
+        for future in wait(pending).done:
+            report.update(future.result())
+    return report
+
+
+def print_report(report: Report, out: TextIO, limit: Optional[int] = None) -> None:
+    """Print replay report.
+
+    :param report: replay report
+    :type report: Report
+    :param out: output stream
+    :type out: TextIO
+    :param limit: maximum number of changes to print, defaults to all
+    :type limit: Optional[int]
+    """
+    changed = sum(report.changes.values())
+    origins = len({change[0] for change in report.changes})
+    print(
+        f"requests: {report.requests}, without origin: {report.no_origin}, "
+        f"skipped lines: {report.skipped}",
+        file=out,
+    )
+    print(f"changed: {changed} requests from {origins} origins", file=out)
+    changes = sorted(report.changes.items(), key=lambda item: (-item[1], item[0]))
+    for (origin, kind, before, after), count in changes[:limit]:
+        print(f"{count:>10} {kind:<9} {before} -> {after} {origin}", file=out)
+
+
+def print_analysis(policy: Policy, out: TextIO) -> bool:
+    """Print redundant rules of policy and verify minimized policy.
+
+    :param policy: analyzed policy
+    :type policy: Policy
+    :param out: output stream
+    :type out: TextIO
+    :return: flag if policy has no redundant rules
+    :rtype: bool
+    """
+    analysis = analyze(policy)
+    for finding in analysis.findings:
+        print(
+            f"{policy.name}: rule {finding.index} {finding.rule.rule!r} is "
+            f"{finding.kind}, covered by rule {finding.cause}",
+            file=out,
+        )
+    if not analysis.findings:
+        return True
+    mismatches = differential_check(policy, analysis.minimized())
+    print(
+        f"{policy.name}: {len(analysis.findings)} of {len(policy.allow_origin)} "
+        f"rules redundant, minimized policy differs for {len(mismatches)} origins",
+        file=out,
+    )
+    return False
+
+
+def make_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="corslib")
+    commands = parser.add_subparsers(dest="command", metavar="command")
+    commands.required = True
+    cmd = commands.add_parser(
+        "replay",
+        help="compare policies against logged requests",
+        description=(
+            "Replay logged requests (JSON lines, optionally gzipped) against "
+            "current and candidate policy and report origins with changed outcome."
+        ),
+    )
+    cmd.add_argument("current", help="configuration file with current policy")
+    cmd.add_argument("candidate", help="configuration file with candidate policy")
+    cmd.add_argument("logs", nargs="+", metavar="log", help="log file, - for stdin")
+    cmd.add_argument("-p", "--policy", help="policy name")
+    cmd.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="number of worker processes (default: number of CPUs)",
+    )
+    cmd.add_argument(
+        "--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="lines per task"
+    )
+    cmd.add_argument(
+        "--cache-size",
+        type=int,
+        default=DEFAULT_CACHE_SIZE,
+        help="decision cache size per policy and worker",
+    )
+    cmd.add_argument("--limit", type=int, help="maximum number of changes to print")
+    cmd = commands.add_parser(
+        "analyze",
+        help="find redundant origin rules",
+        description=(
+            "Report duplicate, shadowed and unreachable origin rules of policies, "
+            "exit with status 1 if any are found."
+        ),
+    )
+    cmd.add_argument("config", help="configuration file")
+    cmd.add_argument("-p", "--policy", help="policy name, defaults to all")
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Command line entry point.
+
+    :param argv: command line arguments, defaults to :data:`sys.argv`
+    :type argv: Optional[Sequence[str]]
+    :return: exit status
+    :rtype: int
+    """
+    opts = make_parser().parse_args(argv)
+    if opts.command == "analyze":
+        try:
+            if opts.policy is None:
+                policies = list(load_policies(opts.config).values())
+            else:
+                policies = [load_policy(opts.config, opts.policy)]
+        except (ConfigError, OSError) as e:
+            print(f"corslib: error: {e}", file=sys.stderr)
+            return 2
+        clean = [print_analysis(policy, sys.stdout) for policy in policies]
+        return 0 if all(clean) else 1
+    pair = PolicyPair(opts.current, opts.candidate, opts.policy, opts.cache_size)
+    try:
+        _load_pair(pair)
+        report = replay(
+            pair, read_logs(opts.logs), jobs=opts.jobs, chunk_size=opts.chunk_size
+        )
+    except (ConfigError, OSError) as e:
+        print(f"corslib: error: {e}", file=sys.stderr)
+        return 2
+    print_report(report, sys.stdout, opts.limit)
+    return 0
@@ -0,0 +1,470 @@
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from typing import (
+    Any,
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from .matching import OriginMatcher
+from .origin import canonical_origin
+from .policy import Policy
+from .resolver import OriginResolver
+
+_ACAO = Policy.ACCESS_CONTROL_ALLOW_ORIGIN
+_ACAC = Policy.ACCESS_CONTROL_ALLOW_CREDENTIALS
+_ACAM = Policy.ACCESS_CONTROL_ALLOW_METHODS
+_ACAH = Policy.ACCESS_CONTROL_ALLOW_HEADERS
+_MAX_AGE = Policy.ACCESS_CONTROL_MAX_AGE
+
+HeaderTuples = Tuple[Tuple[bytes, bytes], ...]
+
+_B_ACAO = _ACAO.lower().encode("ascii")
+_B_ACAC = _ACAC.lower().encode("ascii")
+_B_ACAM = _ACAM.lower().encode("ascii")
+_B_ACAH = _ACAH.lower().encode("ascii")
+_B_MAX_AGE = _MAX_AGE.lower().encode("ascii")
+_B_ANY_ORIGIN: HeaderTuples = ((_B_ACAO, b"*"),)
+_B_NULL_ORIGIN: HeaderTuples = ((_B_ACAO, b"null"),)
+_B_VARY = (b"vary", b"Origin")
+_B_CREDENTIALS = (_B_ACAC, b"true")
+
+
+class BatchResult:
+    """Result of evaluating many origins at once.
+
+    Outcome of each origin is stored as single machine integer in compact
+    array: index of matching origin rule, or negative code :attr:`DENIED`,
+    :attr:`ALLOWLIST` (matched origin allowlist) or :attr:`ANY` (policy
+    allows any origin).
+
+    :param origins: evaluated origins
+    :type origins: List[str]
+    :param indexes: rule indexes or codes, in order of origins
+    :type indexes: array[int]
+    """
+
+    DENIED = -1
+    ALLOWLIST = -2
+    ANY = -3
+
+    __slots__ = ("origins", "indexes")
+
+    def __init__(self, origins: List[str], indexes: "array[int]"):
+        self.origins = origins
+        self.indexes = indexes
+
+    def __len__(self) -> int:
+        return len(self.indexes)
+
+    def __getitem__(self, pos: int) -> Tuple[bool, Optional[int]]:
+        index = self.indexes[pos]
+        return index != self.DENIED, index if index >= 0 else None
+
+    def __iter__(self) -> Iterator[Tuple[bool, Optional[int]]]:
+        for pos in range(len(self.indexes)):
+            yield self[pos]
+
+    @property
+    def flags(self) -> bytes:
+        """Allowed flags, ``1`` for allowed and ``0`` for denied origin.
+
+        :return: one byte per origin
+        :rtype: bytes
+        """
+        return bytes(index != self.DENIED for index in self.indexes)
+
+    def allowed(self) -> List[str]:
+        """Get allowed origins.
+
+        :return: allowed origins in order of evaluation
+        :rtype: List[str]
+        """
+        return [o for o, i in zip(self.origins, self.indexes) if i != self.DENIED]
+
+    def denied(self) -> List[str]:
+        """Get denied origins.
+
+        :return: denied origins in order of evaluation
+        :rtype: List[str]
+        """
+        return [o for o, i in zip(self.origins, self.indexes) if i == self.DENIED]
+
+
+def _evaluate_chunk(policy: "CompiledPolicy", origins: List[str]) -> "array[int]":
+    return policy._evaluate(origins)
+
+
+class CompiledPolicy:
+    """Immutable, precomputed form of :class:`~corslib.policy.Policy`.
+
+    Header values that do not depend on request (allowed methods, allowed
+    headers, max age) are rendered once at construction, so generating
+    response headers only requires matching origin (against rules and then
+    against origin allowlist) and filling single dict with static and
+    origin-dependent entries. Results are the same as
+    returned by respective :class:`~corslib.policy.Policy` methods.
+
+    Bytes variants of header generation methods work on raw header values
+    and return tuples of encoded header name (lowercased) and value pairs,
+    with static entries encoded once at construction.
+
+    In enforcing mode allowed methods and headers are kept as sets of
+    lowercase names (together with simple methods and safelisted headers),
+    so requested ones are checked with single pass and preflight requests
+    that ask for anything else are denied before origin is matched.
+
+    Compiled policies compare equal when they were built from policies with
+    the same configuration, and are hashable (provided origin allowlist is),
+    so they may be used as cache keys.
+
+    :param policy: source policy
+    :type policy: Policy
+    """
+
+    PARALLEL_THRESHOLD = 50000
+
+    __slots__ = (
+        "name",
+        "matcher",
+        "allowlist",
+        "allow_any",
+        "allow_credentials",
+        "allow_methods",
+        "allow_headers",
+        "max_age",
+        "allow_methods_header",
+        "allow_headers_header",
+        "max_age_header",
+        "static_preflight_header_list",
+        "enforce",
+        "method_set",
+        "header_set",
+        "_hash",
+    )
+
+    def __init__(self, policy: Policy):
+        values = {
+            "name": policy.name,
+            "matcher": OriginMatcher(policy.allow_origin or [], policy.adaptive),
+            "allowlist": policy.origin_allowlist,
+            "allow_any": not policy.allow_origin and policy.origin_allowlist is None,
+            "allow_credentials": policy.allow_credentials,
+            "allow_methods": None,
+            "allow_headers": None,
+            "max_age": policy.max_age or None,
+        }
+        if policy.allow_methods:
+            values["allow_methods"] = ", ".join(policy.allow_methods)
+        if policy.allow_headers:
+            values["allow_headers"] = ", ".join(policy.allow_headers)
+        values["allow_methods_header"] = values["allow_headers_header"] = None
+        values["max_age_header"] = None
+        if values["allow_methods"]:
+            value = values["allow_methods"].encode("latin-1")
+            values["allow_methods_header"] = (_B_ACAM, value)
+        if values["allow_headers"]:
+            value = values["allow_headers"].encode("latin-1")
+            values["allow_headers_header"] = (_B_ACAH, value)
+        static_preflight = _B_ANY_ORIGIN
+        if values["max_age"]:
+            values["max_age_header"] = (_B_MAX_AGE, str(policy.max_age).encode())
+            static_preflight += (values["max_age_header"],)
+        values["static_preflight_header_list"] = static_preflight
+        values["enforce"] = policy.enforce
+        values["header_set"] = None
+        # without allowed methods only simple methods are allowed
+        methods = [*(policy.allow_methods or ()), *Policy.SIMPLE_METHODS]
+        values["method_set"] = frozenset(m.lower() for m in methods)
+        if policy.allow_headers:
+            headers = [*policy.allow_headers, *Policy.SAFELIST_HEADERS]
+            # empty name tolerates empty items in requested headers list
+            values["header_set"] = frozenset(h.lower() for h in headers) | {""}
+        values["_hash"] = None
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"{self.__class__.__name__} is immutable")
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = {name: getattr(self, name) for name in self.__slots__}
+        # string hashes differ between processes
+        state["_hash"] = None
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        for name, value in state.items():
+            object.__setattr__(self, name, value)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(name={self.name!r})"
+
+    @property
+    def key(self) -> Tuple[Any, ...]:
+        """Configuration that identifies compiled policy.
+
+        :return: policy name, frozen origin rules and values of remaining
+                 attributes
+        :rtype: Tuple[Any, ...]
+        """
+        return (
+            self.name,
+            self.matcher.rules,
+            self.allowlist,
+            self.allow_credentials,
+            self.allow_methods,
+            self.allow_headers,
+            self.max_age,
+            self.enforce,
+        )
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, CompiledPolicy):
+            return NotImplemented
+        return self is other or self.key == other.key
+
+    def __hash__(self) -> int:
+        if self._hash is None:
+            object.__setattr__(self, "_hash", hash(self.key))
+        return self._hash
+
+    def allow_origin(self, origin: str) -> Optional[str]:
+        """Resolve value of Access-Control-Allow-Origin header.
+
+        :param origin: value of the Origin request header
+        :type origin: str
+        :return: allowed origin spec or None if origin is not allowed
+        :rtype: Optional[str]
+        """
+        if self.allow_any:
+            return "*"
+        allowed = self.matcher.allow_origin(origin)
+        if allowed is None and self.allowlist is not None:
+            if canonical_origin(origin) in self.allowlist:
+                return origin
+        return allowed
+
+    def _evaluate(self, origins: List[str]) -> "array[int]":
+        if self.allow_any:
+            return array("l", [BatchResult.ANY]) * len(origins)
+        indexes = self.matcher.match_many(origins)
+        if self.allowlist is not None:
+            for pos, index in enumerate(indexes):
+                origin = canonical_origin(origins[pos])
+                if index == BatchResult.DENIED and origin in self.allowlist:
+                    indexes[pos] = BatchResult.ALLOWLIST
+        return indexes
+
+    def evaluate_many(
+        self, origins: Iterable[str], *, processes: Optional[int] = None
+    ) -> BatchResult:
+        """Check many origins at once.
+
+        See :meth:`~corslib.policy.Policy.evaluate_many` for description of
+        arguments and returned value.
+        """
+        origins = list(origins)
+        if (
+            not processes
+            or processes < 2
+            or len(origins) < self.PARALLEL_THRESHOLD
+            # resolver answers are cached in this process only
+            or isinstance(self.allowlist, OriginResolver)
+        ):
+            return BatchResult(origins, self._evaluate(origins))
+        size = -(-len(origins) // processes)
+        chunks = []
+        for start in range(0, len(origins), size):
+            end = start + size
+            chunks.append(origins[start:end])
+        indexes: "array[int]" = array("l")
+        with ProcessPoolExecutor(processes) as executor:
+            for result in executor.map(_evaluate_chunk, [self] * len(chunks), chunks):
+                indexes.extend(result)
+        return BatchResult(origins, indexes)
+
+    def allows_method(self, request_method: str) -> bool:
+        """Check if requested method is allowed.
+
+        :param request_method: value of Access-Control-Request-Method header
+        :type request_method: str
+        :return: flag if method is allowed
+        :rtype: bool
+        """
+        method_set: FrozenSet[str] = self.method_set
+        return request_method.lower() in method_set
+
+    def allows_headers(self, request_headers: str) -> bool:
+        """Check if all requested headers are allowed.
+
+        :param request_headers: value of Access-Control-Request-Headers header
+        :type request_headers: str
+        :return: flag if all headers are allowed
+        :rtype: bool
+        """
+        header_set: Optional[FrozenSet[str]] = self.header_set
+        return header_set is None or header_set.issuperset(
+            name.strip() for name in request_headers.lower().split(",")
+        )
+
+    def _denied(
+        self, request_method: Optional[str], request_headers: Optional[str]
+    ) -> bool:
+        if request_method and not self.allows_method(request_method):
+            return True
+        return bool(request_headers) and not self.allows_headers(request_headers)
+
+    def preflight_response_headers(
+        self,
+        origin: str,
+        strict: bool = False,
+        request_credentials: bool = False,
+        request_method: Optional[str] = None,
+        request_headers: Optional[str] = None,
+    ) -> Dict[str, Union[str, int]]:
+        """Generate preflight response headers.
+
+        See :meth:`~corslib.policy.Policy.preflight_response_headers` for
+        description of arguments and returned value.
+        """
+        if not origin or (strict and origin.lower() == "null"):
+            return {}
+        if self.enforce and self._denied(request_method, request_headers):
+            return {}
+        allowed = self.allow_origin(origin)
+        if allowed is None:
+            return {}
+        headers: Dict[str, Union[str, int]] = {_ACAO: allowed}
+        if allowed not in ("*", "null"):
+            headers["Vary"] = "Origin"
+        if request_headers:
+            headers[_ACAH] = self.allow_headers or ", ".join(
+                x.strip() for x in request_headers.split(",")
+            )
+        if request_method:
+            headers[_ACAM] = self.allow_methods or request_method
+        if (
+            request_credentials
+            and self.allow_credentials
+            and allowed.lower() not in ("*", "null")
+        ):
+            headers[_ACAC] = "true"
+        if self.max_age:
+            headers[_MAX_AGE] = self.max_age
+        return headers
+
+    def response_headers(
+        self,
+        origin: str,
+        strict: bool = False,
+        request_credentials: bool = False,
+    ) -> Dict[str, str]:
+        """Generate regular response headers.
+
+        See :meth:`~corslib.policy.Policy.response_headers` for description of
+        arguments and returned value.
+        """
+        if not origin or (strict and origin.lower() == "null"):
+            return {}
+        allowed = self.allow_origin(origin)
+        if allowed is None:
+            return {}
+        headers = {_ACAO: allowed}
+        if allowed not in ("*", "null"):
+            headers["Vary"] = "Origin"
+        if (
+            request_credentials
+            and self.allow_credentials
+            and allowed.lower() not in ("*", "null")
+        ):
+            headers[_ACAC] = "true"
+        return headers
+
+    def _origin_header_list(self, origin: bytes) -> Optional[HeaderTuples]:
+        if self.allow_any:
+            return _B_ANY_ORIGIN
+        if origin == b"null":
+            if self.allow_origin("null") is None:
+                return None
+            return _B_NULL_ORIGIN
+        if self.allow_origin(origin.decode("latin-1")) is None:
+            return None
+        return ((_B_ACAO, origin), _B_VARY)
+
+    def _credentials(self, headers: HeaderTuples, request_credentials: bool) -> bool:
+        return (
+            request_credentials
+            and self.allow_credentials
+            and headers[-1] is _B_VARY
+            and headers[0][1].lower() != b"null"
+        )
+
+    def preflight_response_header_list(
+        self,
+        origin: bytes,
+        strict: bool = False,
+        request_credentials: bool = False,
+        request_method: Optional[bytes] = None,
+        request_headers: Optional[bytes] = None,
+    ) -> HeaderTuples:
+        """Generate preflight response headers from raw request values.
+
+        See :meth:`~corslib.policy.Policy.preflight_response_header_list` for
+        description of arguments and returned value.
+        """
+        if not origin or (strict and origin.lower() == b"null"):
+            return ()
+        if self.enforce and (request_method or request_headers):
+            if self._denied(
+                request_method and request_method.decode("latin-1"),
+                request_headers and request_headers.decode("latin-1"),
+            ):
+                return ()
+        if self.allow_any and not (request_method or request_headers):
+            return self.static_preflight_header_list
+        headers = self._origin_header_list(origin)
+        if headers is None:
+            return ()
+        credentials = self._credentials(headers, request_credentials)
+        if request_headers:
+            headers += (
+                self.allow_headers_header
+                or (
+                    _B_ACAH,
+                    b", ".join(x.strip() for x in request_headers.split(b",")),
+                ),
+            )
+        if request_method:
+            headers += (self.allow_methods_header or (_B_ACAM, request_method),)
+        if credentials:
+            headers += (_B_CREDENTIALS,)
+        if self.max_age_header:
+            headers += (self.max_age_header,)
+        return headers
+
+    def response_header_list(
+        self,
+        origin: bytes,
+        strict: bool = False,
+        request_credentials: bool = False,
+    ) -> HeaderTuples:
+        """Generate regular response headers from raw request values.
+
+        See :meth:`~corslib.policy.Policy.response_header_list` for
+        description of arguments and returned value.
+        """
+        if not origin or (strict and origin.lower() == b"null"):
+            return ()
+        headers = self._origin_header_list(origin)
+        if headers is None:
+            return ()
+        if self._credentials(headers, request_credentials):
+            headers += (_B_CREDENTIALS,)
+        return headers
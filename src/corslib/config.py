@@ -0,0 +1,275 @@
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from . import __version__
+from .allowlist import MappedAllowlist
+from .policy import FrozenOriginRule, Policy, PolicyError, RuleError, RuleKind
+
+try:  # pragma: nocover
+    import tomllib
+except ImportError:  # pragma: nocover
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
+Policies = Dict[str, Policy]
+
+SNAPSHOT_MAGIC = b"corslib-snapshot\n"
+
+POLICY_KEYS = {
+    "name",
+    "allow_credentials",
+    "allow_origin",
+    "allow_headers",
+    "allow_methods",
+    "expose_headers",
+    "max_age",
+    "cache_size",
+    "cache_ttl",
+    "origin_allowlist",
+    "enforce",
+    "adaptive",
+}
+
+
+SCALAR_TYPES: Dict[str, Tuple[type, ...]] = {
+    "name": (str,),
+    "allow_credentials": (bool,),
+    "max_age": (int,),
+    "cache_size": (int,),
+    "cache_ttl": (int, float),
+    "origin_allowlist": (str,),
+    "enforce": (bool,),
+    "adaptive": (bool,),
+}
+
+NAME_LIST_KEYS = {"allow_headers", "allow_methods", "expose_headers"}
+
+
+class ConfigError(ValueError):
+    pass
+
+
+def parse_config(content: bytes, fmt: str) -> Mapping[str, Any]:
+    """Parse raw configuration.
+
+    TOML is parsed with :mod:`tomllib` (Python 3.11+) or with ``tomli``
+    package if installed.
+
+    :param content: configuration file content
+    :type content: bytes
+    :param fmt: configuration format, ``toml`` or ``json``
+    :type fmt: str
+    :raises ConfigError: if format is not supported or content is invalid
+    :return: parsed configuration
+    :rtype: Mapping[str, Any]
+    """
+    if fmt == "json":
+        loads = json.loads
+    elif fmt == "toml":
+        if tomllib is None:  # pragma: nocover
+            raise ConfigError("TOML support requires tomli package")
+        loads = tomllib.loads
+    else:
+        raise ConfigError(f"Unsupported configuration format: {fmt}")
+    try:
+        return loads(content.decode("utf-8"))
+    except ValueError as e:
+        raise ConfigError(f"Invalid {fmt} configuration: {e}") from e
+
+
+def _origin_rule(spec: Any) -> FrozenOriginRule:
+    if isinstance(spec, str):
+        return FrozenOriginRule(spec)
+    try:
+        rule, kind = spec["rule"], RuleKind(spec.get("kind", "str"))
+    except (AttributeError, KeyError, TypeError, ValueError) as e:
+        raise ConfigError(f"Invalid origin rule: {spec!r}") from e
+    if not isinstance(rule, str):
+        raise ConfigError(f"Invalid origin rule: {spec!r}")
+    return FrozenOriginRule.create(rule, kind)
+
+
+def _check_types(spec: Mapping[str, Any]) -> None:
+    name = spec.get("name")
+    for key, value in spec.items():
+        types = SCALAR_TYPES.get(key)
+        if types is not None:
+            # bool is subclass of int
+            valid = isinstance(value, types) and (
+                bool in types or not isinstance(value, bool)
+            )
+        elif key in NAME_LIST_KEYS:
+            valid = isinstance(value, list) and all(isinstance(v, str) for v in value)
+        else:
+            valid = key != "allow_origin" or isinstance(value, list)
+        if not valid:
+            raise ConfigError(f"Invalid value of {key} in policy {name}: {value!r}")
+
+
+def policies_from_config(config: Mapping[str, Any]) -> Policies:
+    """Build policies from parsed configuration.
+
+    Configuration contains list of policy tables under ``policy`` key. Each
+    table keys correspond to :class:`~corslib.policy.Policy` attributes.
+    Origin rules in ``allow_origin`` list are either strings (``STR``
+    rules) or tables with ``rule`` and optional ``kind`` keys, they are
+    validated once and stored as :class:`~corslib.policy.FrozenOriginRule`
+    with compiled pattern::
+
+        [[policy]]
+        name = "api"
+        allow_credentials = true
+        allow_origin = [
+            "https://app.example.com",
+            {rule = "https://*.example.com", kind = "path"},
+        ]
+        max_age = 600
+
+    Optional ``origin_allowlist`` key holds path of allowlist file created
+    with :func:`~corslib.allowlist.write_allowlist`.
+
+    :param config: parsed configuration
+    :type config: Mapping[str, Any]
+    :raises ConfigError: if configuration structure or value is invalid,
+                         including insecure rules and policies
+    :return: policies by name
+    :rtype: Dict[str, Policy]
+    """
+    policies: Policies = {}
+    specs = config.get("policy", [])
+    if not isinstance(specs, list) or not all(isinstance(s, dict) for s in specs):
+        raise ConfigError("Policies must be list of tables")
+    for spec in specs:
+        unknown = set(spec) - POLICY_KEYS
+        if unknown:
+            raise ConfigError(f"Unknown policy keys: {', '.join(sorted(unknown))}")
+        if "name" not in spec:
+            raise ConfigError("Policy name is required")
+        if spec["name"] in policies:
+            raise ConfigError(f"Duplicate policy name: {spec['name']}")
+        _check_types(spec)
+        kw = dict(spec)
+        try:
+            if "allow_origin" in kw:
+                kw["allow_origin"] = tuple(
+                    _origin_rule(rule) for rule in kw["allow_origin"]
+                )
+            if "origin_allowlist" in kw:
+                try:
+                    kw["origin_allowlist"] = MappedAllowlist(kw["origin_allowlist"])
+                except (OSError, TypeError, ValueError) as e:
+                    raise ConfigError(f"Invalid origin allowlist: {e}") from e
+            policy = Policy(**kw)
+            policy.compiled
+        except (RuleError, PolicyError, TypeError) as e:
+            raise ConfigError(f"Invalid policy {spec['name']}: {e}") from e
+        policies[policy.name] = policy
+    return policies
+
+
+def source_digest(content: bytes) -> str:
+    """Compute digest that identifies configuration and library version.
+
+    :param content: configuration file content
+    :type content: bytes
+    :return: hex digest
+    :rtype: str
+    """
+    digest = hashlib.sha256(__version__.encode("ascii"))
+    digest.update(b"\0")
+    digest.update(content)
+    return digest.hexdigest()
+
+
+def write_snapshot(policies: Policies, path: str, digest: str) -> None:
+    """Write compiled policies to snapshot file.
+
+    File is replaced atomically.
+
+    :param policies: policies by name
+    :type policies: Dict[str, Policy]
+    :param path: snapshot file path
+    :type path: str
+    :param digest: source digest as returned by :func:`source_digest`
+    :type digest: str
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".corslib-")
+    try:
+        with os.fdopen(fd, "wb") as fp:
+            fp.write(SNAPSHOT_MAGIC)
+            fp.write(digest.encode("ascii") + b"\n")
+            pickle.dump(policies, fp, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def read_snapshot(path: str, digest: str) -> Optional[Policies]:
+    """Read compiled policies from snapshot file.
+
+    Snapshot is loaded only if it has been created from the same
+    configuration with the same library version. Snapshot files are loaded
+    with :mod:`pickle` and thus must come from trusted source.
+
+    :param path: snapshot file path
+    :type path: str
+    :param digest: source digest as returned by :func:`source_digest`
+    :type digest: str
+    :return: policies by name or None if snapshot is missing or outdated
+    :rtype: Optional[Dict[str, Policy]]
+    """
+    try:
+        with open(path, "rb") as fp:
+            if fp.readline() != SNAPSHOT_MAGIC:
+                return None
+            if fp.readline().rstrip(b"\n").decode("ascii") != digest:
+                return None
+            return pickle.load(fp)
+    except FileNotFoundError:
+        return None
+
+
+def _format(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".json":
+        return "json"
+    return "toml"
+
+
+def load_policies(path: str, *, snapshot: Optional[str] = None) -> Policies:
+    """Load policies from TOML or JSON configuration file.
+
+    Format is determined by file extension, files with ``.json`` extension
+    are parsed as JSON and all other as TOML. If snapshot path is provided
+    then policies are loaded from snapshot if it's up to date with
+    configuration file content and library version, otherwise they are built
+    from configuration and snapshot is (re)written. Loading snapshot skips
+    parsing and validation of configuration and building of matcher indexes,
+    regular expressions of pattern rules are still compiled on load.
+
+    :param path: configuration file path
+    :type path: str
+    :param snapshot: optional snapshot file path, defaults to None
+    :type snapshot: Optional[str]
+    :return: policies by name
+    :rtype: Dict[str, Policy]
+    """
+    with open(path, "rb") as fp:
+        content = fp.read()
+    digest = source_digest(content)
+    if snapshot is not None:
+        policies = read_snapshot(snapshot, digest)
+        if policies is not None:
+            return policies
+    policies = policies_from_config(parse_config(content, _format(path)))
+    if snapshot is not None:
+        write_snapshot(policies, snapshot, digest)
+    return policies
@@ -0,0 +1,190 @@
+from functools import lru_cache
+from typing import (
+    Any,
+    AnyStr,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    Mapping,
+    MutableMapping,
+    Optional,
+    Tuple,
+    Union,
+)
+
+try:
+    from typing import Protocol
+except ImportError:  # pragma: nocover
+    Protocol = object  # type: ignore
+
+VARY_CACHE_SIZE = 256
+
+_VARY_NAMES = ("vary", b"vary")
+
+CORSHeaders = Union[Mapping[str, Any], Iterable[Tuple[Any, Any]]]
+
+
+class MultiDictLike(Protocol):
+    """Mutable header container with many values per case-insensitive name.
+
+    Setting item replaces all values of header. Values are read with
+    ``getall(name, default)`` (eg. ``multidict.CIMultiDict``) or
+    ``getlist(name)`` (eg. ``werkzeug.datastructures.Headers``, Starlette
+    ``MutableHeaders``).
+    """
+
+    def __setitem__(self, name: str, value: str) -> None: ...
+
+
+@lru_cache(maxsize=VARY_CACHE_SIZE)
+def vary_tokens(value: AnyStr) -> FrozenSet[AnyStr]:
+    """Parse Vary header value into set of lowercase tokens.
+
+    Results of recent calls are memoized, so values set by application that
+    do not change between responses are parsed once.
+
+    :param value: Vary header value
+    :type value: Union[str, bytes]
+    :return: lowercase field names
+    :rtype: Union[FrozenSet[str], FrozenSet[bytes]]
+    """
+    sep = "," if isinstance(value, str) else b","
+    return frozenset(token.strip().lower() for token in value.split(sep))
+
+
+@lru_cache(maxsize=VARY_CACHE_SIZE)
+def _vary_list(value: AnyStr) -> Tuple[Tuple[AnyStr, AnyStr], ...]:
+    sep = "," if isinstance(value, str) else b","
+    tokens = (token.strip() for token in value.split(sep))
+    return tuple((token, token.lower()) for token in tokens if token)
+
+
+def merge_vary(value: AnyStr, added: AnyStr) -> AnyStr:
+    """Add tokens to Vary header value, skipping ones already present.
+
+    Tokens are compared case-insensitively, value ``*`` is kept as is.
+
+    :param value: current Vary header value
+    :type value: Union[str, bytes]
+    :param added: Vary header value with tokens to add
+    :type added: Union[str, bytes]
+    :return: merged value, the same object if nothing was added
+    :rtype: Union[str, bytes]
+    """
+    present = vary_tokens(value)
+    if "*" in present or b"*" in present:
+        return value
+    missing = [token for token, key in _vary_list(added) if key not in present]
+    if not missing:
+        return value
+    sep = ", " if isinstance(value, str) else b", "
+    if not value.strip():
+        return sep.join(missing)
+    return sep.join([value, *missing])
+
+
+def _pairs(cors: CORSHeaders) -> Iterable[Tuple[Any, Any]]:
+    if isinstance(cors, Mapping):
+        return cors.items()
+    return cors
+
+
+def _is_vary(name: AnyStr) -> bool:
+    return name.lower() in _VARY_NAMES
+
+
+def apply_header_list(headers: List[Tuple[AnyStr, AnyStr]], cors: CORSHeaders) -> None:
+    """Apply CORS headers to list of response header pairs in place.
+
+    Suitable for WSGI ``start_response`` header lists (str pairs) and ASGI
+    ``http.response.start`` header lists (bytes pairs). CORS headers replace
+    all headers of the same name (compared case-insensitively), Vary tokens
+    are merged into the first Vary header, unless some Vary header already
+    lists them.
+
+    :param headers: response header name and value pairs
+    :type headers: List[Tuple[Union[str, bytes], Union[str, bytes]]]
+    :param cors: policy result, header dict or sequence of header pairs of
+                 the same type as response headers
+    :type cors: Union[Mapping[str, Any], Iterable[Tuple[Any, Any]]]
+    """
+    pending: Dict[Any, Tuple[Any, Any]] = {}
+    vary: Optional[Tuple[Any, Any]] = None
+    for name, value in _pairs(cors):
+        if isinstance(name, str):
+            value = str(value)
+        if _is_vary(name):
+            vary = (name, value)
+        else:
+            pending[name.lower()] = (name, value)
+    if not pending and vary is None:
+        return
+    vary_pos = None
+    kept = []
+    for name, value in headers:
+        key = name.lower()
+        if key in pending:
+            continue
+        if vary is not None and key in _VARY_NAMES:
+            if vary_pos is None:
+                vary_pos = len(kept)
+            if merge_vary(value, vary[1]) is value:
+                vary = None
+        kept.append((name, value))
+    kept.extend(pending.values())
+    headers[:] = kept
+    if vary is None:
+        return
+    if vary_pos is None:
+        headers.append(vary)
+    else:
+        name, value = headers[vary_pos]
+        headers[vary_pos] = (name, merge_vary(value, vary[1]))
+
+
+def apply_header_dict(headers: MutableMapping[str, Any], cors: CORSHeaders) -> None:
+    """Apply CORS headers to response header dict in place.
+
+    CORS headers replace entries with the same name compared
+    case-insensitively, so existing spelling of name is preserved. Vary
+    tokens are merged with existing Vary entry.
+
+    :param headers: response headers
+    :type headers: MutableMapping[str, Any]
+    :param cors: policy result, header dict or sequence of header pairs
+    :type cors: Union[Mapping[str, Any], Iterable[Tuple[Any, Any]]]
+    """
+    names = {name.lower(): name for name in headers}
+    for name, value in _pairs(cors):
+        existing = names.get(name.lower(), name)
+        if _is_vary(name) and existing in headers:
+            value = merge_vary(headers[existing], value)
+        headers[existing] = value
+
+
+def apply_multidict(headers: MultiDictLike, cors: CORSHeaders) -> None:
+    """Apply CORS headers to multidict-like response headers in place.
+
+    CORS headers replace all values of the same header, values are converted
+    to str. Vary tokens are merged with all existing Vary values, which are
+    replaced with single one only if some token was added.
+
+    :param headers: response headers
+    :type headers: MultiDictLike
+    :param cors: policy result, header dict or sequence of header pairs
+    :type cors: Union[Mapping[str, Any], Iterable[Tuple[Any, Any]]]
+    """
+    getall = getattr(headers, "getall", None)
+    for name, value in _pairs(cors):
+        if _is_vary(name):
+            if getall is not None:
+                values = getall(name, [])
+            else:
+                values = headers.getlist(name)  # type: ignore
+            if values:
+                current = ", ".join(values)
+                value = merge_vary(current, value)
+                if value is current:
+                    continue
+        headers[name] = str(value)
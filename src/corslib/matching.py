@@ -0,0 +1,634 @@
+import re
+import threading
+from array import array
+from bisect import bisect_left
+from heapq import heapify, heappop, heappush
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Pattern,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+from .origin import canonical_origin, canonical_pattern
+from .policy import OriginRule, RuleKind, _validate_frozen
+
+_COMBINABLE_FLAGS = re.UNICODE | OriginRule.REGEX_FLAGS
+
+_WILDCARD_SUBDOMAIN = re.compile(
+    r"([a-z][a-z0-9+.-]*)://\*((?:\.[\w-]+)+)(?::(\d+))?", re.ASCII
+)
+
+_REGEX_META = ".^$*+?{}[]|()\\"
+_GLOB_META = "*?[]"
+
+
+def _escaped(source: str, pos: int) -> bool:
+    # character at pos is escaped if preceded by odd number of backslashes
+    count = 0
+    while pos > count and source[pos - count - 1] == "\\":
+        count += 1
+    return count % 2 == 1
+
+
+def _char(source: str, pos: int) -> str:
+    return source[pos] if pos < len(source) else ""
+
+
+def _regex_prefix(source: str) -> str:
+    pos = 1 if source.startswith("^") else 0
+    prefix = []
+    while pos < len(source):
+        char = source[pos]
+        width = 1
+        if char == "\\":
+            char = _char(source, pos + 1)
+            if not char or char.isalnum():
+                break
+            width = 2
+        elif char in _REGEX_META:
+            break
+        follower = _char(source, pos + width)
+        if follower and follower in "*?{":
+            break
+        prefix.append(char)
+        if follower == "+":
+            break
+        pos += width
+    return "".join(prefix)
+
+
+def _regex_suffix(source: str) -> str:
+    if source.endswith("\\Z") and _escaped(source, len(source) - 1):
+        end = len(source) - 2
+    elif source.endswith("$") and not _escaped(source, len(source) - 1):
+        end = len(source) - 1
+    else:
+        return ""
+    suffix = []
+    while end > 0:
+        char = source[end - 1]
+        if _escaped(source, end - 1):
+            if char.isalnum():
+                break
+            end -= 2
+        elif char in _REGEX_META:
+            break
+        else:
+            end -= 1
+        suffix.append(char)
+    return "".join(reversed(suffix))
+
+
+def literal_affixes(rule: OriginRule) -> Tuple[str, str]:
+    """Find literal prefix and suffix of every origin that matches rule.
+
+    Analysis is conservative, affixes are empty when they can not be
+    determined (eg. for regular expressions with alternations or case
+    insensitive ones). Suffix of ``REGEX`` rule anchored with ``$`` holds
+    only for origins without line breaks.
+
+    :param rule: origin rule
+    :type rule: OriginRule
+    :return: literal prefix and suffix
+    :rtype: Tuple[str, str]
+    """
+    if rule.kind == RuleKind.STR:
+        origin = canonical_origin(rule.rule)
+        return origin, origin
+    if rule.kind == RuleKind.PATH:
+        pattern = canonical_pattern(rule.rule)
+        start = min((pattern.find(c) for c in _GLOB_META if c in pattern), default=-1)
+        if start < 0:
+            return pattern, pattern
+        end = max(pattern.rfind(c) for c in _GLOB_META) + 1
+        return pattern[:start], pattern[end:]
+    source = rule.rule
+    if "|" in source or rule.compile().flags & re.IGNORECASE:
+        return "", ""
+    return _regex_prefix(source), _regex_suffix(source)
+
+
+def disjoint(first: Tuple[str, str], second: Tuple[str, str]) -> bool:
+    """Check if no origin can match both rules, given their literal affixes.
+
+    :param first: literal prefix and suffix of first rule
+    :type first: Tuple[str, str]
+    :param second: literal prefix and suffix of second rule
+    :type second: Tuple[str, str]
+    :return: flag if rules are proven disjoint
+    :rtype: bool
+    """
+    (prefix, suffix), (other_prefix, other_suffix) = first, second
+    if not (prefix.startswith(other_prefix) or other_prefix.startswith(prefix)):
+        return True
+    return not (suffix.endswith(other_suffix) or other_suffix.endswith(suffix))
+
+
+class _SuffixIndex:
+    # positions of rules with the same literal prefix, by literal suffix
+    __slots__ = ("by_suffix", "reversed")
+
+    def __init__(self) -> None:
+        self.by_suffix: Dict[str, List[int]] = {}
+        self.reversed: List[Tuple[str, int]] = []
+
+    def add(self, suffix: str, pos: int) -> None:
+        self.by_suffix.setdefault(suffix, []).append(pos)
+        self.reversed.append((suffix[::-1], pos))
+
+    def overlapping(self, suffix: str) -> Iterator[int]:
+        # suffixes that given one ends with
+        for start in range(len(suffix) + 1):
+            yield from self.by_suffix.get(suffix[start:], ())
+        # suffixes that end with given one, sorted by reversed form
+        key = suffix[::-1]
+        for pos in range(bisect_left(self.reversed, (key,)), len(self.reversed)):
+            other, index = self.reversed[pos]
+            if not other.startswith(key):
+                break
+            yield index
+
+
+def overlapping_pairs(affixes: Sequence[Tuple[str, str]]) -> Set[Tuple[int, int]]:
+    """Find pairs of rules that are not proven :func:`disjoint`.
+
+    Rules are grouped by literal prefix and indexed by literal suffix within
+    group, so for each rule only groups with prefix that is its own prefix
+    are looked up and only overlapping rules are visited. Cost is
+    proportional to number of rules times length of affixes, plus number of
+    overlapping pairs.
+
+    :param affixes: literal prefix and suffix of rules
+    :type affixes: Sequence[Tuple[str, str]]
+    :return: pairs of positions ``(earlier, later)`` of overlapping rules
+    :rtype: Set[Tuple[int, int]]
+    """
+    groups: Dict[str, _SuffixIndex] = {}
+    for pos, (prefix, suffix) in enumerate(affixes):
+        groups.setdefault(prefix, _SuffixIndex()).add(suffix, pos)
+    for group in groups.values():
+        group.reversed.sort()
+    pairs = set()
+    for pos, (prefix, suffix) in enumerate(affixes):
+        # rules with longer prefix find this one as they look up their own
+        for end in range(len(prefix) + 1):
+            group = groups.get(prefix[:end])
+            if group is None:
+                continue
+            for other in group.overlapping(suffix):
+                if other != pos:
+                    pairs.add((min(pos, other), max(pos, other)))
+    return pairs
+
+
+class _TrieNode:
+    __slots__ = ("children", "index")
+
+    def __init__(self) -> None:
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.index: Optional[int] = None
+
+
+class SubdomainTrie:
+    """Index of ``PATH`` rules in wildcard subdomain form.
+
+    Rules like ``https://*.example.com`` or ``https://*.example.com:8443``
+    are stored in a trie of reversed domain labels, one trie per scheme and
+    port. Matching origin walks over its host labels once, no matter how
+    many rules are indexed, and yields the same result as matching
+    :func:`fnmatch.translate` patterns of these rules (wildcard matches any
+    number of labels, including empty one).
+
+    Use :meth:`key` to check if rule can be indexed.
+
+    :param rules: sequence of ``(index, rule)`` pairs of rules that can be
+                  indexed
+    :type rules: Sequence[Tuple[int, OriginRule]]
+    """
+
+    def __init__(self, rules: Sequence[Tuple[int, OriginRule]]):
+        self.roots: Dict[Tuple[str, str], _TrieNode] = {}
+        self.size = 0
+        for index, rule in rules:
+            key = self.key(rule)
+            if key is None:
+                raise ValueError(f"Rule can not be indexed: {rule.rule}")
+            scheme, port, labels = key
+            node = self.roots.setdefault((scheme, port), _TrieNode())
+            for label in reversed(labels):
+                node = node.children.setdefault(label, _TrieNode())
+            if node.index is None:
+                node.index = index
+            self.size += 1
+
+    def __len__(self) -> int:
+        return self.size
+
+    @staticmethod
+    def key(rule: OriginRule) -> Optional[Tuple[str, str, List[str]]]:
+        """Parse rule in wildcard subdomain form.
+
+        :param rule: origin rule
+        :type rule: OriginRule
+        :return: scheme, port (empty if not specified) and domain labels
+                 following wildcard, or None if rule has different form
+        :rtype: Optional[Tuple[str, str, List[str]]]
+        """
+        if rule.kind != RuleKind.PATH:
+            return None
+        m = _WILDCARD_SUBDOMAIN.fullmatch(canonical_pattern(rule.rule))
+        if m is None:
+            return None
+        return m.group(1), m.group(3) or "", m.group(2)[1:].split(".")
+
+    def match(self, origin: str) -> Optional[int]:
+        """Find first indexed rule that matches origin.
+
+        :param origin: value of the Origin request header in canonical form
+        :type origin: str
+        :return: index of matching rule in policy rules or None
+        :rtype: Optional[int]
+        """
+        scheme, sep, rest = origin.partition("://")
+        if not sep:
+            return None
+        host, sep, port = rest.rpartition(":")
+        if not (sep and port.isdigit()):
+            host, port = rest, ""
+        node = self.roots.get((scheme, port))
+        if node is None:
+            return None
+        labels = host.split(".")
+        found = None
+        # first label is never consumed, it's matched by wildcard
+        for pos in range(len(labels) - 1, 0, -1):
+            node = node.children.get(labels[pos])
+            if node is None:
+                break
+            if node.index is not None and (found is None or node.index < found):
+                found = node.index
+        return found
+
+
+class PatternSet:
+    """Combined matcher for ``PATH`` and ``REGEX`` rules.
+
+    Compiled rule patterns are joined into alternations that are tested in
+    one pass, alternatives are tried in order so the first alternative that
+    matches is the first matching rule. Each alternative is wrapped in its own
+    capturing group, which is then mapped back to rule position. Patterns that
+    can not be safely combined (these that define own groups, which could be
+    referenced by number, or use flags other than defaults) are kept as
+    separate segments, preserving overall order.
+
+    Cost of trying single alternative grows with number of capturing groups
+    in pattern, so combined alternations are limited to :attr:`CHUNK_SIZE`
+    rules each. If all rules could be combined then the whole set is
+    additionally checked first with single alternation without capturing
+    groups, so origins that match no rule are rejected in one pass.
+
+    :param rules: sequence of ``(index, rule)`` pairs in declaration order
+    :type rules: Sequence[Tuple[int, OriginRule]]
+    """
+
+    CHUNK_SIZE = 64
+
+    def __init__(self, rules: Sequence[Tuple[int, OriginRule]]):
+        self._build([(index, rule.compile()) for index, rule in rules])
+
+    def _build(self, patterns: Sequence[Tuple[int, Pattern[str]]]) -> None:
+        self.segments: List[Tuple[Pattern[str], Tuple[int, ...]]] = []
+        self.prefilter: Optional[Pattern[str]] = None
+        chunk: List[Tuple[int, Pattern[str]]] = []
+        sources = []
+        combinable = True
+        for index, pattern in patterns:
+            sources.append(pattern.pattern)
+            if pattern.groups or pattern.flags & ~_COMBINABLE_FLAGS:
+                self._add_segment(chunk)
+                self._add_segment([(index, pattern)])
+                chunk = []
+                combinable = False
+            else:
+                chunk.append((index, pattern))
+                if len(chunk) == self.CHUNK_SIZE:
+                    self._add_segment(chunk)
+                    chunk = []
+        self._add_segment(chunk)
+        if combinable and len(self.segments) > 1:
+            source = "|".join(f"(?:{source})" for source in sources)
+            try:
+                self.prefilter = re.compile(source, OriginRule.REGEX_FLAGS)
+            except re.error:  # pragma: nocover
+                pass
+
+    def __len__(self) -> int:
+        return sum(len(indexes) for _, indexes in self.segments)
+
+    def _add_segment(self, chunk: Sequence[Tuple[int, Pattern[str]]]) -> None:
+        if not chunk:
+            return
+        if len(chunk) == 1:
+            index, pattern = chunk[0]
+            self.segments.append((pattern, (index,)))
+            return
+        source = "|".join(f"({pattern.pattern})" for _, pattern in chunk)
+        try:
+            combined = re.compile(source, OriginRule.REGEX_FLAGS)
+        except re.error:  # pragma: nocover
+            for item in chunk:
+                self._add_segment([item])
+            return
+        self.segments.append((combined, tuple(index for index, _ in chunk)))
+
+    def match(self, origin: str) -> Optional[int]:
+        """Find first pattern rule that matches origin.
+
+        Special ``null`` origin never matches pattern rules.
+
+        :param origin: value of the Origin request header
+        :type origin: str
+        :return: index of matching rule in policy rules or None
+        :rtype: Optional[int]
+        """
+        if origin == "null":
+            return None
+        if self.prefilter is not None and self.prefilter.match(origin) is None:
+            return None
+        for pattern, indexes in self.segments:
+            m = pattern.match(origin)
+            if m is not None:
+                if len(indexes) == 1:
+                    return indexes[0]
+                return indexes[m.lastindex - 1]
+        return None
+
+    def lookup(self, origin: str) -> Optional[int]:
+        """Find first pattern rule that matches origin, without counting match.
+
+        Same as :meth:`match`, but never affects order of
+        :class:`AdaptivePatternSet`.
+
+        :param origin: value of the Origin request header
+        :type origin: str
+        :return: index of matching rule in policy rules or None
+        :rtype: Optional[int]
+        """
+        return PatternSet.match(self, origin)
+
+
+class AdaptivePatternSet(PatternSet):
+    """Pattern rule matcher that tries frequently matching rules first.
+
+    Matches are counted per rule and every :attr:`INTERVAL` matches rules
+    are reordered by descending count (halved afterwards, so order follows
+    recent traffic). Rule may be moved before rule declared earlier only if
+    both are proven :func:`disjoint` by their :func:`literal_affixes`, so
+    the first rule that matches in adaptive order is the first matching rule
+    in declaration order too. Rules that can not be proven disjoint keep
+    their relative order. Overlap analysis is done once at construction with
+    :func:`overlapping_pairs`, which compares only rules with compatible
+    affixes.
+
+    Rules are tried one by one, origins that match no rule are still
+    rejected by single pass over combined prefilter. Origins with line
+    breaks (that invalidate suffix analysis of ``REGEX`` rules) are matched
+    in declaration order.
+
+    Counting is not synchronized, concurrent matches may occasionally lose
+    count, which only affects ordering. Reordering is done by one thread at
+    a time and new order replaces old one atomically.
+
+    :param rules: sequence of ``(index, rule)`` pairs in declaration order
+    :type rules: Sequence[Tuple[int, OriginRule]]
+    """
+
+    INTERVAL = 1000
+
+    def __init__(self, rules: Sequence[Tuple[int, OriginRule]]):
+        self.patterns = [(index, rule.compile()) for index, rule in rules]
+        self._build(self.patterns)
+        affixes = [literal_affixes(rule) for _, rule in rules]
+        # positions of later rules that must stay after rule at position
+        self.successors: List[List[int]] = [[] for _ in affixes]
+        self.blockers = [0] * len(affixes)
+        for earlier, later in sorted(overlapping_pairs(affixes)):
+            self.successors[earlier].append(later)
+            self.blockers[later] += 1
+        self.order = tuple(range(len(self.patterns)))
+        self.counts = [0] * len(self.patterns)
+        self.matches = 0
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def match(self, origin: str) -> Optional[int]:
+        """Find first pattern rule that matches origin.
+
+        See :meth:`PatternSet.match`.
+        """
+        if origin == "null" or "\n" in origin:
+            return super().match(origin)
+        if self.prefilter is not None and self.prefilter.match(origin) is None:
+            return None
+        for pos in self.order:
+            index, pattern = self.patterns[pos]
+            if pattern.match(origin) is not None:
+                self.counts[pos] += 1
+                self.matches += 1
+                if self.matches >= self.INTERVAL:
+                    self.reorder()
+                return index
+        return None
+
+    def reorder(self) -> None:
+        """Order rules by match count, as far as overlapping rules allow."""
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            self.matches = 0
+            counts = self.counts
+            self.counts = [count // 2 for count in counts]
+            blockers = self.blockers.copy()
+            ready = [(-counts[pos], pos) for pos, n in enumerate(blockers) if not n]
+            heapify(ready)
+            order = []
+            while ready:
+                _, pos = heappop(ready)
+                order.append(pos)
+                for later in self.successors[pos]:
+                    blockers[later] -= 1
+                    if not blockers[later]:
+                        heappush(ready, (-counts[later], later))
+            self.order = tuple(order)
+        finally:
+            self._lock.release()
+
+    def hits(self) -> Dict[int, int]:
+        """Get match counts since last reordering.
+
+        :return: match counts by index of rule in policy rules
+        :rtype: Dict[int, int]
+        """
+        return {index: self.counts[pos] for pos, (index, _) in enumerate(self.patterns)}
+
+
+class OriginMatcher:
+    """Compiled form of policy origin rules.
+
+    Origins are matched in canonical form, as returned by memoized
+    :func:`~corslib.origin.canonical_origin`, so single hash lookup
+    identifies origin by its scheme, host and port.
+    Exact (:attr:`~corslib.policy.RuleKind.STR`) rules are stored in a hash
+    table that maps canonical rule to position of the first rule with that
+    value, while ``PATH`` rules in wildcard subdomain form are indexed in
+    :class:`SubdomainTrie` and all other pattern rules
+    (:attr:`~corslib.policy.RuleKind.PATH` and
+    :attr:`~corslib.policy.RuleKind.REGEX`) are combined in
+    :class:`PatternSet`.
+    Lookup returns the position of the first rule that matches origin, which
+    is exactly the rule that linear scan over the rules would stop at.
+    :meth:`match_many` does the same for many origins at once.
+
+    Matcher keeps rules in compact :class:`~corslib.policy.FrozenOriginRule`
+    form, it does not hold references to rule objects it was built from.
+    Frozen rules constructed without compiled pattern are not validated, so
+    they are validated by matcher like :class:`~corslib.policy.OriginRule`
+    objects are.
+
+    In adaptive mode general pattern rules are matched with
+    :class:`AdaptivePatternSet`, which tries frequently matching rules
+    first, with the same results.
+
+    :param rules: sequence of origin rules in order of declaration
+    :type rules: Sequence[OriginRule]
+    :param adaptive: reorder pattern rules by match frequency, defaults to
+                     False
+    :type adaptive: bool, optional
+    :raises InsecureRule: if frozen rule is insecure
+    """
+
+    def __init__(self, rules: Sequence[OriginRule], adaptive: bool = False):
+        _validate_frozen(rules)
+        self.rules = tuple(rule.frozen() for rule in rules)
+        self.exact: Dict[str, int] = {}
+        wildcards = []
+        patterns = []
+        for index, rule in enumerate(rules):
+            if rule.kind == RuleKind.STR:
+                self.exact.setdefault(canonical_origin(rule.rule), index)
+            elif SubdomainTrie.key(rule) is not None:
+                wildcards.append((index, rule))
+            else:
+                patterns.append((index, rule))
+        self.wildcards = SubdomainTrie(wildcards)
+        if adaptive:
+            self.patterns = AdaptivePatternSet(patterns)
+        else:
+            self.patterns = PatternSet(patterns)
+        self.first_pattern = min(
+            (rules[0][0] for rules in (wildcards, patterns) if rules), default=None
+        )
+        self.first_general = patterns[0][0] if patterns else None
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def match(self, origin: str) -> Optional[int]:
+        """Find first rule that matches origin.
+
+        :param origin: value of the Origin request header
+        :type origin: str
+        :return: index of matching rule in policy rules or None
+        :rtype: Optional[int]
+        """
+        return self._match(origin, self.patterns.match)
+
+    def lookup(self, origin: str) -> Optional[int]:
+        """Find first rule that matches origin, without counting match.
+
+        Same as :meth:`match`, but match is not counted by adaptive matcher,
+        eg. when origin is matched again to report statistics.
+
+        :param origin: value of the Origin request header
+        :type origin: str
+        :return: index of matching rule in policy rules or None
+        :rtype: Optional[int]
+        """
+        return self._match(origin, self.patterns.lookup)
+
+    def _match(
+        self, origin: str, match: Callable[[str], Optional[int]]
+    ) -> Optional[int]:
+        origin = canonical_origin(origin)
+        found = self.exact.get(origin)
+        index = self._match_patterns(origin, match)
+        if index is None or (found is not None and found < index):
+            return found
+        return index
+
+    def _match_patterns(
+        self, origin: str, match: Callable[[str], Optional[int]]
+    ) -> Optional[int]:
+        index = self.wildcards.match(origin) if self.wildcards else None
+        if self.first_general is None or (
+            index is not None and index < self.first_general
+        ):
+            return index
+        other = match(origin)
+        if other is None or (index is not None and index < other):
+            return index
+        return other
+
+    def match_many(self, origins: Sequence[str]) -> "array[int]":
+        """Find first rule that matches each of origins.
+
+        Origins are deduplicated in canonical form, exact rule matches are
+        found with single set intersection and pattern rules are tried only
+        on origins that could match rule declared before matching exact
+        rule.
+
+        :param origins: values of the Origin request header
+        :type origins: Sequence[str]
+        :return: array of indexes of matching rules in policy rules, ``-1``
+                 for origins that match no rule
+        :rtype: array[int]
+        """
+        unique = {origin: canonical_origin(origin) for origin in origins}
+        canonical = dict.fromkeys(unique.values())
+        found = {key: self.exact[key] for key in self.exact.keys() & canonical}
+        if self.first_pattern is not None:
+            for origin in canonical:
+                exact = found.get(origin)
+                if exact is not None and exact < self.first_pattern:
+                    continue
+                index = self._match_patterns(origin, self.patterns.match)
+                if index is not None and (exact is None or index < exact):
+                    found[origin] = index
+        return array("l", [found.get(unique[origin], -1) for origin in origins])
+
+    def allow_origin(self, origin: str) -> Optional[str]:
+        """Match origin against all rules.
+
+        :param origin: value of the Origin request header
+        :type origin: str
+        :return: allowed origin spec or None
+        :rtype: Optional[str]
+        """
+        if self.match(origin) is None:
+            return None
+        return origin
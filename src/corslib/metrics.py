@@ -0,0 +1,325 @@
+import bisect
+import threading
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:  # pragma: nocover
+    from .policy import Policy
+
+LabelValues = Tuple[str, ...]
+
+DEFAULT_BUCKETS = (
+    0.000001,
+    0.0000025,
+    0.000005,
+    0.00001,
+    0.000025,
+    0.00005,
+    0.0001,
+    0.00025,
+    0.001,
+    0.01,
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return f"{{{pairs}}}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric(ABC):
+    """Base class of metrics with labels.
+
+    :param name: metric name
+    :type name: str
+    :param documentation: help text
+    :type documentation: str
+    :param labelnames: names of labels, defaults to no labels
+    :type labelnames: Sequence[str], optional
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        """Iterate over metric samples.
+
+        :return: iterator of ``(name suffix, formatted labels, value)``
+        :rtype: Iterator[Tuple[str, str, float]]
+        """
+
+    def render(self) -> str:
+        """Render metric in Prometheus text exposition format.
+
+        :return: metric family text
+        :rtype: str
+        """
+        lines = [
+            f"# HELP {self.name} {_escape(self.documentation)}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        for suffix, labels, value in self.samples():
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class Counter(Metric):
+    """Monotonically increasing counter."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.values: Dict[LabelValues, float] = {}
+
+    def inc(self, labels: LabelValues = (), amount: float = 1) -> None:
+        """Increment counter.
+
+        :param labels: label values in order of label names
+        :type labels: Tuple[str, ...]
+        :param amount: increment, defaults to 1
+        :type amount: float, optional
+        """
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def get(self, labels: LabelValues = ()) -> float:
+        """Get current counter value.
+
+        :param labels: label values in order of label names
+        :type labels: Tuple[str, ...]
+        :return: counter value
+        :rtype: float
+        """
+        return self.values.get(labels, 0)
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        with self._lock:
+            items = sorted(self.values.items())
+        for labels, value in items:
+            yield "_total", _format_labels(self.labelnames, labels), value
+
+
+class Histogram(Metric):
+    """Histogram of observed values with cumulative buckets.
+
+    :param buckets: upper bounds of buckets, defaults to
+                    :data:`DEFAULT_BUCKETS`
+    :type buckets: Sequence[float], optional
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, labels: LabelValues = ()) -> None:
+        """Record observed value.
+
+        :param value: observed value
+        :type value: float
+        :param labels: label values in order of label names
+        :type labels: Tuple[str, ...]
+        """
+        pos = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self.values.get(labels)
+            if state is None:
+                # bucket counts, then overflow bucket, sum and count
+                state = self.values[labels] = [0] * (len(self.buckets) + 3)
+            state[pos] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self.values.items())
+        names = self.labelnames + ("le",)
+        for labels, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), state):
+                cumulative += count
+                yield "_bucket", _format_labels(
+                    names, labels + (_format_value(bound),)
+                ), cumulative
+            plain = _format_labels(self.labelnames, labels)
+            yield "_sum", plain, state[-2]
+            yield "_count", plain, state[-1]
+
+
+class MetricsRegistry:
+    """In-process collection of metrics."""
+
+    def __init__(self) -> None:
+        self.metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: Metric) -> Any:
+        with self._lock:
+            existing = self.metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or (
+                    existing.labelnames != metric.labelnames
+                ):
+                    raise ValueError(f"Metric {metric.name} already registered")
+                return existing
+            self.metrics[metric.name] = metric
+            return metric
+
+    def counter(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Counter:
+        """Get or create counter.
+
+        :param name: metric name
+        :type name: str
+        :param documentation: help text
+        :type documentation: str
+        :param labelnames: names of labels, defaults to no labels
+        :type labelnames: Sequence[str], optional
+        :return: registered counter
+        :rtype: Counter
+        """
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        """Get or create histogram.
+
+        :param name: metric name
+        :type name: str
+        :param documentation: help text
+        :type documentation: str
+        :param labelnames: names of labels, defaults to no labels
+        :type labelnames: Sequence[str], optional
+        :param buckets: upper bounds of buckets
+        :type buckets: Sequence[float], optional
+        :return: registered histogram
+        :rtype: Histogram
+        """
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """Render all metrics in Prometheus text exposition format.
+
+        :return: exposition text
+        :rtype: str
+        """
+        with self._lock:
+            metrics = [self.metrics[name] for name in sorted(self.metrics)]
+        return "".join(metric.render() for metric in metrics)
+
+
+REGISTRY = MetricsRegistry()
+
+
+class PolicyMetrics:
+    """Instrumentation of policy decisions.
+
+    Instance of this class assigned to :attr:`~corslib.policy.Policy.metrics`
+    is notified about every generated set of response headers. It counts
+    decisions per outcome (``allowed``, ``denied`` or ``no_origin``), origin
+    rule matches per rule position and records evaluation time. Counting rule
+    matches requires additional origin lookup (which is not counted by
+    adaptive matcher) so it may be turned off.
+
+    Instrumentation is entirely skipped when policy has no metrics set.
+
+    :param registry: registry to create metrics in, defaults to
+                     :data:`REGISTRY`
+    :type registry: Optional[MetricsRegistry]
+    :param rule_matches: count matches per origin rule, defaults to True
+    :type rule_matches: bool, optional
+    """
+
+    def __init__(
+        self, registry: Optional[MetricsRegistry] = None, *, rule_matches: bool = True
+    ):
+        if registry is None:
+            registry = REGISTRY
+        self.registry = registry
+        self.rule_matches = rule_matches
+        self.decisions = registry.counter(
+            "corslib_decisions",
+            "CORS decisions by policy, request kind and outcome.",
+            ("policy", "kind", "outcome"),
+        )
+        self.matches = registry.counter(
+            "corslib_rule_matches",
+            "Origin rule matches by policy and rule position.",
+            ("policy", "rule"),
+        )
+        self.latency = registry.histogram(
+            "corslib_evaluation_seconds",
+            "Time spent generating CORS headers.",
+            ("policy", "kind"),
+        )
+
+    def observe(
+        self,
+        policy: "Policy",
+        kind: str,
+        origin: Any,
+        headers: Any,
+        duration: float,
+    ) -> None:
+        """Record single decision.
+
+        :param policy: policy that made decision
+        :type policy: Policy
+        :param kind: ``preflight`` or ``response``
+        :type kind: str
+        :param origin: value of the Origin request header, str or bytes
+        :type origin: Any
+        :param headers: generated headers
+        :type headers: Any
+        :param duration: evaluation time in seconds
+        :type duration: float
+        """
+        if headers:
+            outcome = "allowed"
+        elif origin:
+            outcome = "denied"
+        else:
+            outcome = "no_origin"
+        self.decisions.inc((policy.name, kind, outcome))
+        self.latency.observe(duration, (policy.name, kind))
+        if outcome == "allowed" and self.rule_matches and policy.allow_origin:
+            if isinstance(origin, bytes):
+                origin = origin.decode("latin-1")
+            index = policy.matcher.lookup(origin)
+            if index is not None:
+                self.matches.inc((policy.name, str(index)))
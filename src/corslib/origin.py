@@ -0,0 +1,93 @@
+import re
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+DEFAULT_PORTS = {"http": 80, "https": 443, "ws": 80, "wss": 443}
+
+CACHE_SIZE = 4096
+
+_ORIGIN = re.compile(
+    r"([a-z][a-z0-9+.-]*)://(\[[0-9a-f:.]+\]|[^\s/?#@:\[\]\\]+)(?::([0-9]{1,5}))?",
+    re.IGNORECASE,
+)
+
+
+class Origin(NamedTuple):
+    """Parsed origin in canonical form.
+
+    Scheme and host are lowercase, default port of scheme is represented by
+    None.
+    """
+
+    scheme: str
+    host: str
+    port: Optional[int] = None
+
+    def __str__(self) -> str:
+        if self.port is None:
+            return f"{self.scheme}://{self.host}"
+        return f"{self.scheme}://{self.host}:{self.port}"
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_origin(origin: str) -> Optional[Origin]:
+    """Parse origin into canonical scheme, host and port.
+
+    Only tuple origins (``scheme://host[:port]``) are parsed, opaque
+    origins like ``null`` and malformed values (with path, user info, empty
+    or out of range port) are not. Results of recent calls are memoized.
+
+    :param origin: value of the Origin request header
+    :type origin: str
+    :return: parsed origin or None if origin is not a valid tuple origin
+    :rtype: Optional[Origin]
+    """
+    m = _ORIGIN.fullmatch(origin)
+    if m is None:
+        return None
+    scheme, host, port = m.group(1).lower(), m.group(2).lower(), m.group(3)
+    if port is None:
+        return Origin(scheme, host)
+    number = int(port)
+    if number > 65535:
+        return None
+    if number == DEFAULT_PORTS.get(scheme):
+        return Origin(scheme, host)
+    return Origin(scheme, host, number)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def canonical_origin(origin: str) -> str:
+    """Serialize origin in canonical form.
+
+    Values that can not be parsed are returned unchanged. Results of recent
+    calls are memoized.
+
+    :param origin: value of the Origin request header
+    :type origin: str
+    :return: origin with lowercase scheme and host and without default port
+    :rtype: str
+    """
+    parsed = parse_origin(origin)
+    if parsed is None:
+        return origin
+    return str(parsed)
+
+
+def canonical_pattern(pattern: str) -> str:
+    """Bring origin glob pattern to canonical form.
+
+    Pattern is lowercased and explicit default port of its scheme is
+    removed, so it matches canonical origins.
+
+    :param pattern: origin glob pattern
+    :type pattern: str
+    :return: canonical pattern
+    :rtype: str
+    """
+    pattern = pattern.lower()
+    scheme, sep, _ = pattern.partition("://")
+    port = DEFAULT_PORTS.get(scheme)
+    if sep and port is not None and pattern.endswith(f":{port}"):
+        pattern = pattern[: -len(str(port)) - 1]
+    return pattern
@@ -1,8 +1,31 @@
 import re
-from dataclasses import dataclass
+import time
+from dataclasses import dataclass, field
 from enum import Enum
-from fnmatch import fnmatch
-from typing import ClassVar, Mapping, Optional, Sequence, Union
+from fnmatch import translate
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    ClassVar,
+    Container,
+    Dict,
+    Iterable,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Pattern,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from .cache import CacheInfo, LRUCache
+from .origin import canonical_origin, canonical_pattern
+
+if TYPE_CHECKING:  # pragma: nocover
+    from .compiled import BatchResult, CompiledPolicy, HeaderTuples
+    from .matching import OriginMatcher
+    from .metrics import PolicyMetrics
 
 
 class PolicyError(ValueError):
@@ -47,6 +70,47 @@ class RuleKind(Enum):
     REGEX = "regex"
 
 
+_REGEX_FLAGS = re.DOTALL | re.MULTILINE
+
+
+def _compile_rule(rule: str, kind: RuleKind) -> Optional[Pattern[str]]:
+    if kind == RuleKind.REGEX:
+        return re.compile(rule, _REGEX_FLAGS)
+    if kind == RuleKind.PATH:
+        return re.compile(translate(canonical_pattern(rule)))
+    return None
+
+
+def _validate_rule(rule: str, kind: RuleKind) -> None:
+    kw = {"rule": rule, "rule_type": kind.value}
+    if kind == RuleKind.REGEX:
+        if not (rule.startswith("^") and rule.endswith("$")):
+            raise InsecureRule("Insecure rule: partial match regex", **kw)
+        if ".*" in rule:
+            raise InsecureRule("Insecure rule: too broad", **kw)
+    elif kind == RuleKind.PATH:
+        if rule.startswith("*") or rule.endswith("*"):
+            raise InsecureRule("InsecureRule: open ended", **kw)
+
+
+def _validate_frozen(rules: Iterable[Any]) -> None:
+    # rule objects and frozen rules with compiled pattern are validated when
+    # they are created
+    for rule in rules:
+        if not isinstance(rule, OriginRule) and getattr(rule, "compiled", None) is None:
+            _validate_rule(rule.rule, rule.kind)
+
+
+def _rule_matches(
+    rule: str, kind: RuleKind, pattern: Optional[Pattern[str]], request_origin: str
+) -> bool:
+    if kind == RuleKind.STR:
+        return canonical_origin(rule) == canonical_origin(request_origin)
+    if request_origin == "null":
+        return False
+    return pattern.match(canonical_origin(request_origin)) is not None
+
+
 @dataclass
 class OriginRule:
     """A rule for origin check.
@@ -57,26 +121,51 @@ class OriginRule:
     that matches origin specification from HTTP request against rule using
     appropriate procedure for selected kind.
 
+    Origins are compared in canonical form (see
+    :func:`~corslib.origin.canonical_origin`), with lowercase scheme and
+    host and without default port. ``PATH`` patterns are brought to the
+    same form, ``REGEX`` patterns have to be written for it. Values that are
+    not valid ``scheme://host[:port]`` origins are compared unchanged.
+
     :ivar rule: rule specification as string
     :vartype rule: str
     :ivar kind: kind of rule, determines matching against origin specification
                 provided in request headers
     :vartype kind: RuleKind
+    :ivar compiled: compiled regular expression for ``PATH`` and ``REGEX``
+                    rules, ``PATH`` patterns are translated to regular
+                    expressions with :func:`fnmatch.translate` after
+                    :func:`~corslib.origin.canonical_pattern`
+    :vartype compiled: Optional[Pattern[str]]
     """
 
     rule: str
     kind: RuleKind = RuleKind.STR
+    compiled: Optional[Pattern[str]] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+
+    REGEX_FLAGS: ClassVar[int] = _REGEX_FLAGS
 
     def __post_init__(self):
-        kw = {"rule": self.rule, "rule_type": self.kind.value}
-        if self.kind == RuleKind.REGEX:
-            if not (self.rule.startswith("^") and self.rule.endswith("$")):
-                raise InsecureRule("Insecure rule: partial match regex", **kw)
-            if ".*" in self.rule:
-                raise InsecureRule("Insecure rule: too broad", **kw)
-        elif self.kind == RuleKind.PATH:
-            if self.rule.startswith("*") or self.rule.endswith("*"):
-                raise InsecureRule("InsecureRule: open ended", **kw)
+        _validate_rule(self.rule, self.kind)
+        self.compiled = _compile_rule(self.rule, self.kind)
+
+    def compile(self) -> Optional[Pattern[str]]:  # noqa: A003
+        """Get compiled regular expression of pattern rule.
+
+        :return: compiled pattern or None for ``STR`` rule
+        :rtype: Optional[Pattern[str]]
+        """
+        return self.compiled
+
+    def frozen(self) -> "FrozenOriginRule":
+        """Get compact, immutable form of this rule.
+
+        :return: frozen rule
+        :rtype: FrozenOriginRule
+        """
+        return FrozenOriginRule(self.rule, self.kind, self.compiled)
 
     def allow_origin(self, request_origin: str) -> Optional[str]:
         """Match origin spec from request against rule.
@@ -94,13 +183,105 @@ class OriginRule:
         """
         if self.kind == RuleKind.STR:
             return self.rule
-        if request_origin != "null":
-            if self.kind == RuleKind.PATH and fnmatch(request_origin, self.rule):
-                return request_origin
-            if self.kind == RuleKind.REGEX and re.match(
-                self.rule, request_origin, re.DOTALL | re.MULTILINE
-            ):
-                return request_origin
+        if self.matches(request_origin):
+            return request_origin
+        return None
+
+    def matches(self, request_origin: str) -> bool:
+        """Check if origin spec from request matches rule.
+
+        :param request_origin: origin spec from request
+        :type request_origin: str
+        :return: flag if origin matches
+        :rtype: bool
+        """
+        return _rule_matches(self.rule, self.kind, self.compiled, request_origin)
+
+
+class FrozenOriginRule(NamedTuple):
+    """Compact, immutable and hashable form of :class:`OriginRule`.
+
+    Frozen rule is a plain tuple of rule specification, kind and compiled
+    pattern, without per-instance dictionary, so it's cheap to store and may
+    be used as dictionary key. Frozen rules compare equal and hash by
+    specification and kind only. Validated frozen rules are created with
+    :meth:`OriginRule.frozen` or :meth:`create` and may be used everywhere
+    in place of rule objects. Tuples constructed directly without compiled
+    pattern are not validated, so :class:`Policy` and
+    :class:`~corslib.matching.OriginMatcher` validate them instead, and their
+    patterns are compiled on each use.
+
+    :ivar rule: rule specification as string
+    :vartype rule: str
+    :ivar kind: kind of rule
+    :vartype kind: RuleKind
+    :ivar compiled: compiled regular expression for ``PATH`` and ``REGEX``
+                    rules, see :attr:`OriginRule.compiled`
+    :vartype compiled: Optional[Pattern[str]]
+    """
+
+    rule: str
+    kind: RuleKind = RuleKind.STR
+    compiled: Optional[Pattern[str]] = None
+
+    @classmethod
+    def create(cls, rule: str, kind: RuleKind = RuleKind.STR) -> "FrozenOriginRule":
+        """Validate rule and build its frozen form.
+
+        :param rule: rule specification as string
+        :type rule: str
+        :param kind: kind of rule, defaults to ``STR``
+        :type kind: RuleKind, optional
+        :raises InsecureRule: if rule is insecure
+        :return: frozen rule with compiled pattern
+        :rtype: FrozenOriginRule
+        """
+        _validate_rule(rule, kind)
+        return cls(rule, kind, _compile_rule(rule, kind))
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, FrozenOriginRule):
+            return NotImplemented
+        return self.rule == other.rule and self.kind == other.kind
+
+    def __ne__(self, other: Any) -> bool:
+        if not isinstance(other, FrozenOriginRule):
+            return NotImplemented
+        return not self == other
+
+    def __hash__(self) -> int:
+        return hash((self.rule, self.kind))
+
+    def compile(self) -> Optional[Pattern[str]]:  # noqa: A003
+        """Get compiled regular expression of pattern rule.
+
+        :return: compiled pattern or None for ``STR`` rule
+        :rtype: Optional[Pattern[str]]
+        """
+        if self.compiled is None:
+            return _compile_rule(self.rule, self.kind)
+        return self.compiled
+
+    def frozen(self) -> "FrozenOriginRule":
+        return self
+
+    def allow_origin(self, request_origin: str) -> Optional[str]:
+        """Match origin spec from request against rule.
+
+        See :meth:`OriginRule.allow_origin`.
+        """
+        if self.kind == RuleKind.STR:
+            return self.rule
+        if self.matches(request_origin):
+            return request_origin
+        return None
+
+    def matches(self, request_origin: str) -> bool:
+        """Check if origin spec from request matches rule.
+
+        See :meth:`OriginRule.matches`.
+        """
+        return _rule_matches(self.rule, self.kind, self.compile(), request_origin)
 
 
 @dataclass
@@ -116,9 +297,9 @@ class Policy:
     :ivar allow_credentials: allow credentialed requests, default is to not
                              allow
     :vartype allow_credentials: bool
-    :ivar allow_origin: optional sequence of OriginRule objects that will be
-                        checked to match client-provided origin in request
-                        headers
+    :ivar allow_origin: optional sequence of OriginRule (or FrozenOriginRule)
+                        objects that will be checked to match
+                        client-provided origin in request headers
     :vartype allow_origin: Optional[Sequence[OriginRule]]
     :ivar allow_headers: optional sequence of allowed HTTP request headers
     :vartype allow_headers: Optional[Sequence[str]]
@@ -130,6 +311,41 @@ class Policy:
     :ivar max_age: optional number of seconds that response may be cached by
                    client
     :vartype max_age: Optional[int]
+    :ivar cache_size: optional maximum number of memoized header sets, caching
+                      is disabled by default
+    :vartype cache_size: Optional[int]
+    :ivar cache_ttl: optional lifetime of memoized header sets in seconds
+    :vartype cache_ttl: Optional[float]
+    :ivar metrics: optional instrumentation notified about every decision,
+                   see :class:`~corslib.metrics.PolicyMetrics`
+    :vartype metrics: Optional[PolicyMetrics]
+    :ivar origin_allowlist: optional container of origins allowed in addition
+                            to :attr:`allow_origin` rules, checked by exact
+                            comparison after rules, eg.
+                            :class:`~corslib.allowlist.MappedAllowlist` or
+                            :class:`~corslib.resolver.OriginResolver`
+    :vartype origin_allowlist: Optional[Container[str]]
+    :ivar enforce: reject preflight requests for methods or headers that are
+                   not allowed (only simple methods if :attr:`allow_methods`
+                   is not set), instead of listing allowed ones and leaving
+                   decision to client, default is to not enforce
+    :vartype enforce: bool
+    :ivar adaptive: try pattern rules that match most often first, see
+                    :class:`~corslib.matching.AdaptivePatternSet`, default is
+                    to try them in order of declaration
+    :vartype adaptive: bool
+
+    Policy is compiled to :class:`~corslib.compiled.CompiledPolicy` on first
+    use and response headers are generated by compiled form. Assigning any
+    attribute resets compiled state, but in-place modification of rule
+    sequence requires explicit call to
+    :meth:`~corslib.policy.Policy.invalidate`. Same applies to decision cache
+    enabled with :attr:`cache_size`.
+
+    Pickled policy retains its compiled form, but not cached decisions and
+    metrics. Unpickling skips validation of rules and building of matcher
+    indexes, but regular expressions (of rules and combined ones) are
+    compiled again by :mod:`re`.
     """
 
     name: str
@@ -139,6 +355,12 @@ class Policy:
     allow_methods: Optional[Sequence[str]] = None
     expose_headers: Optional[Sequence[str]] = None
     max_age: Optional[int] = None
+    cache_size: Optional[int] = field(default=None, compare=False)
+    cache_ttl: Optional[float] = field(default=None, compare=False)
+    metrics: Optional["PolicyMetrics"] = field(default=None, compare=False, repr=False)
+    origin_allowlist: Optional[Container[str]] = None
+    enforce: bool = False
+    adaptive: bool = False
 
     ACCESS_CONTROL_ALLOW_ORIGIN: ClassVar[str] = "Access-Control-Allow-Origin"
     ACCESS_CONTROL_ALLOW_CREDENTIALS: ClassVar[str] = "Access-Control-Allow-Credentials"
@@ -155,14 +377,118 @@ class Policy:
     ]
 
     def __post_init__(self):
+        _validate_frozen(self.allow_origin or [])
         if self.allow_credentials:
-            allow_any = not self.allow_origin or any(
+            allowlist = self.origin_allowlist
+            if allowlist is None:
+                allow_any = not self.allow_origin
+            else:
+                allow_any = "*" in allowlist or "null" in allowlist
+            allow_any = allow_any or any(
                 r.rule in ["*", "null"]
-                for r in self.allow_origin
+                for r in self.allow_origin or []
                 if r.kind == RuleKind.STR
             )
             if allow_any:
                 raise PolicyError("Open policy not allowed for credentialed requests")
+        self.invalidate()
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        super().__setattr__(name, value)
+        if not name.startswith("_"):
+            self.invalidate()
+
+    def invalidate(self) -> None:
+        """Drop compiled state and cached decisions."""
+        self._compiled: Optional["CompiledPolicy"] = None
+        cache = getattr(self, "_cache", None)
+        if not self.cache_size:
+            cache = None
+        elif (
+            cache is None
+            or cache.maxsize != self.cache_size
+            or cache.ttl != self.cache_ttl
+        ):
+            cache = LRUCache(self.cache_size, ttl=self.cache_ttl)
+        else:
+            cache.clear()
+        self._cache: Optional[LRUCache] = cache
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        state["_cache"] = None
+        state["metrics"] = None
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        if self.cache_size:
+            self.__dict__["_cache"] = LRUCache(self.cache_size, ttl=self.cache_ttl)
+
+    def cache_info(self) -> Optional[CacheInfo]:
+        """Get decision cache statistics.
+
+        :return: cache statistics or None if caching is disabled
+        :rtype: Optional[CacheInfo]
+        """
+        if self._cache is None:
+            return None
+        return self._cache.info()
+
+    def compile(self) -> "CompiledPolicy":  # noqa: A003
+        """Build immutable compiled form of this policy.
+
+        :return: compiled policy
+        :rtype: CompiledPolicy
+        """
+        from .compiled import CompiledPolicy
+
+        return CompiledPolicy(self)
+
+    @property
+    def compiled(self) -> "CompiledPolicy":
+        """Compiled form of this policy, built on first use.
+
+        :return: compiled policy
+        :rtype: CompiledPolicy
+        """
+        compiled = self._compiled
+        if compiled is None:
+            compiled = self._compiled = self.compile()
+        return compiled
+
+    @property
+    def matcher(self) -> "OriginMatcher":
+        """Compiled origin rules.
+
+        :return: origin matcher built from :attr:`allow_origin`
+        :rtype: OriginMatcher
+        """
+        return self.compiled.matcher
+
+    def evaluate_many(
+        self, origins: Iterable[str], *, processes: Optional[int] = None
+    ) -> "BatchResult":
+        """Check many origins at once.
+
+        This is meant for offline jobs (audits, configuration validation)
+        that check large number of origins, it does not use decision cache
+        nor report to metrics. Duplicate origins are evaluated once.
+
+        :param origins: origins to check
+        :type origins: Iterable[str]
+        :param processes: optional number of worker processes that very large
+                          batches (of at least
+                          :attr:`~corslib.compiled.CompiledPolicy.PARALLEL_THRESHOLD`
+                          origins) are split between, ignored when
+                          :attr:`origin_allowlist` is
+                          :class:`~corslib.resolver.OriginResolver`,
+                          defaults to None
+        :type processes: Optional[int]
+        :return: allowed flag and matched rule index for each origin
+        :rtype: BatchResult
+        """
+        return self.compiled.evaluate_many(origins, processes=processes)
 
     def preflight_response_headers(
         self,
@@ -184,6 +510,10 @@ class Policy:
         adapted to framework/library specific implementation of HTTP headers
         structure.
 
+        If origin is not allowed by policy then returned dict is empty. In
+        enforcing mode (see :attr:`enforce`) it's empty also if requested
+        method or any of requested headers is not allowed.
+
         :param origin: value of the Origin request header
         :type origin: str
         :param strict: flag if strict security has to be applied, effectively
@@ -199,20 +529,17 @@ class Policy:
         :return: generated header values as Python dict
         :rtype: Mapping[str, Union[str, int]]
         """
-        if not origin or (strict and origin.lower() == "null"):
-            return {}
-        resp_headers = {}
-        resp_headers.update(self.access_control_allow_origin(origin))
-        resp_headers.update(self.access_control_allow_headers(request_headers))
-        resp_headers.update(self.access_control_allow_methods(request_method))
-        resp_headers.update(
-            self.access_control_allow_credentials(
-                request_credentials, resp_headers[self.ACCESS_CONTROL_ALLOW_ORIGIN]
-            )
+        resp_headers = self._cached(
+            "preflight_response_headers",
+            origin,
+            strict,
+            request_credentials,
+            request_method,
+            request_headers,
         )
-        if self.max_age:
-            resp_headers["Access-Control-Max-Age"] = self.max_age
-        return resp_headers
+        if self._cache is None:
+            return resp_headers
+        return dict(resp_headers)
 
     def response_headers(
         self,
@@ -234,16 +561,99 @@ class Policy:
         :return: generated header values as Python dict
         :rtype: Mapping[str, str]
         """
-        if not origin or (strict and origin.lower() == "null"):
-            return {}
-        resp_headers = {}
-        resp_headers.update(self.access_control_allow_origin(origin))
-        resp_headers.update(
-            self.access_control_allow_credentials(
-                request_credentials, resp_headers[self.ACCESS_CONTROL_ALLOW_ORIGIN]
-            )
+        resp_headers = self._cached(
+            "response_headers", origin, strict, request_credentials
         )
-        return resp_headers
+        if self._cache is None:
+            return resp_headers
+        return dict(resp_headers)
+
+    def preflight_response_header_list(
+        self,
+        origin: bytes,
+        *,
+        strict: bool = False,
+        request_credentials: bool = False,
+        request_method: Optional[bytes] = None,
+        request_headers: Optional[bytes] = None,
+    ) -> "HeaderTuples":
+        """Generate preflight response headers from raw request values.
+
+        This is the bytes counterpart of :meth:`preflight_response_headers`
+        meant for servers that operate on encoded headers. Returned value is
+        a tuple of ``(name, value)`` pairs, with header names lowercased,
+        ready to be sent. Entries that do not depend on request are encoded
+        once and shared between results.
+
+        :param origin: raw value of the Origin request header
+        :type origin: bytes
+        :param strict: flag if strict security has to be applied, effectively
+                       treating ``null`` origin as ``*``, defaults to False
+        :type strict: bool, optional
+        :param request_credentials: indicates response to credentialed
+                                    request, defaults to False
+        :type request_credentials: bool, optional
+        :param request_method: raw requested HTTP method, defaults to None
+        :type request_method: bytes, optional
+        :param request_headers: raw requested HTTP headers, defaults to None
+        :type request_headers: bytes, optional
+        :return: encoded header name and value pairs
+        :rtype: Tuple[Tuple[bytes, bytes], ...]
+        """
+        return self._cached(
+            "preflight_response_header_list",
+            origin,
+            strict,
+            request_credentials,
+            request_method,
+            request_headers,
+        )
+
+    def response_header_list(
+        self,
+        origin: bytes,
+        *,
+        strict: bool = False,
+        request_credentials: bool = False,
+    ) -> "HeaderTuples":
+        """Generate regular response headers from raw request values.
+
+        This is the bytes counterpart of :meth:`response_headers`, see
+        :meth:`preflight_response_header_list` for description of returned
+        value.
+
+        :param origin: raw value of the Origin request header
+        :type origin: bytes
+        :param strict: flag if strict security has to be applied, effectively
+                       treating ``null`` origin as ``*``, defaults to False
+        :type strict: bool, optional
+        :param request_credentials: indicates response to credentialed
+                                    request, defaults to False
+        :type request_credentials: bool, optional
+        :return: encoded header name and value pairs
+        :rtype: Tuple[Tuple[bytes, bytes], ...]
+        """
+        return self._cached("response_header_list", origin, strict, request_credentials)
+
+    def _cached(self, method: str, *args: Any) -> Any:
+        if self.metrics is not None:
+            started = time.perf_counter()
+            value = self._lookup(method, args)
+            kind = "preflight" if method.startswith("preflight") else "response"
+            duration = time.perf_counter() - started
+            self.metrics.observe(self, kind, args[0], value, duration)
+            return value
+        return self._lookup(method, args)
+
+    def _lookup(self, method: str, args: Tuple[Any, ...]) -> Any:
+        if self._cache is None:
+            return getattr(self.compiled, method)(*args)
+        key = (method,) + args
+        value = self._cache.get(key)
+        if value is None:
+            value = getattr(self.compiled, method)(*args)
+            self._cache.set(key, value)
+        return value
 
     def access_control_allow_credentials(
         self, request_credentials: bool, allow_origin: str
@@ -281,17 +691,13 @@ class Policy:
                  Vary header entry
         :rtype: Mapping[str, str]
         """
-        if self.allow_origin:
-            headers = {}
-            for rule in self.allow_origin:
-                allow_origin = rule.allow_origin(origin)
-                if origin == allow_origin:
-                    headers[self.ACCESS_CONTROL_ALLOW_ORIGIN] = allow_origin
-                    if allow_origin not in ["*", "null"]:
-                        headers["Vary"] = "Origin"
-                    break
-            return headers
-        return {self.ACCESS_CONTROL_ALLOW_ORIGIN: "*"}
+        allow_origin = self.compiled.allow_origin(origin)
+        if allow_origin is None:
+            return {}
+        headers = {self.ACCESS_CONTROL_ALLOW_ORIGIN: allow_origin}
+        if allow_origin not in ["*", "null"]:
+            headers["Vary"] = "Origin"
+        return headers
 
     def access_control_allow_methods(
         self, request_method: Optional[str]
@@ -305,6 +711,9 @@ class Policy:
         reflected but only if it's in a list of *simple methods*. Otherwise
         list of *simple methods* is returned.
 
+        In enforcing mode empty dict is returned also if requested method is
+        not allowed.
+
         :param request_method: value of Access-Control-Request-Method header
                                from preflight request
         :type request_method: Optional[str]
@@ -313,6 +722,8 @@ class Policy:
         """
         if not request_method:
             return {}
+        if self.enforce and not self.compiled.allows_method(request_method):
+            return {}
         if self.allow_methods:
             methods = self.allow_methods
         else:
@@ -332,6 +743,9 @@ class Policy:
         If policy does not specify allowed headers then all headers are
         allowed. This is implemented by reflecting requested headers.
 
+        In enforcing mode empty dict is returned also if any of requested
+        headers is not allowed.
+
         :param request_headers: value of Access-Control-Request-Headers header
                                 from preflight request
         :type request_headers: Optional[str]
@@ -340,6 +754,8 @@ class Policy:
         """
         if not request_headers:
             return {}
+        if self.enforce and not self.compiled.allows_headers(request_headers):
+            return {}
         if self.allow_headers:
             headers = self.allow_headers
         else:
@@ -0,0 +1,162 @@
+import time
+from functools import lru_cache
+from typing import NamedTuple, Optional, Tuple
+
+from .cache import CacheInfo
+from .compiled import CompiledPolicy, HeaderTuples
+from .policy import Policy
+
+STATUS = 204
+STATUS_LINE = b"HTTP/1.1 204 No Content\r\n"
+
+
+class PreflightResponse(NamedTuple):
+    """Complete, pre-rendered response to preflight request.
+
+    :ivar headers: encoded header name (lowercased) and value pairs, eg. for
+                   ASGI ``http.response.start`` message
+    :vartype headers: Tuple[Tuple[bytes, bytes], ...]
+    :ivar str_headers: decoded header name and value pairs, eg. for WSGI
+                       ``start_response``
+    :vartype str_headers: Tuple[Tuple[str, str], ...]
+    :ivar raw: HTTP/1.1 status line and header block, ready to be written
+               to connection
+    :vartype raw: bytes
+    """
+
+    headers: HeaderTuples
+    str_headers: Tuple[Tuple[str, str], ...]
+    raw: bytes
+
+    @property
+    def status(self) -> int:
+        return STATUS
+
+    @classmethod
+    def render(cls, headers: HeaderTuples) -> "PreflightResponse":
+        """Render response with headers.
+
+        :param headers: encoded header name and value pairs
+        :type headers: Tuple[Tuple[bytes, bytes], ...]
+        :return: rendered response
+        :rtype: PreflightResponse
+        """
+        lines = [STATUS_LINE]
+        lines.extend(b"%s: %s\r\n" % header for header in headers)
+        lines.append(b"\r\n")
+        str_headers = tuple(
+            (name.decode("latin-1"), value.decode("latin-1")) for name, value in headers
+        )
+        return cls(headers, str_headers, b"".join(lines))
+
+
+def _render(
+    compiled: CompiledPolicy,
+    origin: bytes,
+    strict: bool,
+    request_credentials: bool,
+    request_method: Optional[bytes],
+    request_headers: Optional[bytes],
+    epoch: int,
+) -> PreflightResponse:
+    headers = compiled.preflight_response_header_list(
+        origin, strict, request_credentials, request_method, request_headers
+    )
+    return PreflightResponse.render(headers)
+
+
+class PreflightResponder:
+    """Responder that caches complete responses to preflight requests.
+
+    Response to preflight request depends only on policy and CORS headers of
+    request, so it is rendered once (see :class:`PreflightResponse`) and
+    kept in size bounded LRU cache (:func:`functools.lru_cache`, which needs
+    no lock in Python code) keyed by compiled policy and raw request values.
+    Repeated preflight requests cost single hash lookup.
+
+    Compiled policy is part of cache key, so single responder may serve many
+    policies and changing policy attributes never serves stale responses.
+    Policies with unhashable origin allowlist are not cached. Like with
+    policy decision cache, ``ttl`` should be set when origin allowlist
+    changes over time (eg. :class:`~corslib.resolver.OriginResolver`),
+    responses are then cached in time windows of ``ttl`` seconds. Responses
+    are rendered by compiled policy directly, without policy decision cache
+    and :attr:`~corslib.policy.Policy.metrics`.
+
+    :param maxsize: maximum number of cached responses, defaults to 4096
+    :type maxsize: int, optional
+    :param ttl: optional lifetime of cached responses in seconds
+    :type ttl: Optional[float]
+    """
+
+    def __init__(self, maxsize: int = 4096, *, ttl: Optional[float] = None):
+        if maxsize < 1:
+            raise ValueError("Cache size must be positive")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._render = lru_cache(maxsize=maxsize)(_render)
+
+    def respond(
+        self,
+        policy: Policy,
+        origin: bytes,
+        *,
+        strict: bool = False,
+        request_credentials: bool = False,
+        request_method: Optional[bytes] = None,
+        request_headers: Optional[bytes] = None,
+    ) -> PreflightResponse:
+        """Get response to preflight request.
+
+        Arguments are the same as of
+        :meth:`~corslib.policy.Policy.preflight_response_header_list`.
+
+        :param policy: policy to be applied
+        :type policy: Policy
+        :param origin: raw value of the Origin request header
+        :type origin: bytes
+        :param strict: flag if strict security has to be applied, defaults to
+                       False
+        :type strict: bool, optional
+        :param request_credentials: indicates response to credentialed
+                                    request, defaults to False
+        :type request_credentials: bool, optional
+        :param request_method: raw requested HTTP method, defaults to None
+        :type request_method: bytes, optional
+        :param request_headers: raw requested HTTP headers, defaults to None
+        :type request_headers: bytes, optional
+        :return: rendered response
+        :rtype: PreflightResponse
+        """
+        epoch = 0 if self.ttl is None else int(time.monotonic() // self.ttl)
+        compiled = policy.compiled
+        args = (
+            compiled,
+            origin,
+            strict,
+            request_credentials,
+            request_method,
+            request_headers,
+            epoch,
+        )
+        try:
+            hash(compiled)
+        except TypeError:
+            # compiled policy with unhashable origin allowlist
+            return _render(*args)
+        return self._render(*args)
+
+    def clear(self) -> None:
+        """Drop all cached responses and reset statistics."""
+        self._render.cache_clear()
+
+    def cache_info(self) -> CacheInfo:
+        """Get cache statistics.
+
+        :return: statistics snapshot
+        :rtype: CacheInfo
+        """
+        info = self._render.cache_info()
+        # every miss stores new response
+        evictions = max(info.misses - info.currsize, 0)
+        return CacheInfo(info.hits, info.misses, evictions, info.currsize, self.maxsize)
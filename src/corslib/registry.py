@@ -0,0 +1,185 @@
+from typing import Dict, Iterator, Optional, Tuple
+
+from .policy import Policy
+
+try:
+    from typing import Protocol
+except ImportError:  # pragma: nocover
+    Protocol = object
+
+
+class PolicyResolver(Protocol):
+    """Interface of objects that provide policy for request."""
+
+    def resolve(self, path: str, host: Optional[str] = None) -> Optional[Policy]:
+        """Find policy for request."""
+
+
+class _Node:
+    __slots__ = ("edges", "policy")
+
+    def __init__(self) -> None:
+        self.edges: Dict[str, Tuple[str, "_Node"]] = {}
+        self.policy: Optional[Policy] = None
+
+
+def _common_prefix_length(a: str, b: str) -> int:
+    length = min(len(a), len(b))
+    for i in range(length):
+        if a[i] != b[i]:
+            return i
+    return length
+
+
+class RadixTree:
+    """Radix tree mapping string prefixes to policies.
+
+    Lookup returns policy registered for the longest prefix of key and takes
+    time proportional to key length, no matter how many prefixes are
+    registered.
+    """
+
+    def __init__(self) -> None:
+        self.root = _Node()
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def insert(self, prefix: str, policy: Policy) -> None:
+        """Register policy for prefix, replacing any previous registration.
+
+        :param prefix: key prefix
+        :type prefix: str
+        :param policy: policy to be registered
+        :type policy: Policy
+        """
+        node = self.root
+        rest = prefix
+        while rest:
+            edge = node.edges.get(rest[0])
+            if edge is None:
+                child = _Node()
+                node.edges[rest[0]] = (rest, child)
+                node, rest = child, ""
+                break
+            label, child = edge
+            common = _common_prefix_length(label, rest)
+            if common < len(label):
+                middle = _Node()
+                middle.edges[label[common]] = (label[common:], child)
+                node.edges[rest[0]] = (label[:common], middle)
+                child = middle
+            node, rest = child, rest[common:]
+        if node.policy is None:
+            self.size += 1
+        node.policy = policy
+
+    def longest_prefix(self, key: str) -> Optional[Policy]:
+        """Find policy registered for the longest prefix of key.
+
+        :param key: lookup key
+        :type key: str
+        :return: matching policy or None
+        :rtype: Optional[Policy]
+        """
+        node = self.root
+        found = node.policy
+        pos = 0
+        while pos < len(key):
+            edge = node.edges.get(key[pos])
+            if edge is None:
+                break
+            label, node = edge
+            if not key.startswith(label, pos):
+                break
+            pos += len(label)
+            if node.policy is not None:
+                found = node.policy
+        return found
+
+    def items(self) -> Iterator[Tuple[str, Policy]]:
+        """Iterate over registered prefixes and policies.
+
+        :return: iterator of ``(prefix, policy)`` pairs
+        :rtype: Iterator[Tuple[str, Policy]]
+        """
+        stack = [("", self.root)]
+        while stack:
+            prefix, node = stack.pop()
+            if node.policy is not None:
+                yield prefix, node.policy
+            for label, child in node.edges.values():
+                stack.append((prefix + label, child))
+
+
+def _strip_port(host: str) -> str:
+    name, sep, port = host.rpartition(":")
+    if sep and port.isdigit() and not name.endswith(":"):
+        return name
+    return host
+
+
+class PolicyRegistry:
+    """Collection of policies routed by URL path prefix and host name.
+
+    Policies are registered for path prefixes, optionally limited to single
+    host name. Resolving policy for request selects the longest registered
+    prefix of request path, first among policies registered for request host
+    and then among these registered for any host. Path prefixes are matched
+    as plain strings, so prefix ``/api`` matches also ``/apis``; use
+    ``/api/`` to restrict match to path segment.
+
+    Registry may be passed to middleware adapters in place of single policy.
+
+    :param default: policy used when no registered prefix matches, defaults
+                    to None
+    :type default: Optional[Policy]
+    """
+
+    def __init__(self, default: Optional[Policy] = None):
+        self.default = default
+        self.any_host = RadixTree()
+        self.hosts: Dict[str, RadixTree] = {}
+
+    def __len__(self) -> int:
+        return len(self.any_host) + sum(len(tree) for tree in self.hosts.values())
+
+    def register(self, prefix: str, policy: Policy, *, host: Optional[str] = None):
+        """Register policy for path prefix.
+
+        :param prefix: URL path prefix
+        :type prefix: str
+        :param policy: policy to be applied to matching requests
+        :type policy: Policy
+        :param host: optional host name that policy is limited to, defaults to
+                     None
+        :type host: Optional[str]
+        """
+        if host is None:
+            tree = self.any_host
+        else:
+            tree = self.hosts.setdefault(_strip_port(host.lower()), RadixTree())
+        tree.insert(prefix, policy)
+
+    def resolve(self, path: str, host: Optional[str] = None) -> Optional[Policy]:
+        """Find policy for request.
+
+        :param path: request URL path
+        :type path: str
+        :param host: optional request host name (value of Host header),
+                     defaults to None
+        :type host: Optional[str]
+        :return: matching policy, default policy or None
+        :rtype: Optional[Policy]
+        """
+        if host and self.hosts:
+            tree = self.hosts.get(_strip_port(host.lower()))
+            if tree is not None:
+                policy = tree.longest_prefix(path)
+                if policy is not None:
+                    return policy
+        policy = self.any_host.longest_prefix(path)
+        if policy is None:
+            return self.default
+        return policy
@@ -0,0 +1,251 @@
+import logging
+import os
+import signal
+import threading
+from types import MappingProxyType
+from typing import Callable, Mapping, Optional, Tuple
+
+from .config import Policies, load_policies
+from .policy import Policy
+
+log = logging.getLogger(__name__)
+
+Loader = Callable[[], Policies]
+
+
+def _same_config(old: Policy, new: Policy) -> bool:
+    return (
+        old == new
+        and old.cache_size == new.cache_size
+        and old.cache_ttl == new.cache_ttl
+    )
+
+
+class PolicyHolder:
+    """Container of policies that can be replaced while requests are served.
+
+    Current set of policies is kept as single read-only mapping that is
+    replaced as a whole, so readers never take locks and always see either
+    old or new set, never a mix of both. Replacement is serialized between
+    writers, and reloads are serialized as a whole, from loading to
+    publishing, so that the last published set is built from the newest
+    configuration.
+
+    Policies are compiled before they are published. Policies with
+    unchanged configuration are carried over from previous set together
+    with their compiled form and decision cache, metrics of replaced
+    policies are transferred to their successors.
+
+    :param policies: initial policies by name
+    :type policies: Dict[str, Policy]
+    :param loader: optional callable that builds new policies, used by
+                   :meth:`reload`
+    :type loader: Optional[Callable[[], Dict[str, Policy]]]
+    """
+
+    def __init__(self, policies: Policies, *, loader: Optional[Loader] = None):
+        self.loader = loader
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._policies: Mapping[str, Policy] = MappingProxyType({})
+        self.swap(policies)
+
+    @classmethod
+    def from_config(cls, path: str, *, snapshot: Optional[str] = None):
+        """Create holder with policies loaded from configuration file.
+
+        See :func:`~corslib.config.load_policies` for arguments.
+
+        :return: policy holder that reloads from the same file
+        :rtype: PolicyHolder
+        """
+
+        def loader() -> Policies:
+            return load_policies(path, snapshot=snapshot)
+
+        return cls(loader(), loader=loader)
+
+    @property
+    def policies(self) -> Mapping[str, Policy]:
+        """Current policies by name.
+
+        :return: read-only mapping of policies
+        :rtype: Mapping[str, Policy]
+        """
+        return self._policies
+
+    def get(self, name: str) -> Optional[Policy]:
+        """Get current policy by name.
+
+        :param name: policy name
+        :type name: str
+        :return: policy or None if there's no such policy
+        :rtype: Optional[Policy]
+        """
+        return self._policies.get(name)
+
+    def __getitem__(self, name: str) -> Policy:
+        return self._policies[name]
+
+    def resolver(self, name: str) -> "NamedPolicy":
+        """Create policy resolver for use with middleware adapters.
+
+        :param name: policy name
+        :type name: str
+        :return: resolver that always returns current policy with this name
+        :rtype: NamedPolicy
+        """
+        return NamedPolicy(self, name)
+
+    def swap(self, policies: Policies) -> Mapping[str, Policy]:
+        """Replace current policies.
+
+        :param policies: new policies by name
+        :type policies: Dict[str, Policy]
+        :return: previous policies
+        :rtype: Mapping[str, Policy]
+        """
+        with self._lock:
+            old = self._policies
+            new = {}
+            for name, policy in policies.items():
+                previous = old.get(name)
+                if previous is not None and _same_config(previous, policy):
+                    policy = previous
+                else:
+                    if previous is not None and policy.metrics is None:
+                        policy.metrics = previous.metrics
+                    policy.compiled
+                new[name] = policy
+            self._policies = MappingProxyType(new)
+        return old
+
+    def reload(self) -> bool:
+        """Rebuild policies with loader and replace current ones.
+
+        Errors raised by loader are logged and current policies are kept.
+        Reload that starts while another one is running waits for it to
+        finish.
+
+        :return: flag if policies have been replaced
+        :rtype: bool
+        """
+        if self.loader is None:
+            raise RuntimeError("Policy holder has no loader")
+        with self._reload_lock:
+            try:
+                policies = self.loader()
+            except Exception:
+                log.exception("Policy reload failed, keeping current policies")
+                return False
+            self.swap(policies)
+        return True
+
+    def watch(self, path: str, *, interval: float = 1.0) -> "FileWatcher":
+        """Start background thread that reloads policies when file changes.
+
+        :param path: path of file to watch
+        :type path: str
+        :param interval: polling interval in seconds, defaults to 1.0
+        :type interval: float, optional
+        :return: started watcher
+        :rtype: FileWatcher
+        """
+        watcher = FileWatcher(path, self.reload, interval=interval)
+        watcher.start()
+        return watcher
+
+    def install_signal_handler(self, signum: int = signal.SIGHUP) -> None:
+        """Reload policies upon receiving signal.
+
+        Reload is performed in separate thread. Must be called from main
+        thread.
+
+        :param signum: signal number, defaults to ``SIGHUP``
+        :type signum: int, optional
+        """
+
+        def handler(signum, frame):
+            threading.Thread(target=self.reload, daemon=True).start()
+
+        signal.signal(signum, handler)
+
+
+class NamedPolicy:
+    """Resolver of current policy with specific name in policy holder.
+
+    May be passed to middleware adapters in place of policy.
+
+    :param holder: policy holder
+    :type holder: PolicyHolder
+    :param name: policy name
+    :type name: str
+    """
+
+    def __init__(self, holder: PolicyHolder, name: str):
+        self.holder = holder
+        self.name = name
+
+    def resolve(self, path: str, host: Optional[str] = None) -> Optional[Policy]:
+        """Get current policy.
+
+        :param path: request URL path (ignored)
+        :type path: str
+        :param host: request host name (ignored), defaults to None
+        :type host: Optional[str]
+        :return: current policy or None if there's no such policy
+        :rtype: Optional[Policy]
+        """
+        return self.holder.get(self.name)
+
+
+class FileWatcher(threading.Thread):
+    """Daemon thread that calls function when file modification is detected.
+
+    Change of file modification time or size is detected by polling.
+
+    :param path: path of file to watch
+    :type path: str
+    :param callback: function to call
+    :type callback: Callable[[], object]
+    :param interval: polling interval in seconds, defaults to 1.0
+    :type interval: float, optional
+    """
+
+    def __init__(
+        self, path: str, callback: Callable[[], object], *, interval: float = 1.0
+    ):
+        super().__init__(name=f"corslib-watch-{path}", daemon=True)
+        self.path = path
+        self.callback = callback
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.last = self._stat()
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def check(self) -> bool:
+        """Check file and call function if it has been modified.
+
+        :return: flag if modification has been detected
+        :rtype: bool
+        """
+        current = self._stat()
+        if current is None or current == self.last:
+            return False
+        self.last = current
+        self.callback()
+        return True
+
+    def run(self) -> None:
+        while not self.stopped.wait(self.interval):
+            self.check()
+
+    def stop(self) -> None:
+        """Stop watching."""
+        self.stopped.set()
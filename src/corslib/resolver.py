@@ -0,0 +1,148 @@
+import asyncio
+from typing import Dict, Optional
+
+from .cache import CacheInfo, LRUCache
+
+try:
+    from typing import Protocol
+except ImportError:  # pragma: nocover
+    Protocol = object
+
+
+class OriginBackend(Protocol):
+    """Interface of dynamic origin sources, eg. database of tenant origins."""
+
+    async def resolve(self, origin: str) -> bool:
+        """Check if origin is allowed."""
+
+
+class OriginResolver:
+    """Cached, asynchronous source of allowed origins.
+
+    Answers of backend are cached, allowed origins for ``ttl`` seconds and
+    not allowed ones for ``negative_ttl`` seconds, each set in its own size
+    bounded cache. Concurrent lookups of the same origin that is not cached
+    are coalesced into single backend query, which is not cancelled when
+    some of waiting callers are. Backend errors are propagated to all
+    waiting callers and are not cached.
+
+    Resolver is meant to be used as
+    :attr:`~corslib.policy.Policy.origin_allowlist`. Policy itself is not
+    asynchronous, so it consults only cached answers (origin is contained in
+    resolver if it has been recently resolved as allowed).
+    :class:`~corslib.asgi.CORSMiddleware` awaits :meth:`resolve` before
+    policy is applied, other callers have to do the same, synchronous ones
+    (like :class:`~corslib.wsgi.CORSMiddleware`) with
+    :meth:`resolve_sync`. When policy
+    decision cache is enabled, its ``cache_ttl`` should not exceed
+    ``negative_ttl``, otherwise decisions may outlive resolver answers.
+
+    Policy looks up origins in canonical form (see
+    :func:`~corslib.origin.canonical_origin`), so backend receives them in
+    this form too. Lookups are coalesced only within single event loop.
+
+    :param backend: origin source
+    :type backend: OriginBackend
+    :param ttl: lifetime of allowed origin entries in seconds, defaults to 60
+    :type ttl: float, optional
+    :param negative_ttl: lifetime of not allowed origin entries in seconds,
+                         defaults to 5
+    :type negative_ttl: float, optional
+    :param maxsize: maximum number of entries in each cache, defaults to
+                    10000
+    :type maxsize: int, optional
+    """
+
+    def __init__(
+        self,
+        backend: OriginBackend,
+        *,
+        ttl: float = 60.0,
+        negative_ttl: float = 5.0,
+        maxsize: int = 10000,
+    ):
+        self.backend = backend
+        self.positive = LRUCache(maxsize, ttl=ttl)
+        self.negative = LRUCache(maxsize, ttl=negative_ttl)
+        self._pending: Dict[str, "asyncio.Future[bool]"] = {}
+
+    def __contains__(self, origin: object) -> bool:
+        return self.positive.get(origin, False)
+
+    def cached(self, origin: str) -> Optional[bool]:
+        """Get cached answer.
+
+        :param origin: value of the Origin request header
+        :type origin: str
+        :return: flag if origin is allowed or None if it's not cached
+        :rtype: Optional[bool]
+        """
+        if self.positive.get(origin, False):
+            return True
+        if self.negative.get(origin, False):
+            return False
+        return None
+
+    async def resolve(self, origin: str) -> bool:
+        """Check if origin is allowed, querying backend if needed.
+
+        :param origin: value of the Origin request header
+        :type origin: str
+        :return: flag if origin is allowed
+        :rtype: bool
+        """
+        allowed = self.cached(origin)
+        if allowed is not None:
+            return allowed
+        future = self._pending.get(origin)
+        if future is None:
+            future = asyncio.ensure_future(self._query(origin))
+            self._pending[origin] = future
+            future.add_done_callback(lambda f: self._done(origin, f))
+        return await asyncio.shield(future)
+
+    async def _query(self, origin: str) -> bool:
+        allowed = bool(await self.backend.resolve(origin))
+        if allowed:
+            self.positive.set(origin, True)
+        else:
+            self.negative.set(origin, True)
+        return allowed
+
+    def resolve_sync(self, origin: str) -> bool:
+        """Check if origin is allowed, querying backend in new event loop.
+
+        Synchronous counterpart of :meth:`resolve` for callers that do not
+        run event loop. Backend is queried with :func:`asyncio.run`, so it
+        must not depend on any particular event loop, and concurrent lookups
+        are not coalesced.
+
+        :param origin: value of the Origin request header
+        :type origin: str
+        :return: flag if origin is allowed
+        :rtype: bool
+        """
+        allowed = self.cached(origin)
+        if allowed is not None:
+            return allowed
+        return asyncio.run(self._query(origin))
+
+    def _done(self, origin: str, future: "asyncio.Future[bool]") -> None:
+        if self._pending.get(origin) is future:
+            del self._pending[origin]
+        if not future.cancelled():
+            # mark exception as retrieved in case all callers went away
+            future.exception()
+
+    def clear(self) -> None:
+        """Drop all cached answers."""
+        self.positive.clear()
+        self.negative.clear()
+
+    def cache_info(self) -> Dict[str, CacheInfo]:
+        """Get cache statistics.
+
+        :return: statistics of ``positive`` and ``negative`` cache
+        :rtype: Dict[str, CacheInfo]
+        """
+        return {"positive": self.positive.info(), "negative": self.negative.info()}
@@ -1,4 +1,144 @@
-from typing import Any, Mapping, Sequence, Union
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+HeaderValue = Union[str, bytes]
+
+_ORIGIN, _REQUEST_METHOD, _REQUEST_HEADERS, _CREDENTIALS, _HOST = range(5)
+
+_NAMES = {
+    "origin": _ORIGIN,
+    "access-control-request-method": _REQUEST_METHOD,
+    "access-control-request-headers": _REQUEST_HEADERS,
+    "cookie": _CREDENTIALS,
+    "authorization": _CREDENTIALS,
+    "host": _HOST,
+}
+# str and bytes names have equal hashes, in single table lookup of name that
+# is present would first hit entry of the other type and pay for failed
+# comparison, so names of each type are kept in separate table
+_BYTES_NAMES: Dict[bytes, int] = {
+    name.encode("ascii"): code for name, code in _NAMES.items()
+}
+_NAME_LENGTHS = frozenset(len(name) for name in _NAMES)
+
+
+class CORSRequest(NamedTuple):
+    """CORS-relevant values of request.
+
+    Header values are kept in form they were provided in (str or bytes).
+
+    :ivar origin: value of Origin header
+    :vartype origin: Optional[Union[str, bytes]]
+    :ivar request_method: value of Access-Control-Request-Method header
+    :vartype request_method: Optional[Union[str, bytes]]
+    :ivar request_headers: value of Access-Control-Request-Headers header
+    :vartype request_headers: Optional[Union[str, bytes]]
+    :ivar credentialed: flag if request carries Cookie or Authorization
+                        header
+    :vartype credentialed: bool
+    :ivar is_preflight: flag if request is ``OPTIONS`` request with
+                        Access-Control-Request-Method header
+    :vartype is_preflight: bool
+    :ivar host: value of Host header
+    :vartype host: Optional[Union[str, bytes]]
+    """
+
+    origin: Optional[HeaderValue] = None
+    request_method: Optional[HeaderValue] = None
+    request_headers: Optional[HeaderValue] = None
+    credentialed: bool = False
+    is_preflight: bool = False
+    host: Optional[HeaderValue] = None
+
+    @classmethod
+    def from_environ(cls, environ: Mapping[str, Any]) -> "CORSRequest":
+        """Read CORS-relevant values from WSGI environment.
+
+        Requests without Origin header are not CORS requests, so for them
+        empty record is returned without reading other values.
+
+        :param environ: WSGI environment
+        :type environ: Mapping[str, Any]
+        :return: request values
+        :rtype: CORSRequest
+        """
+        origin = environ.get("HTTP_ORIGIN")
+        if origin is None:
+            return _EMPTY_REQUEST
+        request_method = environ.get("HTTP_ACCESS_CONTROL_REQUEST_METHOD") or None
+        return cls(
+            origin=origin,
+            request_method=request_method,
+            request_headers=environ.get("HTTP_ACCESS_CONTROL_REQUEST_HEADERS"),
+            credentialed="HTTP_COOKIE" in environ or "HTTP_AUTHORIZATION" in environ,
+            is_preflight=(
+                request_method is not None
+                and environ.get("REQUEST_METHOD") == "OPTIONS"
+            ),
+            host=environ.get("HTTP_HOST"),
+        )
+
+
+_EMPTY_REQUEST = CORSRequest()
+
+_new_request = tuple.__new__
+
+
+def parse_request_headers(
+    headers: Iterable[Tuple[HeaderValue, HeaderValue]], method: Optional[str] = None
+) -> CORSRequest:
+    """Extract CORS-relevant values from raw request headers in single pass.
+
+    Header names are matched case-insensitively, lowercase names with single
+    hash lookup and other names of the same length as some relevant header
+    after lowercasing. When header is repeated, the last value is used.
+
+    :param headers: sequence of header name and value pairs, either str or
+                    bytes (eg. ASGI ``scope["headers"]``)
+    :type headers: Iterable[Tuple[Union[str, bytes], Union[str, bytes]]]
+    :param method: request method, needed to detect preflight request
+    :type method: Optional[str]
+    :return: request values
+    :rtype: CORSRequest
+    """
+    origin = request_method = request_headers = host = None
+    credentialed = False
+    fields: Optional[Mapping[Any, int]] = None
+    for name, value in headers:
+        if fields is None:
+            fields = _BYTES_NAMES if isinstance(name, bytes) else _NAMES
+        code = fields.get(name)
+        if code is None:
+            if len(name) not in _NAME_LENGTHS:
+                continue
+            code = fields.get(name.lower())
+            if code is None:
+                continue
+        if code == _ORIGIN:
+            origin = value
+        elif code == _CREDENTIALS:
+            credentialed = True
+        elif code == _HOST:
+            host = value
+        elif code == _REQUEST_METHOD:
+            request_method = value
+        else:
+            request_headers = value
+    is_preflight = method == "OPTIONS" and request_method is not None
+    # skips argument handling of generated constructor
+    return _new_request(
+        CORSRequest,
+        (origin, request_method, request_headers, credentialed, is_preflight, host),
+    )
 
 
 def is_request_credentialed(headers: Union[Mapping[str, Any], Sequence[str]]) -> bool:
@@ -7,6 +147,8 @@ def is_request_credentialed(headers: Union[Mapping[str, Any], Sequence[str]]) ->
     This is done only by inspecting header fields so it does not takes SSL
     client certificate authentication into account. The argument may be either
     headers dictionary-like object or a sequence of headers field names.
+    Names are compared case-sensitively, use :func:`parse_request_headers` for
+    raw header lists.
 
     :param headers: header fields
     :type headers: Union[Mapping[str, Any], Sequence[str]]
@@ -0,0 +1,141 @@
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from .headers import apply_header_list
+from .origin import canonical_origin
+from .policy import Policy
+from .preflight import PreflightResponder
+from .resolver import OriginResolver
+from .utils import CORSRequest
+
+if TYPE_CHECKING:  # pragma: nocover
+    from .registry import PolicyResolver
+
+Environ = Mapping[str, Any]
+StartResponse = Callable[..., Callable[[bytes], Any]]
+WSGIApp = Callable[[Environ, StartResponse], Iterable[bytes]]
+HeaderList = List[Tuple[str, str]]
+
+
+def _header_list(headers: Mapping[str, Any]) -> HeaderList:
+    return [(name, str(value)) for name, value in headers.items()]
+
+
+def _encode(value: Optional[str]) -> Optional[bytes]:
+    return None if value is None else value.encode("latin-1")
+
+
+class CORSMiddleware:
+    """WSGI middleware that applies policy to HTTP requests.
+
+    Requests without ``Origin`` header are passed to application unchanged,
+    after single environment lookup. For other requests all CORS related
+    values are read from WSGI environment once, with
+    :meth:`~corslib.utils.CORSRequest.from_environ`.
+    Preflight requests (``OPTIONS`` with ``Access-Control-Request-Method``
+    header) are answered with ``204`` status by middleware itself and never
+    reach application. For other requests generated headers are applied in
+    place to header list passed by application to ``start_response`` with
+    :func:`~corslib.headers.apply_header_list`, so ``Vary`` tokens are
+    merged with application ones.
+
+    If policy :attr:`~corslib.policy.Policy.origin_allowlist` is
+    :class:`~corslib.resolver.OriginResolver`, request origin is resolved
+    with :meth:`~corslib.resolver.OriginResolver.resolve_sync` before policy
+    is applied.
+
+    With ``preflight`` responder complete preflight responses are cached,
+    request values are then encoded to bytes (as ``latin-1``) to look them
+    up and cached headers are sent with lowercase names.
+
+    :param app: WSGI application
+    :type app: WSGIApp
+    :param policy: policy to be applied to requests, or resolver that
+                   provides policy by request path and host, like
+                   :class:`~corslib.registry.PolicyRegistry` or
+                   :class:`~corslib.reload.NamedPolicy`
+    :type policy: Union[Policy, PolicyRegistry, NamedPolicy]
+    :param strict: flag if strict security has to be applied, defaults to
+                   False
+    :type strict: bool, optional
+    :param preflight: optional cache of preflight responses
+    :type preflight: Optional[PreflightResponder]
+    """
+
+    def __init__(
+        self,
+        app: WSGIApp,
+        policy: Union[Policy, "PolicyResolver"],
+        *,
+        strict: bool = False,
+        preflight: Optional[PreflightResponder] = None,
+    ):
+        self.app = app
+        self.policy = policy
+        self.strict = strict
+        self.preflight = preflight
+        self.registry: Optional["PolicyResolver"] = None
+        if not isinstance(policy, Policy):
+            self.registry = policy
+
+    def __call__(
+        self, environ: Environ, start_response: StartResponse
+    ) -> Iterable[bytes]:
+        if not environ.get("HTTP_ORIGIN"):
+            return self.app(environ, start_response)
+        request = CORSRequest.from_environ(environ)
+        origin = request.origin
+        policy = self.policy
+        if self.registry is not None:
+            policy = self.registry.resolve(environ.get("PATH_INFO", ""), request.host)
+            if policy is None:
+                return self.app(environ, start_response)
+        allowlist = policy.origin_allowlist
+        if isinstance(allowlist, OriginResolver):
+            allowlist.resolve_sync(canonical_origin(origin))
+        # preflight requests never carry credentials, allowing them is
+        # decided for actual request
+        if request.is_preflight and self.preflight is not None:
+            response = self.preflight.respond(
+                policy,
+                _encode(origin),
+                strict=self.strict,
+                request_credentials=True,
+                request_method=_encode(request.request_method),
+                request_headers=_encode(request.request_headers),
+            )
+            start_response("204 No Content", list(response.str_headers))
+            return []
+        if request.is_preflight:
+            headers = policy.preflight_response_headers(
+                origin,
+                strict=self.strict,
+                request_credentials=True,
+                request_method=request.request_method,
+                request_headers=request.request_headers,
+            )
+            start_response("204 No Content", _header_list(headers))
+            return []
+        headers = policy.response_headers(
+            origin, strict=self.strict, request_credentials=request.credentialed
+        )
+        if not headers:
+            return self.app(environ, start_response)
+        cors_headers = _header_list(headers)
+
+        def start_with_cors(
+            status: str, response_headers: HeaderList, exc_info: Optional[Any] = None
+        ) -> Callable[[bytes], Any]:
+            apply_header_list(response_headers, cors_headers)
+            return start_response(status, response_headers, exc_info)
+
+        return self.app(environ, start_with_cors)
@@ -0,0 +1,92 @@
+import pickle
+
+import pytest
+
+from corslib.allowlist import MappedAllowlist, write_allowlist
+from corslib.policy import OriginRule, Policy, PolicyError, RuleKind
+
+ORIGINS = [
+    "https://b.example.com",
+    "https://a.example.com",
+    "http://localhost:8000",
+    "https://a.example.com",
+]
+
+
+@pytest.fixture()
+def allowlist(tmp_path):
+    path = tmp_path / "origins.bin"
+    write_allowlist(str(path), ORIGINS)
+    with MappedAllowlist(str(path)) as allowlist:
+        yield allowlist
+
+
+def test_write_deduplicates(tmp_path):
+    assert write_allowlist(str(tmp_path / "origins.bin"), ORIGINS) == 3
+
+
+def test_contains(allowlist):
+    assert len(allowlist) == 3
+    for origin in ORIGINS:
+        assert origin in allowlist
+        assert origin.encode() in allowlist
+    for origin in ["", "https://c.example.com", "https://a.example.co", "zzz"]:
+        assert origin not in allowlist
+
+
+def test_iter_sorted(allowlist):
+    assert list(allowlist) == sorted(set(ORIGINS))
+
+
+def test_empty(tmp_path):
+    path = tmp_path / "origins.bin"
+    write_allowlist(str(path), [])
+    allowlist = MappedAllowlist(str(path))
+    assert len(allowlist) == 0
+    assert "https://a.example.com" not in allowlist
+    allowlist.close()
+
+
+def test_invalid_file(tmp_path):
+    path = tmp_path / "origins.bin"
+    path.write_bytes(b"https://a.example.com\n")
+    with pytest.raises(ValueError):
+        MappedAllowlist(str(path))
+
+
+def test_pickle_reopens(allowlist):
+    restored = pickle.loads(pickle.dumps(allowlist))
+    assert restored == allowlist
+    assert "https://a.example.com" in restored
+    restored.close()
+
+
+def test_policy_allowlist(allowlist):
+    policy = Policy(
+        name="test",
+        allow_origin=[OriginRule(rule="https://*.test.com", kind=RuleKind.PATH)],
+        origin_allowlist=allowlist,
+    )
+    assert policy.response_headers("https://a.example.com") == {
+        "Access-Control-Allow-Origin": "https://a.example.com",
+        "Vary": "Origin",
+    }
+    assert policy.response_headers("https://x.test.com")
+    assert policy.response_headers("https://c.example.com") == {}
+    assert policy.response_header_list(b"http://localhost:8000") == (
+        (b"access-control-allow-origin", b"http://localhost:8000"),
+        (b"vary", b"Origin"),
+    )
+    assert policy.response_header_list(b"http://localhost:8001") == ()
+
+
+def test_policy_allowlist_only_is_not_open(allowlist):
+    policy = Policy(name="test", allow_credentials=True, origin_allowlist=allowlist)
+    assert policy.response_headers("https://c.example.com") == {}
+    headers = policy.response_headers("https://a.example.com", request_credentials=True)
+    assert headers["Access-Control-Allow-Credentials"] == "true"
+
+
+def test_policy_allowlist_open_credentials():
+    with pytest.raises(PolicyError):
+        Policy(name="test", allow_credentials=True, origin_allowlist={"null"})
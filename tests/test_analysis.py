@@ -0,0 +1,103 @@
+import random
+
+import pytest
+
+from corslib.analysis import (
+    Analysis,
+    DUPLICATE,
+    SHADOWED,
+    UNREACHABLE,
+    analyze,
+    differential_check,
+    minimize,
+    origin_corpus,
+)
+from corslib.policy import FrozenOriginRule, OriginRule, Policy, PolicyError, RuleKind
+
+RULES = [
+    OriginRule(rule="https://*.example.com", kind=RuleKind.PATH),
+    OriginRule(rule="https://app.example.com"),
+    OriginRule(rule="https://*.api.example.com", kind=RuleKind.PATH),
+    OriginRule(rule="https://other.com"),
+    OriginRule(rule="HTTPS://Other.com:443"),
+    OriginRule(rule=r"^https://x\d\.net$", kind=RuleKind.REGEX),
+    OriginRule(rule=r"^https://x\d\.net$", kind=RuleKind.REGEX),
+    OriginRule(rule="https://x1.net"),
+    OriginRule(rule="https://*.api.example.com:8443", kind=RuleKind.PATH),
+    OriginRule(rule="http://[ab].example.com", kind=RuleKind.PATH),
+    OriginRule(rule="https://other.com", kind=RuleKind.PATH),
+    OriginRule(rule="null"),
+]
+
+
+@pytest.fixture()
+def policy():
+    return Policy(name="api", allow_origin=RULES)
+
+
+def test_analyze(policy):
+    findings = analyze(policy).findings
+    assert [(f.kind, f.index, f.cause) for f in findings] == [
+        (SHADOWED, 1, 0),
+        (UNREACHABLE, 2, 0),
+        (DUPLICATE, 4, 3),
+        (DUPLICATE, 6, 5),
+        (SHADOWED, 7, 5),
+        (SHADOWED, 10, 3),
+    ]
+    assert findings[0].rule == FrozenOriginRule("https://app.example.com")
+
+
+def test_analyze_clean():
+    policy = Policy(name="api", allow_origin=[RULES[3], RULES[9], RULES[11]])
+    assert analyze(policy).findings == []
+    assert analyze(Policy(name="open")).findings == []
+
+
+def test_pattern_overlap_not_unreachable():
+    rules = [
+        OriginRule(rule="https://ab*ba", kind=RuleKind.PATH),
+        OriginRule(rule="https://aba", kind=RuleKind.PATH),
+        OriginRule(rule="https://*.example.com", kind=RuleKind.PATH),
+        OriginRule(rule="https://*.example.com?", kind=RuleKind.PATH),
+    ]
+    assert analyze(Policy(name="api", allow_origin=rules)).findings == []
+
+
+def test_minimized(policy):
+    minimized = analyze(policy).minimized()
+    assert minimized.name == policy.name
+    assert [rule.rule for rule in minimized.allow_origin] == [
+        "https://*.example.com",
+        "https://other.com",
+        r"^https://x\d\.net$",
+        "https://*.api.example.com:8443",
+        "http://[ab].example.com",
+        "null",
+    ]
+    assert len(policy.allow_origin) == len(RULES)
+
+
+def test_minimize_same_decisions(policy):
+    minimized = minimize(policy)
+    corpus = origin_corpus(RULES)
+    assert "https://x.api.example.com:8443" in corpus
+    assert "http://a.example.com" in corpus
+    assert differential_check(policy, minimized) == []
+    rnd = random.Random(0)
+    origins = [rnd.choice(corpus) + rnd.choice(["", ".", ":1"]) for _ in range(500)]
+    assert differential_check(policy, minimized, origins) == []
+
+
+def test_differential_check_mismatch(policy):
+    other = Policy(name="api", allow_origin=RULES[:3])
+    mismatches = differential_check(policy, other)
+    assert "https://other.com" in mismatches
+    assert "null" in mismatches
+
+
+def test_minimize_verified(policy, monkeypatch):
+    other = Policy(name="api", allow_origin=RULES[:3])
+    monkeypatch.setattr(Analysis, "minimized", lambda self: other)
+    with pytest.raises(PolicyError, match="differs"):
+        minimize(policy)
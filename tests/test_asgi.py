@@ -0,0 +1,170 @@
+import asyncio
+
+import pytest
+
+from corslib.asgi import CORSMiddleware
+from corslib.policy import OriginRule, Policy
+from corslib.preflight import PreflightResponder
+from corslib.registry import PolicyRegistry
+from corslib.resolver import OriginResolver
+
+
+async def app(scope, receive, send):
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"text/plain")],
+        }
+    )
+    await send({"type": "http.response.body", "body": b"app"})
+
+
+def request(middleware, method="GET", headers=None, scope_type="http", path="/"):
+    scope = {
+        "type": scope_type,
+        "method": method,
+        "path": path,
+        "headers": headers or [],
+    }
+    messages = []
+
+    async def receive():  # pragma: nocover
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(middleware(scope, receive, send))
+    return messages
+
+
+@pytest.fixture()
+def middleware():
+    policy = Policy(
+        name="policy1",
+        allow_credentials=True,
+        allow_origin=[OriginRule(rule="http://website.com")],
+        allow_methods=["GET", "PUT"],
+    )
+    return CORSMiddleware(app, policy)
+
+
+def test_no_origin(middleware):
+    messages = request(middleware)
+    assert messages[0]["headers"] == [(b"content-type", b"text/plain")]
+
+
+def test_not_http(middleware):
+    messages = request(middleware, scope_type="websocket")
+    assert messages[1]["body"] == b"app"
+
+
+def test_simple_request(middleware):
+    messages = request(
+        middleware, headers=[(b"origin", b"http://website.com"), (b"cookie", b"x")]
+    )
+    headers = messages[0]["headers"]
+    assert (b"content-type", b"text/plain") in headers
+    assert (b"access-control-allow-origin", b"http://website.com") in headers
+    assert (b"access-control-allow-credentials", b"true") in headers
+    assert messages[1]["body"] == b"app"
+
+
+def test_simple_request_denied(middleware):
+    messages = request(middleware, headers=[(b"origin", b"http://other.com")])
+    assert messages[0]["headers"] == [(b"content-type", b"text/plain")]
+
+
+def test_preflight(middleware):
+    messages = request(
+        middleware,
+        method="OPTIONS",
+        headers=[
+            (b"origin", b"http://website.com"),
+            (b"access-control-request-method", b"PUT"),
+        ],
+    )
+    assert messages[0]["status"] == 204
+    headers = dict(messages[0]["headers"])
+    assert headers[b"access-control-allow-methods"] == b"GET, PUT"
+    assert headers[b"access-control-allow-credentials"] == b"true"
+    assert messages[1]["body"] == b""
+
+
+def test_options_not_preflight(middleware):
+    messages = request(
+        middleware, method="OPTIONS", headers=[(b"origin", b"http://website.com")]
+    )
+    assert messages[0]["status"] == 200
+
+
+def test_cached_headers(middleware):
+    middleware.policy.cache_size = 10
+    headers = [(b"origin", b"http://website.com")]
+    first = request(middleware, headers=headers)
+    second = request(middleware, headers=headers)
+    assert first[0]["headers"] == second[0]["headers"]
+    info = middleware.policy.cache_info()
+    assert (info.hits, info.misses) == (1, 1)
+
+
+def test_registry():
+    registry = PolicyRegistry()
+    registry.register(
+        "/api/",
+        Policy(name="api", allow_origin=[OriginRule("http://website.com")]),
+        host="website.com",
+    )
+    middleware = CORSMiddleware(app, registry)
+    headers = [(b"origin", b"http://website.com"), (b"host", b"website.com")]
+    messages = request(middleware, headers=headers, path="/api/users")
+    assert len(messages[0]["headers"]) == 3
+    messages = request(middleware, headers=headers, path="/static/app.js")
+    assert messages[0]["headers"] == [(b"content-type", b"text/plain")]
+
+
+def test_origin_resolver():
+    class Backend:
+        async def resolve(self, origin):
+            return origin == "http://tenant.com"
+
+    policy = Policy(name="tenants", origin_allowlist=OriginResolver(Backend()))
+    middleware = CORSMiddleware(app, policy)
+    messages = request(middleware, headers=[(b"origin", b"http://tenant.com")])
+    assert (b"access-control-allow-origin", b"http://tenant.com") in messages[0][
+        "headers"
+    ]
+    messages = request(middleware, headers=[(b"origin", b"http://other.com")])
+    assert messages[0]["headers"] == [(b"content-type", b"text/plain")]
+
+
+def test_preflight_responder(middleware):
+    middleware.preflight = PreflightResponder()
+    headers = [
+        (b"origin", b"http://website.com"),
+        (b"access-control-request-method", b"PUT"),
+    ]
+    first = request(middleware, method="OPTIONS", headers=headers)
+    second = request(middleware, method="OPTIONS", headers=headers)
+    assert first[0]["status"] == second[0]["status"] == 204
+    assert second[0]["headers"] is first[0]["headers"]
+    assert dict(first[0]["headers"])[b"access-control-allow-methods"] == b"GET, PUT"
+    assert middleware.preflight.cache_info().hits == 1
+
+
+def test_vary_merged(middleware):
+    async def vary_app(scope, receive, send):
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"vary", b"Accept-Encoding")],
+            }
+        )
+
+    middleware.app = vary_app
+    messages = request(middleware, headers=[(b"origin", b"http://website.com")])
+    headers = messages[0]["headers"]
+    assert headers[0] == (b"vary", b"Accept-Encoding, Origin")
+    assert [name for name, _ in headers].count(b"vary") == 1
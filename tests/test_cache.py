@@ -0,0 +1,54 @@
+import pytest
+
+from corslib.cache import LRUCache
+
+
+def test_invalid_size():
+    with pytest.raises(ValueError, match="must be positive"):
+        LRUCache(0)
+
+
+def test_hit_miss():
+    cache = LRUCache(2)
+    assert cache.get("a") is None
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    info = cache.info()
+    assert (info.hits, info.misses, info.size) == (1, 1, 1)
+
+
+def test_eviction_lru():
+    cache = LRUCache(2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert len(cache) == 2
+    assert cache.info().evictions == 1
+
+
+def test_ttl_expired(monotonic):
+    cache = LRUCache(2, ttl=10)
+    cache.set("a", 1)
+    monotonic.append(11)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_clear_keeps_counters():
+    cache = LRUCache(2)
+    cache.set("a", 1)
+    cache.get("a")
+    cache.clear()
+    info = cache.info()
+    assert info.size == 0
+    assert info.hits == 1
+
+
+@pytest.fixture()
+def monotonic(monkeypatch):
+    now = [0]
+    monkeypatch.setattr("corslib.cache.time.monotonic", lambda: now[-1])
+    return now
@@ -0,0 +1,221 @@
+import gzip
+import json
+
+import pytest
+
+from corslib.cli import (
+    ALLOWED,
+    CREDENTIALS_DENIED,
+    DENIED,
+    HEADERS_DENIED,
+    METHOD_DENIED,
+    PolicyPair,
+    main,
+    outcome,
+    parse_line,
+    replay,
+)
+from corslib.policy import OriginRule, Policy
+
+CURRENT = """
+[[policy]]
+name = "api"
+allow_credentials = true
+allow_origin = [
+    "https://app.example.com",
+    "https://old.example.com",
+]
+"""
+
+CANDIDATE = """
+[[policy]]
+name = "api"
+allow_origin = ["https://app.example.com"]
+allow_methods = ["GET", "PUT"]
+"""
+
+
+def _line(method, **headers):
+    return json.dumps({"method": method, "headers": headers}) + "\n"
+
+
+LINES = [
+    _line("GET", Origin="https://app.example.com"),
+    _line("GET", Origin="https://old.example.com"),
+    _line("get", origin="https://old.example.com"),
+    _line("GET", Origin="https://app.example.com", Cookie="id=1"),
+    _line(
+        "OPTIONS",
+        Origin="https://app.example.com",
+        **{"Access-Control-Request-Method": "DELETE"},
+    ),
+    _line("GET"),
+    "not json\n",
+]
+
+
+@pytest.fixture()
+def pair(tmp_path):
+    current = tmp_path / "current.toml"
+    current.write_text(CURRENT)
+    candidate = tmp_path / "candidate.toml"
+    candidate.write_text(CANDIDATE)
+    return PolicyPair(str(current), str(candidate))
+
+
+def test_parse_line():
+    request = parse_line(
+        _line(
+            "options",
+            origin="https://a.com",
+            authorization="x",
+            **{
+                "access-control-request-method": "PUT",
+                "ACCESS-CONTROL-REQUEST-HEADERS": "X-Token",
+            },
+        )
+    )
+    assert request.origin == "https://a.com"
+    assert request.preflight
+    assert request.credentialed
+    assert request.request_method == "PUT"
+    assert request.request_headers == "X-Token"
+
+
+@pytest.mark.parametrize(
+    "line",
+    [
+        "",
+        "[]",
+        '{"method": "GET"}',
+        '{"method": 1}',
+        _line("GET", Origin=123),
+        _line(
+            "OPTIONS",
+            Origin="https://a.com",
+            **{"Access-Control-Request-Method": ["PUT"]},
+        ),
+    ],
+)
+def test_parse_line_invalid(line):
+    assert parse_line(line) is None
+
+
+@pytest.mark.parametrize(
+    ("line", "expected"),
+    [
+        (_line("GET", Origin="https://a.com"), ALLOWED),
+        (_line("GET", Origin="https://b.com"), DENIED),
+        (_line("GET", Origin="https://a.com", Cookie="x"), CREDENTIALS_DENIED),
+        (
+            _line(
+                "OPTIONS",
+                Origin="https://a.com",
+                **{"Access-Control-Request-Method": "DELETE"},
+            ),
+            METHOD_DENIED,
+        ),
+        (
+            _line(
+                "OPTIONS",
+                Origin="https://a.com",
+                **{
+                    "Access-Control-Request-Method": "PUT",
+                    "Access-Control-Request-Headers": "Content-Type, X-Token",
+                },
+            ),
+            HEADERS_DENIED,
+        ),
+        (
+            _line(
+                "OPTIONS",
+                Origin="https://a.com",
+                **{
+                    "Access-Control-Request-Method": "PUT",
+                    "Access-Control-Request-Headers": "content-type, x-custom",
+                },
+            ),
+            ALLOWED,
+        ),
+    ],
+)
+def test_outcome(line, expected):
+    policy = Policy(
+        name="test",
+        allow_origin=[OriginRule(rule="https://a.com")],
+        allow_methods=["PUT"],
+        allow_headers=["X-Custom"],
+    )
+    assert outcome(policy, parse_line(line)) == expected
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_replay(pair, jobs):
+    report = replay(pair, LINES * 3, jobs=jobs, chunk_size=4)
+    assert report.requests == 18
+    assert report.skipped == 3
+    assert report.no_origin == 3
+    assert report.changes == {
+        ("https://old.example.com", "response", ALLOWED, DENIED): 6,
+        ("https://app.example.com", "response", ALLOWED, CREDENTIALS_DENIED): 3,
+        ("https://app.example.com", "preflight", ALLOWED, METHOD_DENIED): 3,
+    }
+
+
+def test_replay_invalid_value_skipped(pair):
+    report = replay(pair, [_line("GET", Origin=123), LINES[0]], jobs=1)
+    assert (report.requests, report.skipped) == (1, 1)
+
+
+def test_main(pair, tmp_path, capsys):
+    log = tmp_path / "access.log.gz"
+    with gzip.open(log, "wt") as fp:
+        fp.writelines(LINES)
+    rv = main(["replay", "-j", "1", pair.current, pair.candidate, str(log)])
+    assert rv == 0
+    out = capsys.readouterr().out.splitlines()
+    assert out[0] == "requests: 6, without origin: 1, skipped lines: 1"
+    assert out[1] == "changed: 4 requests from 2 origins"
+    assert out[2].split() == [
+        "2",
+        "response",
+        ALLOWED,
+        "->",
+        DENIED,
+        "https://old.example.com",
+    ]
+    assert len(out) == 5
+
+
+def test_main_unknown_policy(pair, tmp_path, capsys):
+    log = tmp_path / "access.log"
+    log.write_text("")
+    rv = main(["replay", "-p", "web", pair.current, pair.candidate, str(log)])
+    assert rv == 2
+    assert "web" in capsys.readouterr().err
+
+
+def test_main_analyze_insecure_rule(tmp_path, capsys):
+    config = tmp_path / "cors.toml"
+    config.write_text(
+        '[[policy]]\nname = "api"\n'
+        'allow_origin = [{rule = "https://example.*", kind = "path"}]\n'
+    )
+    rv = main(["analyze", str(config)])
+    assert rv == 2
+    assert "open ended" in capsys.readouterr().err
+
+
+def test_main_analyze(tmp_path, capsys):
+    config = tmp_path / "cors.toml"
+    config.write_text(CURRENT + CANDIDATE.replace('"api"', '"web"'))
+    assert main(["analyze", "-p", "web", str(config)]) == 0
+    assert capsys.readouterr().out == ""
+    config.write_text(CURRENT.replace('"https://old', '"HTTPS://APP'))
+    assert main(["analyze", str(config)]) == 1
+    out = capsys.readouterr().out.splitlines()
+    assert out == [
+        "api: rule 1 'HTTPS://APP.example.com' is duplicate, covered by rule 0",
+        "api: 1 of 2 rules redundant, minimized policy differs for 0 origins",
+    ]
+    assert main(["analyze", "-p", "other", str(config)]) == 2
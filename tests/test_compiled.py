@@ -0,0 +1,233 @@
+import itertools
+import pickle
+
+import pytest
+
+from corslib.compiled import BatchResult, CompiledPolicy
+from corslib.matching import AdaptivePatternSet
+from corslib.policy import OriginRule, Policy, RuleKind
+from corslib.resolver import OriginResolver
+
+POLICIES = [
+    Policy(name="open"),
+    Policy(
+        name="restricted",
+        allow_credentials=True,
+        allow_origin=[
+            OriginRule(rule="http://website.com"),
+            OriginRule(rule="http://*.website.com", kind=RuleKind.PATH),
+        ],
+        allow_headers=["X-Custom", "Content-Type"],
+        allow_methods=["GET", "PUT"],
+        max_age=600,
+    ),
+    Policy(name="null", allow_origin=[OriginRule(rule="null")]),
+]
+
+
+def reference_preflight(policy, origin, strict, credentials, method, headers):
+    if not origin or (strict and origin.lower() == "null"):
+        return {}
+    rv = dict(policy.access_control_allow_origin(origin))
+    if not rv:
+        return rv
+    rv.update(policy.access_control_allow_headers(headers))
+    rv.update(policy.access_control_allow_methods(method))
+    rv.update(
+        policy.access_control_allow_credentials(
+            credentials, rv[Policy.ACCESS_CONTROL_ALLOW_ORIGIN]
+        )
+    )
+    if policy.max_age:
+        rv[Policy.ACCESS_CONTROL_MAX_AGE] = policy.max_age
+    return rv
+
+
+@pytest.mark.parametrize("policy", POLICIES, ids=[p.name for p in POLICIES])
+def test_preflight_same_as_reference(policy):
+    compiled = policy.compile()
+    for args in itertools.product(
+        ["http://website.com", "http://www.website.com", "http://x.com", "null", ""],
+        [False, True],
+        [False, True],
+        [None, "PUT"],
+        [None, "X-Custom, X-Other"],
+    ):
+        assert compiled.preflight_response_headers(*args) == reference_preflight(
+            policy, *args
+        )
+
+
+def test_compiled_immutable():
+    compiled = POLICIES[0].compile()
+    with pytest.raises(AttributeError, match="immutable"):
+        compiled.max_age = 10
+
+
+def test_static_values_rendered():
+    compiled = POLICIES[1].compile()
+    assert compiled.allow_methods == "GET, PUT"
+    assert compiled.allow_headers == "X-Custom, Content-Type"
+
+
+def test_policy_compiled_reset_on_assignment():
+    policy = Policy(name="policy1", allow_methods=["GET"])
+    compiled = policy.compiled
+    assert policy.compiled is compiled
+    policy.allow_methods = ["PUT"]
+    assert policy.compiled is not compiled
+    assert policy.compiled.allow_methods == "PUT"
+
+
+def encode(headers):
+    return tuple(
+        (name.lower().encode(), str(value).encode()) for name, value in headers.items()
+    )
+
+
+@pytest.mark.parametrize("policy", POLICIES, ids=[p.name for p in POLICIES])
+def test_preflight_header_list_same_as_str(policy):
+    compiled = policy.compile()
+    for origin, strict, credentials, method, headers in itertools.product(
+        ["http://website.com", "http://www.website.com", "http://x.com", "null", ""],
+        [False, True],
+        [False, True],
+        [None, "PUT"],
+        [None, "X-Custom, X-Other"],
+    ):
+        expected = compiled.preflight_response_headers(
+            origin, strict, credentials, method, headers
+        )
+        rv = compiled.preflight_response_header_list(
+            origin.encode(),
+            strict,
+            credentials,
+            method and method.encode(),
+            headers and headers.encode(),
+        )
+        assert rv == encode(expected)
+
+
+@pytest.mark.parametrize("policy", POLICIES, ids=[p.name for p in POLICIES])
+def test_response_header_list_same_as_str(policy):
+    compiled = policy.compile()
+    for origin, strict, credentials in itertools.product(
+        ["http://website.com", "http://www.website.com", "http://x.com", "null", ""],
+        [False, True],
+        [False, True],
+    ):
+        expected = compiled.response_headers(origin, strict, credentials)
+        rv = compiled.response_header_list(origin.encode(), strict, credentials)
+        assert rv == encode(expected)
+
+
+def test_static_header_list_reused():
+    policy = Policy(name="open", max_age=60)
+    first = policy.preflight_response_header_list(b"http://website.com")
+    second = policy.preflight_response_header_list(b"http://other.com")
+    assert first is second
+    assert first == (
+        (b"access-control-allow-origin", b"*"),
+        (b"access-control-max-age", b"60"),
+    )
+
+
+def test_header_list_cached():
+    policy = Policy(name="open", cache_size=10)
+    policy.response_header_list(b"http://website.com")
+    policy.response_headers("http://website.com")
+    policy.response_header_list(b"http://website.com")
+    info = policy.cache_info()
+    assert (info.hits, info.misses) == (1, 2)
+
+
+def test_pickle_roundtrip():
+    policy = POLICIES[1]
+    policy.compiled
+    restored = pickle.loads(pickle.dumps(policy))
+    assert restored == policy
+    assert restored._compiled is not None
+    assert restored.compiled.allow_methods == "GET, PUT"
+    assert restored.response_headers("http://www.website.com") == (
+        policy.response_headers("http://www.website.com")
+    )
+
+
+def test_hashable():
+    first = POLICIES[1].compile()
+    second = Policy(
+        name="restricted",
+        allow_credentials=True,
+        allow_origin=[rule.frozen() for rule in POLICIES[1].allow_origin],
+        allow_headers=["X-Custom", "Content-Type"],
+        allow_methods=["GET", "PUT"],
+        max_age=600,
+    ).compile()
+    assert first == second
+    assert hash(first) == hash(second)
+    assert {first: "cached"}[second] == "cached"
+    assert first != POLICIES[0].compile()
+
+
+def test_hash_reset_on_pickle():
+    compiled = POLICIES[1].compile()
+    hash(compiled)
+    restored = pickle.loads(pickle.dumps(compiled))
+    assert restored._hash is None
+    assert restored == compiled
+    assert hash(restored) == hash(compiled)
+
+
+def test_adaptive():
+    policy = Policy(name="adaptive", allow_origin=POLICIES[1].allow_origin)
+    policy.adaptive = True
+    assert isinstance(policy.compiled.matcher.patterns, AdaptivePatternSet)
+    origin = "http://www.website.com"
+    assert policy.response_headers(origin) == POLICIES[1].response_headers(origin)
+
+
+def test_evaluate_many():
+    result = POLICIES[1].evaluate_many(
+        ["http://website.com", "http://evil.com", "http://api.website.com"]
+    )
+    assert len(result) == 3
+    assert list(result) == [(True, 0), (False, None), (True, 1)]
+    assert result.flags == b"\x01\x00\x01"
+    assert result.allowed() == ["http://website.com", "http://api.website.com"]
+    assert result.denied() == ["http://evil.com"]
+
+
+def test_evaluate_many_open_and_allowlist():
+    result = POLICIES[0].evaluate_many(["http://a.com"])
+    assert result.indexes[0] == BatchResult.ANY
+    assert result[0] == (True, None)
+    policy = Policy(
+        name="allowlist",
+        allow_origin=[OriginRule(rule="http://a.com")],
+        origin_allowlist={"http://b.com"},
+    )
+    result = policy.evaluate_many(["http://a.com", "http://b.com", "http://c.com"])
+    assert list(result.indexes) == [0, BatchResult.ALLOWLIST, BatchResult.DENIED]
+
+
+def test_evaluate_many_processes(monkeypatch):
+    monkeypatch.setattr(CompiledPolicy, "PARALLEL_THRESHOLD", 10)
+    origins = [f"http://{i}.website.com" for i in range(15)] + ["http://x.com"] * 6
+    policy = POLICIES[1]
+    result = policy.evaluate_many(origins, processes=2)
+    assert result.indexes == policy.evaluate_many(origins).indexes
+    assert result.denied() == ["http://x.com"] * 6
+
+
+def test_evaluate_many_processes_resolver(monkeypatch):
+    class Backend:
+        async def resolve(self, origin):
+            return origin == "http://b.com"
+
+    monkeypatch.setattr(CompiledPolicy, "PARALLEL_THRESHOLD", 2)
+    resolver = OriginResolver(Backend())
+    policy = Policy(name="tenants", origin_allowlist=resolver)
+    assert resolver.resolve_sync("http://b.com") is True
+    # evaluated in this process, where resolver answers are cached
+    result = policy.evaluate_many(["http://a.com", "http://b.com"], processes=2)
+    assert list(result.indexes) == [BatchResult.DENIED, BatchResult.ALLOWLIST]
@@ -0,0 +1,164 @@
+import json
+
+import pytest
+
+from corslib.allowlist import write_allowlist
+from corslib.config import (
+    ConfigError,
+    load_policies,
+    parse_config,
+    policies_from_config,
+    read_snapshot,
+    source_digest,
+)
+from corslib.policy import FrozenOriginRule, InsecureRule, RuleKind
+
+TOML_CONFIG = """
+[[policy]]
+name = "api"
+allow_credentials = true
+allow_origin = [
+    "https://app.example.com",
+    {rule = "https://*.example.com", kind = "path"},
+]
+allow_methods = ["GET", "PUT"]
+max_age = 600
+
+[[policy]]
+name = "public"
+"""
+
+
+@pytest.fixture()
+def config_file(tmp_path):
+    path = tmp_path / "cors.toml"
+    path.write_text(TOML_CONFIG)
+    return path
+
+
+def test_load_toml(config_file):
+    policies = load_policies(str(config_file))
+    assert sorted(policies) == ["api", "public"]
+    api = policies["api"]
+    assert api.allow_credentials is True
+    assert api.allow_origin[1].kind == RuleKind.PATH
+    assert all(isinstance(rule, FrozenOriginRule) for rule in api.allow_origin)
+    assert api.max_age == 600
+
+
+def test_load_json(tmp_path):
+    path = tmp_path / "cors.json"
+    path.write_text(
+        json.dumps({"policy": [{"name": "api", "allow_origin": ["https://a.com"]}]})
+    )
+    policies = load_policies(str(path))
+    assert policies["api"].allow_origin[0].rule == "https://a.com"
+
+
+def test_snapshot_written_and_used(config_file, tmp_path, monkeypatch):
+    snapshot = str(tmp_path / "cors.snapshot")
+    policies = load_policies(str(config_file), snapshot=snapshot)
+
+    def fail(config):  # pragma: nocover
+        raise AssertionError("config parsed")
+
+    monkeypatch.setattr("corslib.config.policies_from_config", fail)
+    loaded = load_policies(str(config_file), snapshot=snapshot)
+    assert loaded == policies
+    rv = loaded["api"].response_headers("https://www.example.com")
+    assert rv["Access-Control-Allow-Origin"] == "https://www.example.com"
+
+
+def test_snapshot_invalidated_by_source_change(config_file, tmp_path):
+    snapshot = str(tmp_path / "cors.snapshot")
+    load_policies(str(config_file), snapshot=snapshot)
+    config_file.write_text(TOML_CONFIG.replace("600", "60"))
+    assert read_snapshot(snapshot, source_digest(config_file.read_bytes())) is None
+    policies = load_policies(str(config_file), snapshot=snapshot)
+    assert policies["api"].max_age == 60
+
+
+def test_snapshot_invalidated_by_version(config_file, tmp_path, monkeypatch):
+    snapshot = str(tmp_path / "cors.snapshot")
+    load_policies(str(config_file), snapshot=snapshot)
+    digest = source_digest(config_file.read_bytes())
+    monkeypatch.setattr("corslib.config.__version__", "999")
+    assert source_digest(config_file.read_bytes()) != digest
+
+
+def test_missing_snapshot(tmp_path):
+    assert read_snapshot(str(tmp_path / "missing"), "x") is None
+
+
+@pytest.mark.parametrize(
+    "config",
+    [
+        {"policy": [{"allow_credentials": True}]},
+        {"policy": [{"name": "a", "unknown": 1}]},
+        {"policy": [{"name": "a"}, {"name": "a"}]},
+        {"policy": [{"name": "a", "allow_origin": [{"kind": "path"}]}]},
+        {"policy": [{"name": "a", "allow_origin": [{"rule": "x", "kind": "x"}]}]},
+        {"policy": [{"name": "a", "allow_origin": "https://a.com"}]},
+        {"policy": [{"name": "a", "allow_origin": [{"rule": 1}]}]},
+        {"policy": [{"name": "a", "max_age": "abc"}]},
+        {"policy": [{"name": "a", "max_age": True}]},
+        {"policy": [{"name": "a", "allow_credentials": "yes"}]},
+        {"policy": [{"name": "a", "allow_methods": "GET"}]},
+        {"policy": [{"name": "a", "allow_headers": [1]}]},
+        {"policy": [{"name": 1}]},
+        {"policy": {"name": "a"}},
+        {"policy": [{"name": "a", "allow_credentials": True}]},
+    ],
+    ids=[
+        "no-name",
+        "unknown-key",
+        "duplicate",
+        "no-rule",
+        "invalid-kind",
+        "origin-string",
+        "rule-type",
+        "max-age-string",
+        "max-age-bool",
+        "credentials-string",
+        "methods-string",
+        "headers-item",
+        "name-type",
+        "policy-table",
+        "open-credentialed",
+    ],
+)
+def test_invalid_config(config):
+    with pytest.raises(ConfigError):
+        policies_from_config(config)
+
+
+def test_insecure_rule_wrapped():
+    config = {
+        "policy": [{"name": "a", "allow_origin": [{"rule": "*.com", "kind": "path"}]}]
+    }
+    with pytest.raises(ConfigError) as e:
+        policies_from_config(config)
+    assert isinstance(e.value.__cause__, InsecureRule)
+
+
+@pytest.mark.parametrize(
+    ("content", "fmt"), [(b"{", "json"), (b"[[x", "toml"), (b"", "yaml")]
+)
+def test_parse_invalid(content, fmt):
+    with pytest.raises(ConfigError):
+        parse_config(content, fmt)
+
+
+def test_origin_allowlist(tmp_path):
+    allowlist = tmp_path / "origins.bin"
+    write_allowlist(str(allowlist), ["https://other.example.org"])
+    config = {"policy": [{"name": "api", "origin_allowlist": str(allowlist)}]}
+    policy = policies_from_config(config)["api"]
+    assert policy.response_headers("https://other.example.org")
+    assert policy.response_headers("https://app.example.com") == {}
+
+
+def test_origin_allowlist_invalid(tmp_path):
+    config = {"policy": [{"name": "api", "origin_allowlist": str(tmp_path / "x")}]}
+    with pytest.raises(ConfigError):
+        policies_from_config(config)
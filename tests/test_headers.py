@@ -0,0 +1,128 @@
+import pytest
+
+from corslib.headers import (
+    apply_header_dict,
+    apply_header_list,
+    apply_multidict,
+    merge_vary,
+    vary_tokens,
+)
+from corslib.policy import OriginRule, Policy
+
+CORS = {"Access-Control-Allow-Origin": "http://website.com", "Vary": "Origin"}
+
+
+class GetListHeaders:
+    """Minimal case-insensitive multidict with werkzeug-like interface."""
+
+    def __init__(self, items):
+        self.items = list(items)
+
+    def _values(self, name):
+        return [v for n, v in self.items if n.lower() == name.lower()]
+
+    def getlist(self, name):
+        return self._values(name)
+
+    def __setitem__(self, name, value):
+        # like Starlette MutableHeaders, values have to be str
+        value.encode("latin-1")
+        self.items = [(n, v) for n, v in self.items if n.lower() != name.lower()]
+        self.items.append((name, value))
+
+
+class GetAllHeaders(GetListHeaders):
+    """Minimal case-insensitive multidict with multidict-like interface."""
+
+    def getall(self, name, default):
+        return self._values(name) or default
+
+    def getlist(self, name):  # pragma: nocover
+        raise AssertionError("getall expected")
+
+
+@pytest.mark.parametrize(
+    ("value", "added", "expected"),
+    [
+        ("Accept-Encoding", "Origin", "Accept-Encoding, Origin"),
+        ("accept-encoding,ORIGIN", "Origin", "accept-encoding,ORIGIN"),
+        ("*", "Origin", "*"),
+        ("", "Origin", "Origin"),
+        (b"Accept-Encoding", b"Origin, Cookie", b"Accept-Encoding, Origin, Cookie"),
+        (b"origin", b"Origin", b"origin"),
+    ],
+)
+def test_merge_vary(value, added, expected):
+    assert merge_vary(value, added) == expected
+
+
+def test_merge_vary_unchanged_same_object():
+    value = "Accept-Encoding, Origin"
+    assert merge_vary(value, "origin") is value
+
+
+def test_vary_tokens():
+    assert vary_tokens("Accept-Encoding , Origin") == {"accept-encoding", "origin"}
+    assert vary_tokens(b"Origin") == {b"origin"}
+
+
+def test_apply_header_list_str():
+    headers = [
+        ("Content-Type", "text/plain"),
+        ("vary", "Accept-Encoding"),
+        ("access-control-allow-origin", "*"),
+        ("Content-Length", "0"),
+        ("Access-Control-Allow-Origin", "http://other.com"),
+    ]
+    apply_header_list(headers, {**CORS, "Access-Control-Max-Age": 600})
+    assert headers == [
+        ("Content-Type", "text/plain"),
+        ("vary", "Accept-Encoding, Origin"),
+        ("Content-Length", "0"),
+        ("Access-Control-Allow-Origin", "http://website.com"),
+        ("Access-Control-Max-Age", "600"),
+    ]
+
+
+def test_apply_header_list_bytes():
+    policy = Policy(name="api", allow_origin=[OriginRule(rule="http://website.com")])
+    cors = policy.response_header_list(b"http://website.com")
+    headers = [(b"vary", b"Accept-Encoding"), (b"vary", b"origin")]
+    apply_header_list(headers, cors)
+    assert headers == [
+        (b"vary", b"Accept-Encoding"),
+        (b"vary", b"origin"),
+        (b"access-control-allow-origin", b"http://website.com"),
+    ]
+    headers = []
+    apply_header_list(headers, cors)
+    assert headers == list(cors)
+
+
+def test_apply_header_dict():
+    headers = {"VARY": "Cookie", "Content-Type": "text/plain"}
+    apply_header_dict(headers, CORS)
+    assert headers == {
+        "VARY": "Cookie, Origin",
+        "Content-Type": "text/plain",
+        "Access-Control-Allow-Origin": "http://website.com",
+    }
+    headers = {}
+    apply_header_dict(headers, CORS)
+    assert headers == CORS
+
+
+@pytest.mark.parametrize("cls", [GetListHeaders, GetAllHeaders])
+def test_apply_multidict(cls):
+    headers = cls(
+        [("Vary", "Cookie"), ("Vary", "Accept"), ("Access-Control-Allow-Origin", "*")]
+    )
+    apply_multidict(headers, CORS)
+    assert headers.items == [
+        ("Access-Control-Allow-Origin", "http://website.com"),
+        ("Vary", "Cookie, Accept, Origin"),
+    ]
+    headers = cls([("Vary", "Cookie"), ("Vary", "origin")])
+    apply_multidict(headers, {**CORS, "Access-Control-Max-Age": 600})
+    assert headers.items[:2] == [("Vary", "Cookie"), ("Vary", "origin")]
+    assert ("Access-Control-Max-Age", "600") in headers.items
@@ -0,0 +1,361 @@
+import pickle
+import random
+import threading
+
+import pytest
+
+from corslib.matching import (
+    AdaptivePatternSet,
+    OriginMatcher,
+    PatternSet,
+    SubdomainTrie,
+    disjoint,
+    literal_affixes,
+    overlapping_pairs,
+)
+from corslib.policy import OriginRule, RuleKind
+
+RULES = [
+    OriginRule(rule="http://*.website.com", kind=RuleKind.PATH),
+    OriginRule(rule="http://www.website.com"),
+    OriginRule(rule=r"^http://api\d\.website\.com$", kind=RuleKind.REGEX),
+    OriginRule(rule="http://other.com"),
+    OriginRule(rule="http://other.com"),
+    OriginRule(rule="null"),
+]
+
+
+def linear_match(rules, origin):
+    for index, rule in enumerate(rules):
+        if rule.matches(origin):
+            return index
+    return None
+
+
+@pytest.mark.parametrize(
+    "origin",
+    [
+        "http://www.website.com",
+        "http://api1.website.com",
+        "http://other.com",
+        "http://website.com",
+        "http://unknown.net",
+        "null",
+    ],
+)
+def test_match_same_as_linear_scan(origin):
+    matcher = OriginMatcher(RULES)
+    assert matcher.match(origin) == linear_match(RULES, origin)
+
+
+def test_exact_before_pattern():
+    rules = [
+        OriginRule(rule="http://www.website.com"),
+        OriginRule(rule="http://*.website.com", kind=RuleKind.PATH),
+    ]
+    matcher = OriginMatcher(rules)
+    assert matcher.match("http://www.website.com") == 0
+    assert matcher.match("http://api.website.com") == 1
+
+
+def test_allow_origin():
+    matcher = OriginMatcher(RULES)
+    assert matcher.allow_origin("http://api2.website.com") == "http://api2.website.com"
+    assert matcher.allow_origin("http://unknown.net") is None
+
+
+def test_empty():
+    matcher = OriginMatcher([])
+    assert len(matcher) == 0
+    assert matcher.match("http://website.com") is None
+
+
+def test_pattern_set_combines():
+    rules = [r for r in enumerate(RULES) if r[1].kind != RuleKind.STR]
+    patterns = PatternSet(rules)
+    assert len(patterns.segments) == 1
+    assert len(patterns) == 2
+
+
+def test_pattern_set_group_rule_separate():
+    rules = [
+        OriginRule(rule="http://*.website.com", kind=RuleKind.PATH),
+        OriginRule(rule=r"^http://(a|b)\1\.website\.com$", kind=RuleKind.REGEX),
+        OriginRule(rule="http://*.other.com", kind=RuleKind.PATH),
+        OriginRule(rule="http://*.another.com", kind=RuleKind.PATH),
+    ]
+    patterns = PatternSet(list(enumerate(rules)))
+    assert [indexes for _, indexes in patterns.segments] == [(0,), (1,), (2, 3)]
+    assert patterns.match("http://aa.website.com") == 0
+    assert patterns.match("http://bb.website.com") == 0
+    assert patterns.match("http://x.another.com") == 3
+    assert patterns.match("http://x.unknown.com") is None
+
+
+def test_pattern_set_first_match():
+    rules = [
+        OriginRule(rule="http://??.website.com", kind=RuleKind.PATH),
+        OriginRule(rule=r"^http://\w+\.website\.com$", kind=RuleKind.REGEX),
+    ]
+    patterns = PatternSet(list(enumerate(rules)))
+    assert patterns.match("http://ab.website.com") == 0
+    assert patterns.match("http://abc.website.com") == 1
+
+
+def test_pattern_set_null():
+    rules = [OriginRule(rule="^null$", kind=RuleKind.REGEX)]
+    assert PatternSet(list(enumerate(rules))).match("null") is None
+
+
+def test_pattern_set_chunks(monkeypatch):
+    monkeypatch.setattr(PatternSet, "CHUNK_SIZE", 2)
+    rules = [
+        OriginRule(rule=f"http://*.site{num}.com", kind=RuleKind.PATH)
+        for num in range(5)
+    ]
+    patterns = PatternSet(list(enumerate(rules)))
+    assert [indexes for _, indexes in patterns.segments] == [(0, 1), (2, 3), (4,)]
+    assert patterns.prefilter is not None
+    assert patterns.match("http://www.site3.com") == 3
+    assert patterns.match("http://www.site4.com") == 4
+    assert patterns.match("http://www.site5.com") is None
+
+
+def test_match_many_same_as_match():
+    origins = [
+        "http://www.website.com",
+        "http://api1.website.com",
+        "http://other.com",
+        "http://unknown.net",
+        "http://other.com",
+        "null",
+        "http://website.com",
+    ]
+    matcher = OriginMatcher(RULES)
+    expected = [matcher.match(origin) for origin in origins]
+    assert list(matcher.match_many(origins)) == [
+        -1 if index is None else index for index in expected
+    ]
+
+
+def test_match_many_exact_only():
+    matcher = OriginMatcher([OriginRule(rule="http://a.com")])
+    assert list(matcher.match_many(["http://b.com", "http://a.com"])) == [-1, 0]
+    assert list(matcher.match_many([])) == []
+
+
+WILDCARD_RULES = [
+    OriginRule(rule="https://*.tenant.example.com", kind=RuleKind.PATH),
+    OriginRule(rule="https://*.example.com", kind=RuleKind.PATH),
+    OriginRule(rule="https://*.example.com:8443", kind=RuleKind.PATH),
+    OriginRule(rule="http://*.example.com", kind=RuleKind.PATH),
+    OriginRule(rule="https://*.example.com", kind=RuleKind.PATH),
+    OriginRule(rule="https://a?.other.com", kind=RuleKind.PATH),
+    OriginRule(rule="https://*.other.com", kind=RuleKind.PATH),
+]
+
+
+@pytest.mark.parametrize(
+    "rule",
+    [
+        "https://*.example.com",
+        "https://*.a-b.c_d.com:8080",
+        "git+ssh://*.x.org",
+        "HTTPS://*.Example.com:443",
+    ],
+)
+def test_subdomain_trie_key(rule):
+    assert SubdomainTrie.key(OriginRule(rule=rule, kind=RuleKind.PATH)) is not None
+
+
+@pytest.mark.parametrize(
+    "rule",
+    [
+        "https://a*.example.com",
+        "https://*.example.[cn]om",
+        "https://*.ex?mple.com",
+        "https://*example.com",
+        "https://*.example.com:8?",
+        "https://*..example.com",
+    ],
+)
+def test_subdomain_trie_key_other_glob(rule):
+    assert SubdomainTrie.key(OriginRule(rule=rule, kind=RuleKind.PATH)) is None
+
+
+def test_subdomain_trie_indexes_rules():
+    matcher = OriginMatcher(WILDCARD_RULES)
+    assert len(matcher.wildcards) == 6
+    assert len(matcher.patterns) == 1
+
+
+@pytest.mark.parametrize(
+    "origin",
+    [
+        "https://a.tenant.example.com",
+        "https://a.b.tenant.example.com",
+        "https://tenant.example.com",
+        "https://.example.com",
+        "https://example.com",
+        "https://a.example.com:8443",
+        "https://a.example.com:443",
+        "https://a.example.com:",
+        "http://a.example.com",
+        "HTTPS://a.example.com",
+        "https://A.EXAMPLE.COM",
+        "https://a:1.example.com",
+        "https://x://a.example.com",
+        "https://ab.other.com",
+        "https://abc.other.com",
+        "https://a.example.com.evil.com",
+        "https://evil.com?.example.com",
+        "a.example.com",
+        "null",
+        "",
+    ],
+)
+def test_subdomain_trie_same_as_linear_scan(origin):
+    matcher = OriginMatcher(WILDCARD_RULES)
+    assert matcher.match(origin) == linear_match(WILDCARD_RULES, origin)
+    assert list(matcher.match_many([origin])) == [
+        -1 if matcher.match(origin) is None else matcher.match(origin)
+    ]
+
+
+def test_subdomain_trie_first_match_with_patterns():
+    rules = [
+        OriginRule(rule="https://a?.example.com", kind=RuleKind.PATH),
+        OriginRule(rule="https://*.example.com", kind=RuleKind.PATH),
+        OriginRule(rule=r"^https://\w+\.example\.com$", kind=RuleKind.REGEX),
+    ]
+    matcher = OriginMatcher(rules)
+    assert matcher.match("https://ab.example.com") == 0
+    assert matcher.match("https://abc.example.com") == 1
+
+
+@pytest.mark.parametrize(
+    ("rule", "kind", "affixes"),
+    [
+        ("http://Other.com:80", RuleKind.STR, ("http://other.com", "http://other.com")),
+        ("http://app-*.website.com", RuleKind.PATH, ("http://app-", ".website.com")),
+        ("http://[ab].website.com:8?", RuleKind.PATH, ("http://", "")),
+        (
+            r"^http://api\d\.website\.com$",
+            RuleKind.REGEX,
+            ("http://api", ".website.com"),
+        ),
+        (r"^https?://x\.com$", RuleKind.REGEX, ("http", "://x.com")),
+        (r"^http://ab+\.com$", RuleKind.REGEX, ("http://ab", ".com")),
+        (r"^http://(a|b)\.com$", RuleKind.REGEX, ("", "")),
+        (r"^http://x\.(?:com|net)$", RuleKind.REGEX, ("", "")),
+    ],
+)
+def test_literal_affixes(rule, kind, affixes):
+    assert literal_affixes(OriginRule(rule=rule, kind=kind)) == affixes
+
+
+@pytest.mark.parametrize(
+    ("first", "second", "expected"),
+    [
+        (("http://a", ".com"), ("http://b", ".com"), True),
+        (("http://", ".a.com"), ("http://", ".b.com"), True),
+        (("http://", ".a.com"), ("http://x", ".com"), False),
+        (("", ""), ("http://a", ".com"), False),
+    ],
+)
+def test_disjoint(first, second, expected):
+    assert disjoint(first, second) is expected
+    assert disjoint(second, first) is expected
+
+
+def test_overlapping_pairs_same_as_disjoint():
+    rnd = random.Random(0)
+    for _ in range(200):
+        affixes = [
+            tuple("".join(rnd.choices("ab", k=rnd.randint(0, 3))) for _ in range(2))
+            for _ in range(rnd.randint(0, 20))
+        ]
+        expected = {
+            (earlier, later)
+            for later in range(len(affixes))
+            for earlier in range(later)
+            if not disjoint(affixes[earlier], affixes[later])
+        }
+        assert overlapping_pairs(affixes) == expected
+
+
+ADAPTIVE_RULES = [
+    OriginRule(rule=r"^http://[a-z]+\.one\.com$", kind=RuleKind.REGEX),
+    OriginRule(rule="http://app-*.two.com", kind=RuleKind.PATH),
+    OriginRule(rule=r"^http://api\d\.three\.com$", kind=RuleKind.REGEX),
+    OriginRule(rule=r"^http://api\d\.[a-z]+\.com$", kind=RuleKind.REGEX),
+]
+
+
+def adaptive_set(monkeypatch, interval=10):
+    monkeypatch.setattr(AdaptivePatternSet, "INTERVAL", interval)
+    return AdaptivePatternSet(list(enumerate(ADAPTIVE_RULES)))
+
+
+def test_adaptive_hot_rule_first(monkeypatch):
+    patterns = adaptive_set(monkeypatch)
+    assert patterns.order == (0, 1, 2, 3)
+    for _ in range(10):
+        assert patterns.match("http://app-1.two.com") == 1
+    assert patterns.order[0] == 1
+    assert patterns.hits()[1] == 5
+
+
+def test_adaptive_overlapping_keep_order(monkeypatch):
+    patterns = adaptive_set(monkeypatch)
+    for _ in range(10):
+        assert patterns.match("http://api1.four.com") == 3
+    # rule 3 overlaps rule 2, it may not be moved before it
+    assert patterns.order.index(3) > patterns.order.index(2)
+    for _ in range(10):
+        assert patterns.match("http://api1.three.com") == 2
+
+
+def test_adaptive_same_as_linear_scan(monkeypatch):
+    patterns = adaptive_set(monkeypatch, interval=7)
+    origins = [
+        "http://www.one.com",
+        "http://app-x.two.com",
+        "http://api1.three.com",
+        "http://api2.four.com",
+        "http://unknown.net",
+        "http://www.one.com\nx",
+        "null",
+    ]
+    rnd = random.Random(0)
+    for _ in range(500):
+        origin = rnd.choice(origins)
+        assert patterns.match(origin) == linear_match(ADAPTIVE_RULES, origin)
+
+
+def test_adaptive_concurrent(monkeypatch):
+    patterns = adaptive_set(monkeypatch, interval=3)
+    origins = ["http://api1.three.com", "http://app-x.two.com", "http://api2.x.com"]
+    errors = []
+
+    def run(origin):
+        for _ in range(300):
+            if patterns.match(origin) != linear_match(ADAPTIVE_RULES, origin):
+                errors.append(origin)
+
+    threads = [threading.Thread(target=run, args=(o,)) for o in origins * 2]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert sorted(patterns.order) == [0, 1, 2, 3]
+
+
+def test_adaptive_matcher_pickle():
+    matcher = OriginMatcher(RULES + ADAPTIVE_RULES, adaptive=True)
+    assert isinstance(matcher.patterns, AdaptivePatternSet)
+    restored = pickle.loads(pickle.dumps(matcher))
+    assert restored.match("http://api1.three.com") == len(RULES) + 2
+    assert restored.match("http://www.one.com") == len(RULES)
+    assert restored.match("http://api1.website.com") == 0
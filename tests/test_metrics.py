@@ -0,0 +1,122 @@
+import pytest
+
+from corslib.metrics import (
+    Counter,
+    Histogram,
+    Metric,
+    MetricsRegistry,
+    PolicyMetrics,
+)
+from corslib.policy import OriginRule, Policy, RuleKind
+
+
+@pytest.fixture()
+def registry():
+    return MetricsRegistry()
+
+
+@pytest.fixture()
+def policy(registry):
+    return Policy(
+        name="policy1",
+        allow_origin=[
+            OriginRule(rule="http://website.com"),
+            OriginRule(rule="http://*.website.com", kind=RuleKind.PATH),
+        ],
+        metrics=PolicyMetrics(registry),
+    )
+
+
+def test_decisions_counted(policy):
+    policy.preflight_response_headers("http://website.com")
+    policy.response_headers("http://api.website.com")
+    policy.response_header_list(b"http://api.website.com")
+    policy.response_headers("http://other.com")
+    policy.response_headers("")
+    metrics = policy.metrics
+    assert metrics.decisions.get(("policy1", "preflight", "allowed")) == 1
+    assert metrics.decisions.get(("policy1", "response", "allowed")) == 2
+    assert metrics.decisions.get(("policy1", "response", "denied")) == 1
+    assert metrics.decisions.get(("policy1", "response", "no_origin")) == 1
+    assert metrics.matches.get(("policy1", "0")) == 1
+    assert metrics.matches.get(("policy1", "1")) == 2
+
+
+def test_rule_matches_disabled(registry, policy):
+    policy.metrics = PolicyMetrics(registry, rule_matches=False)
+    policy.response_headers("http://website.com")
+    assert policy.metrics.matches.get(("policy1", "0")) == 0
+
+
+def test_adaptive_match_counted_once(registry):
+    policy = Policy(
+        name="adaptive",
+        allow_origin=[
+            OriginRule(rule=r"^http://api\d\.website\.com$", kind=RuleKind.REGEX)
+        ],
+        metrics=PolicyMetrics(registry),
+        adaptive=True,
+    )
+    for _ in range(3):
+        policy.response_headers("http://api1.website.com")
+    assert policy.metrics.matches.get(("adaptive", "0")) == 3
+    assert policy.matcher.patterns.hits() == {0: 3}
+
+
+def test_metric_abstract():
+    with pytest.raises(TypeError):
+        Metric("name", "help")
+
+
+def test_latency_recorded(policy):
+    policy.response_headers("http://website.com")
+    policy.response_headers("http://website.com")
+    state = policy.metrics.latency.values[("policy1", "response")]
+    assert state[-1] == 2
+
+
+def test_counter_render():
+    counter = Counter("requests", 'Number of "requests".', ("path",))
+    counter.inc(("/a",))
+    counter.inc(("/a",), 2)
+    counter.inc(('/b"\n',))
+    assert counter.render() == (
+        '# HELP requests Number of \\"requests\\".\n'
+        "# TYPE requests counter\n"
+        'requests_total{path="/a"} 3\n'
+        'requests_total{path="/b\\"\\n"} 1\n'
+    )
+
+
+def test_histogram_render():
+    histogram = Histogram("latency", "Latency.", buckets=(0.1, 1))
+    histogram.observe(0.05)
+    histogram.observe(0.1)
+    histogram.observe(5)
+    assert histogram.render() == (
+        "# HELP latency Latency.\n"
+        "# TYPE latency histogram\n"
+        'latency_bucket{le="0.1"} 2\n'
+        'latency_bucket{le="1"} 2\n'
+        'latency_bucket{le="+Inf"} 3\n'
+        "latency_sum 5.15\n"
+        "latency_count 3\n"
+    )
+
+
+def test_registry_reuses_metric(registry):
+    first = registry.counter("requests", "Requests.", ("path",))
+    assert registry.counter("requests", "Requests.", ("path",)) is first
+    with pytest.raises(ValueError, match="already registered"):
+        registry.histogram("requests", "Requests.")
+
+
+def test_registry_render(registry, policy):
+    policy.response_headers("http://website.com")
+    text = registry.render()
+    assert "# TYPE corslib_decisions counter" in text
+    assert (
+        'corslib_decisions_total{policy="policy1",kind="response",outcome="allowed"} 1'
+        in text
+    )
+    assert "# TYPE corslib_evaluation_seconds histogram" in text
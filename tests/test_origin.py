@@ -0,0 +1,75 @@
+import pytest
+
+from corslib.origin import (
+    CACHE_SIZE,
+    Origin,
+    canonical_origin,
+    canonical_pattern,
+    parse_origin,
+)
+
+
+@pytest.mark.parametrize(
+    ("origin", "expected"),
+    [
+        ("https://app.example.com", Origin("https", "app.example.com")),
+        ("HTTPS://App.Example.COM:443", Origin("https", "app.example.com")),
+        ("http://example.com:80", Origin("http", "example.com")),
+        ("http://example.com:443", Origin("http", "example.com", 443)),
+        ("https://example.com:8443", Origin("https", "example.com", 8443)),
+        ("wss://example.com:443", Origin("wss", "example.com")),
+        ("app://local", Origin("app", "local")),
+        ("http://[::1]:8000", Origin("http", "[::1]", 8000)),
+        ("http://127.0.0.1", Origin("http", "127.0.0.1")),
+    ],
+)
+def test_parse(origin, expected):
+    assert parse_origin(origin) == expected
+
+
+@pytest.mark.parametrize(
+    "origin",
+    [
+        "null",
+        "",
+        "*",
+        "example.com",
+        "https://",
+        "https://example.com/",
+        "https://example.com/path",
+        "https://user@example.com",
+        "https://example.com:",
+        "https://example.com:99999",
+        "https://example.com:8x",
+        "https://exa mple.com",
+        "https://x://example.com",
+        "1http://example.com",
+    ],
+)
+def test_parse_invalid(origin):
+    assert parse_origin(origin) is None
+
+
+def test_canonical_origin():
+    assert canonical_origin("HTTPS://App.Example.com:443") == "https://app.example.com"
+    assert canonical_origin("http://App:8080") == "http://app:8080"
+    assert canonical_origin("null") == "null"
+
+
+def test_cache_bounded():
+    assert parse_origin.cache_info().maxsize == CACHE_SIZE
+    assert canonical_origin.cache_info().maxsize == CACHE_SIZE
+
+
+@pytest.mark.parametrize(
+    ("pattern", "expected"),
+    [
+        ("HTTPS://*.Example.com", "https://*.example.com"),
+        ("https://*.example.com:443", "https://*.example.com"),
+        ("https://*.example.com:8443", "https://*.example.com:8443"),
+        ("http://*.example.com:443", "http://*.example.com:443"),
+        ("*.example.com:80", "*.example.com:80"),
+    ],
+)
+def test_canonical_pattern(pattern, expected):
+    assert canonical_pattern(pattern) == expected
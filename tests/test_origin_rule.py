@@ -1,6 +1,8 @@
+import pickle
+
 import pytest
 
-from corslib.policy import OriginRule, RuleKind, InsecureRule
+from corslib.policy import FrozenOriginRule, InsecureRule, OriginRule, Policy, RuleKind
 
 
 def test_default_create():
@@ -143,3 +145,78 @@ def test_invalid_path_rule_open_ended(rule):
     with pytest.raises(InsecureRule, match="open ended") as e:
         OriginRule(rule=rule, kind=RuleKind.PATH)
     assert e.value.rule == rule
+
+
+@pytest.mark.parametrize(
+    ("rule", "kind"),
+    [("http://*.website.com", RuleKind.PATH), (r"^website\.com$", RuleKind.REGEX)],
+    ids=["path", "regex"],
+)
+def test_pattern_compiled(rule, kind):
+    r = OriginRule(rule=rule, kind=kind)
+    assert r.compiled is not None
+
+
+def test_str_not_compiled():
+    r = OriginRule(rule="http://website.com")
+    assert r.compiled is None
+
+
+FROZEN_RULES = [
+    OriginRule(rule="http://Website.com"),
+    OriginRule(rule="http://*.website.com", kind=RuleKind.PATH),
+    OriginRule(rule=r"^https?://api\.website\.com$", kind=RuleKind.REGEX),
+]
+
+
+@pytest.mark.parametrize("rule", FROZEN_RULES, ids=["str", "path", "regex"])
+@pytest.mark.parametrize(
+    "origin",
+    ["http://website.com", "http://www.website.com", "https://api.website.com", "null"],
+)
+def test_frozen_same_as_rule(rule, origin):
+    frozen = rule.frozen()
+    assert frozen.matches(origin) == rule.matches(origin)
+    assert frozen.allow_origin(origin) == rule.allow_origin(origin)
+
+
+@pytest.mark.parametrize("rule", FROZEN_RULES, ids=["str", "path", "regex"])
+def test_frozen_compact(rule):
+    frozen = rule.frozen()
+    assert frozen == FrozenOriginRule(rule.rule, rule.kind)
+    assert frozen.frozen() is frozen
+    assert hash(frozen) == hash(FrozenOriginRule(rule.rule, rule.kind))
+    assert not hasattr(frozen, "__dict__")
+    data = pickle.dumps(frozen)
+    assert pickle.loads(data) == frozen
+    assert len(data) < len(pickle.dumps(rule))
+
+
+@pytest.mark.parametrize(
+    ("rule", "kind"),
+    [("^.*$", RuleKind.REGEX), ("website.com", RuleKind.REGEX), ("*", RuleKind.PATH)],
+    ids=["too-broad", "partial", "open-ended"],
+)
+def test_frozen_validated(rule, kind):
+    frozen = FrozenOriginRule(rule, kind)
+    with pytest.raises(InsecureRule):
+        Policy(name="x", allow_credentials=True, allow_origin=[frozen])
+    policy = Policy(name="x", allow_origin=[OriginRule("http://website.com")])
+    policy.allow_origin = [frozen]
+    with pytest.raises(InsecureRule):
+        policy.compiled
+
+
+def test_frozen_create():
+    frozen = FrozenOriginRule.create(r"^https://api\.website\.com$", RuleKind.REGEX)
+    assert frozen.compiled is not None
+    assert frozen.matches("https://api.website.com")
+    assert frozen == FrozenOriginRule(frozen.rule, RuleKind.REGEX)
+    assert hash(frozen) == hash(FrozenOriginRule(frozen.rule, RuleKind.REGEX))
+    with pytest.raises(InsecureRule):
+        FrozenOriginRule.create("^.*$", RuleKind.REGEX)
+
+
+def test_frozen_shares_compiled_pattern():
+    rule = OriginRule(rule="http://*.website.com", kind=RuleKind.PATH)
+    assert rule.frozen().compile() is rule.compiled
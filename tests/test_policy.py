@@ -97,3 +97,178 @@ def test_response_headers_null_origin_strict():
     policy = Policy(name="policy1")
     rv = policy.response_headers("null", strict=True)
     assert rv == {}
+
+
+def test_preflight_headers_origin_denied():
+    policy = Policy(
+        name="policy1", allow_origin=[OriginRule(rule="http://website.com")]
+    )
+    rv = policy.preflight_response_headers("http://other.com")
+    assert rv == {}
+
+
+def test_response_headers_origin_denied():
+    policy = Policy(
+        name="policy1", allow_origin=[OriginRule(rule="http://website.com")]
+    )
+    rv = policy.response_headers("http://other.com")
+    assert rv == {}
+
+
+def test_matcher_rebuilt_on_assignment():
+    policy = Policy(
+        name="policy1", allow_origin=[OriginRule(rule="http://website.com")]
+    )
+    assert policy.response_headers("http://other.com") == {}
+    policy.allow_origin = [OriginRule(rule="http://other.com")]
+    rv = policy.response_headers("http://other.com")
+    assert rv[Policy.ACCESS_CONTROL_ALLOW_ORIGIN] == "http://other.com"
+
+
+def test_matcher_invalidate():
+    rules = [OriginRule(rule="http://website.com")]
+    policy = Policy(name="policy1", allow_origin=rules)
+    assert policy.response_headers("http://other.com") == {}
+    rules.append(OriginRule(rule="http://other.com"))
+    policy.invalidate()
+    rv = policy.response_headers("http://other.com")
+    assert rv[Policy.ACCESS_CONTROL_ALLOW_ORIGIN] == "http://other.com"
+
+
+def test_cache_disabled():
+    policy = Policy(name="policy1")
+    assert policy.cache_info() is None
+
+
+def test_cache_hit():
+    policy = Policy(
+        name="policy1",
+        allow_origin=[OriginRule(rule="http://website.com")],
+        cache_size=10,
+    )
+    first = policy.preflight_response_headers("http://website.com")
+    second = policy.preflight_response_headers("http://website.com")
+    assert first == second
+    info = policy.cache_info()
+    assert (info.hits, info.misses) == (1, 1)
+
+
+def test_cache_result_not_shared():
+    policy = Policy(name="policy1", cache_size=10)
+    policy.response_headers("http://website.com")["Vary"] = "Cookie"
+    assert "Vary" not in policy.response_headers("http://website.com")
+
+
+def test_cache_bounded():
+    policy = Policy(name="policy1", cache_size=2)
+    for num in range(5):
+        policy.response_headers(f"http://site{num}.com")
+    info = policy.cache_info()
+    assert info.size == 2
+    assert info.evictions == 3
+
+
+def test_cache_invalidate():
+    policy = Policy(name="policy1", cache_size=10)
+    policy.response_headers("http://website.com")
+    policy.invalidate()
+    assert policy.cache_info().size == 0
+
+
+def test_origin_canonical_form():
+    policy = Policy(
+        name="test",
+        allow_origin=[
+            OriginRule(rule="https://app.example.com"),
+            OriginRule(rule="HTTPS://*.Tenant.com:443", kind=RuleKind.PATH),
+        ],
+    )
+    for origin in ["https://App.Example.com:443", "https://x.tenant.com"]:
+        headers = policy.response_headers(origin)
+        assert headers[Policy.ACCESS_CONTROL_ALLOW_ORIGIN] == origin
+    assert policy.response_headers("https://app.example.com:8443") == {}
+    assert policy.response_headers("http://app.example.com") == {}
+
+
+@pytest.fixture()
+def enforcing():
+    return Policy(
+        name="enforcing",
+        allow_origin=[OriginRule(rule="http://website.com")],
+        allow_methods=["PUT", "Delete"],
+        allow_headers=["X-Custom"],
+        enforce=True,
+    )
+
+
+@pytest.mark.parametrize(
+    ("method", "headers"),
+    [
+        ("PUT", None),
+        ("delete", None),
+        ("GET", None),
+        ("PUT", "x-custom"),
+        ("PUT", "Content-Type, X-CUSTOM"),
+        ("PUT", "x-custom,,accept"),
+        (None, "x-custom"),
+    ],
+)
+def test_enforce_allowed(enforcing, method, headers):
+    rv = enforcing.preflight_response_headers(
+        "http://website.com", request_method=method, request_headers=headers
+    )
+    assert rv[Policy.ACCESS_CONTROL_ALLOW_ORIGIN] == "http://website.com"
+    raw = enforcing.preflight_response_header_list(
+        b"http://website.com",
+        request_method=method and method.encode(),
+        request_headers=headers and headers.encode(),
+    )
+    assert raw
+
+
+@pytest.mark.parametrize(
+    ("method", "headers"),
+    [("PATCH", None), ("PUT", "X-Other"), ("PUT", "x-custom, x-other")],
+)
+def test_enforce_denied(enforcing, method, headers):
+    rv = enforcing.preflight_response_headers(
+        "http://website.com", request_method=method, request_headers=headers
+    )
+    assert rv == {}
+    raw = enforcing.preflight_response_header_list(
+        b"http://website.com",
+        request_method=method.encode(),
+        request_headers=headers and headers.encode(),
+    )
+    assert raw == ()
+    assert enforcing.response_headers("http://website.com")
+
+
+def test_enforce_header_helpers(enforcing):
+    assert enforcing.access_control_allow_methods("PATCH") == {}
+    assert enforcing.access_control_allow_methods("PUT")
+    assert enforcing.access_control_allow_headers("X-Other") == {}
+    assert enforcing.access_control_allow_headers("X-Custom")
+    enforcing.enforce = False
+    assert enforcing.access_control_allow_methods("PATCH")
+    assert enforcing.preflight_response_headers(
+        "http://website.com", request_method="PATCH"
+    )
+
+
+def test_enforce_unrestricted():
+    policy = Policy(name="open", enforce=True)
+    assert policy.preflight_response_headers(
+        "http://any.com", request_method="GET", request_headers="X-Any"
+    )
+
+
+def test_enforce_default_methods():
+    policy = Policy(name="open", enforce=True)
+    for method in ["DELETE", "PUT", "PATCH"]:
+        assert not policy.preflight_response_headers(
+            "http://any.com", request_method=method
+        )
+        assert not policy.preflight_response_header_list(
+            b"http://any.com", request_method=method.encode()
+        )
@@ -0,0 +1,106 @@
+import pytest
+
+from corslib.policy import OriginRule, Policy
+from corslib.preflight import PreflightResponder, PreflightResponse
+
+PREFLIGHT = {
+    "request_credentials": True,
+    "request_method": b"PUT",
+    "request_headers": b"X-Custom",
+}
+
+
+@pytest.fixture()
+def policy():
+    return Policy(
+        name="api",
+        allow_credentials=True,
+        allow_origin=[OriginRule(rule="http://website.com")],
+        allow_methods=["GET", "PUT"],
+        allow_headers=["X-Custom"],
+        max_age=600,
+    )
+
+
+def test_render():
+    response = PreflightResponse.render(
+        ((b"access-control-allow-origin", b"*"), (b"access-control-max-age", b"60"))
+    )
+    assert response.status == 204
+    assert response.raw == (
+        b"HTTP/1.1 204 No Content\r\n"
+        b"access-control-allow-origin: *\r\n"
+        b"access-control-max-age: 60\r\n"
+        b"\r\n"
+    )
+    assert response.str_headers == (
+        ("access-control-allow-origin", "*"),
+        ("access-control-max-age", "60"),
+    )
+
+
+def test_respond_same_as_policy(policy):
+    responder = PreflightResponder()
+    for origin in [b"http://website.com", b"http://other.com"]:
+        response = responder.respond(policy, origin, **PREFLIGHT)
+        assert response.headers == policy.preflight_response_header_list(
+            origin, **PREFLIGHT
+        )
+        assert response.raw.endswith(b"\r\n\r\n")
+
+
+def test_respond_cached(policy):
+    responder = PreflightResponder(maxsize=2)
+    first = responder.respond(policy, b"http://website.com", **PREFLIGHT)
+    assert responder.respond(policy, b"http://website.com", **PREFLIGHT) is first
+    other = responder.respond(policy, b"http://website.com", request_method=b"GET")
+    assert other is not first
+    responder.respond(policy, b"http://other.com", **PREFLIGHT)
+    info = responder.cache_info()
+    assert (info.hits, info.misses, info.evictions, info.size) == (1, 3, 1, 2)
+    responder.clear()
+    assert responder.cache_info().size == 0
+
+
+def test_policy_change_not_stale(policy):
+    responder = PreflightResponder()
+    first = responder.respond(policy, b"http://website.com", **PREFLIGHT)
+    policy.max_age = 60
+    second = responder.respond(policy, b"http://website.com", **PREFLIGHT)
+    assert (b"access-control-max-age", b"60") in second.headers
+    assert second is not first
+
+
+def test_unhashable_allowlist_not_cached():
+    policy = Policy(name="api", origin_allowlist={"http://website.com"})
+    responder = PreflightResponder()
+    response = responder.respond(policy, b"http://website.com", request_method=b"PUT")
+    assert (b"access-control-allow-origin", b"http://website.com") in response.headers
+    assert responder.cache_info().size == 0
+
+
+def test_render_error_not_masked(policy, monkeypatch):
+    calls = []
+    render = PreflightResponse.render
+
+    def fail_once(headers):
+        calls.append(headers)
+        if len(calls) == 1:
+            raise TypeError("render failed")
+        return render(headers)  # pragma: nocover
+
+    monkeypatch.setattr(PreflightResponse, "render", fail_once)
+    with pytest.raises(TypeError, match="render failed"):
+        PreflightResponder().respond(policy, b"http://website.com", **PREFLIGHT)
+    assert len(calls) == 1
+
+
+def test_ttl(policy, monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("corslib.preflight.time.monotonic", lambda: now[0])
+    responder = PreflightResponder(ttl=10)
+    first = responder.respond(policy, b"http://website.com", **PREFLIGHT)
+    now[0] = 109.0
+    assert responder.respond(policy, b"http://website.com", **PREFLIGHT) is first
+    now[0] = 110.0
+    assert responder.respond(policy, b"http://website.com", **PREFLIGHT) is not first
@@ -0,0 +1,65 @@
+import pytest
+
+from corslib.policy import Policy
+from corslib.registry import PolicyRegistry, RadixTree
+
+API = Policy(name="api")
+ADMIN = Policy(name="admin")
+HOOKS = Policy(name="hooks")
+TENANT = Policy(name="tenant")
+DEFAULT = Policy(name="default")
+
+
+@pytest.fixture()
+def registry():
+    registry = PolicyRegistry(default=DEFAULT)
+    registry.register("/api/", API)
+    registry.register("/api/admin/", ADMIN)
+    registry.register("/api/hooks", HOOKS)
+    registry.register("/api/", TENANT, host="Tenant.example.com")
+    return registry
+
+
+@pytest.mark.parametrize(
+    ("path", "host", "expected"),
+    [
+        ("/api/users", None, API),
+        ("/api/admin/users", None, ADMIN),
+        ("/api/admin", None, API),
+        ("/api/hooks/github", None, HOOKS),
+        ("/api/hooksy", None, HOOKS),
+        ("/static/app.js", None, DEFAULT),
+        ("/api/users", "tenant.example.com:8000", TENANT),
+        ("/api/users", "other.example.com", API),
+        ("/static/app.js", "tenant.example.com", DEFAULT),
+    ],
+)
+def test_resolve(registry, path, host, expected):
+    assert registry.resolve(path, host) is expected
+
+
+def test_len(registry):
+    assert len(registry) == 4
+
+
+def test_no_default():
+    registry = PolicyRegistry()
+    registry.register("/api/", API)
+    assert registry.resolve("/other") is None
+
+
+def test_tree_split_and_replace():
+    tree = RadixTree()
+    for prefix in ["/abc", "/abd", "/ab", "/a", "/abc"]:
+        tree.insert(prefix, Policy(name=prefix))
+    assert len(tree) == 4
+    assert sorted(prefix for prefix, _ in tree.items()) == ["/a", "/ab", "/abc", "/abd"]
+    assert tree.longest_prefix("/abcd").name == "/abc"
+    assert tree.longest_prefix("/abx").name == "/ab"
+    assert tree.longest_prefix("/b") is None
+
+
+def test_tree_root_prefix():
+    tree = RadixTree()
+    tree.insert("", DEFAULT)
+    assert tree.longest_prefix("/anything") is DEFAULT
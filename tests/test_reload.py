@@ -0,0 +1,151 @@
+import os
+import signal
+import threading
+
+import pytest
+
+from corslib.metrics import MetricsRegistry, PolicyMetrics
+from corslib.policy import OriginRule, Policy
+from corslib.reload import FileWatcher, PolicyHolder
+from corslib.wsgi import CORSMiddleware
+
+CONFIG = """
+[[policy]]
+name = "api"
+allow_origin = ["https://{origin}"]
+
+[[policy]]
+name = "public"
+"""
+
+
+@pytest.fixture()
+def config_file(tmp_path):
+    path = tmp_path / "cors.toml"
+    path.write_text(CONFIG.format(origin="a.com"))
+    return path
+
+
+def test_from_config(config_file):
+    holder = PolicyHolder.from_config(str(config_file))
+    assert sorted(holder.policies) == ["api", "public"]
+    assert holder["api"].allow_origin[0].rule == "https://a.com"
+    assert holder.get("missing") is None
+
+
+def test_reload_replaces_changed(config_file):
+    holder = PolicyHolder.from_config(str(config_file))
+    api, public = holder["api"], holder["public"]
+    config_file.write_text(CONFIG.format(origin="b.com"))
+    assert holder.reload() is True
+    assert holder["api"] is not api
+    assert holder["api"].allow_origin[0].rule == "https://b.com"
+    assert holder["public"] is public
+
+
+def test_reload_failure_keeps_policies(config_file):
+    holder = PolicyHolder.from_config(str(config_file))
+    policies = holder.policies
+    config_file.write_text("[[policy]]\nname = ")
+    assert holder.reload() is False
+    assert holder.policies is policies
+
+
+def test_reload_serialized():
+    first_loading = threading.Event()
+    release_first = threading.Event()
+    loads = []
+
+    def loader():
+        n = len(loads)
+        loads.append(n)
+        if n == 0:
+            first_loading.set()
+            release_first.wait(5)
+        return {"api": Policy(name="api", max_age=n)}
+
+    holder = PolicyHolder({}, loader=loader)
+    first = threading.Thread(target=holder.reload)
+    first.start()
+    assert first_loading.wait(5)
+    second = threading.Thread(target=holder.reload)
+    second.start()
+    second.join(0.05)
+    # second reload waits instead of loading concurrently
+    assert second.is_alive()
+    assert loads == [0]
+    release_first.set()
+    first.join(5)
+    second.join(5)
+    assert loads == [0, 1]
+    assert holder["api"].max_age == 1
+
+
+def test_reload_without_loader():
+    holder = PolicyHolder({"api": Policy(name="api")})
+    with pytest.raises(RuntimeError, match="no loader"):
+        holder.reload()
+
+
+def test_swap_compiles_and_transfers_metrics():
+    metrics = PolicyMetrics(MetricsRegistry())
+    holder = PolicyHolder({"api": Policy(name="api", metrics=metrics)})
+    new = Policy(name="api", allow_origin=[OriginRule("https://a.com")])
+    old = holder.swap({"api": new})
+    assert old["api"] is not new
+    assert new.metrics is metrics
+    assert new._compiled is not None
+
+
+def test_policies_read_only():
+    holder = PolicyHolder({"api": Policy(name="api")})
+    with pytest.raises(TypeError):
+        holder.policies["other"] = Policy(name="other")
+
+
+def test_resolver_in_middleware(config_file):
+    holder = PolicyHolder.from_config(str(config_file))
+
+    def app(environ, start_response):
+        start_response("200 OK", [])
+        return [b""]
+
+    middleware = CORSMiddleware(app, holder.resolver("api"))
+    headers = []
+    environ = {"REQUEST_METHOD": "GET", "HTTP_ORIGIN": "https://b.com"}
+    middleware(environ, lambda status, h, exc_info=None: headers.append(h))
+    assert headers[-1] == []
+    config_file.write_text(CONFIG.format(origin="b.com"))
+    holder.reload()
+    middleware(environ, lambda status, h, exc_info=None: headers.append(h))
+    assert dict(headers[-1])[Policy.ACCESS_CONTROL_ALLOW_ORIGIN] == "https://b.com"
+
+
+def test_file_watcher(config_file):
+    calls = []
+    watcher = FileWatcher(str(config_file), lambda: calls.append(1))
+    assert watcher.check() is False
+    st = os.stat(config_file)
+    os.utime(config_file, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert watcher.check() is True
+    assert watcher.check() is False
+    assert calls == [1]
+
+
+def test_watch_thread_stops(config_file):
+    holder = PolicyHolder.from_config(str(config_file))
+    watcher = holder.watch(str(config_file), interval=0.01)
+    watcher.stop()
+    watcher.join(1)
+    assert not watcher.is_alive()
+
+
+def test_signal_handler(config_file, monkeypatch):
+    installed = {}
+    monkeypatch.setattr(
+        "corslib.reload.signal.signal",
+        lambda signum, handler: installed.update({signum: handler}),
+    )
+    holder = PolicyHolder.from_config(str(config_file))
+    holder.install_signal_handler()
+    assert signal.SIGHUP in installed
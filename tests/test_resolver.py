@@ -0,0 +1,129 @@
+import asyncio
+
+import pytest
+
+from corslib.policy import OriginRule, Policy
+from corslib.resolver import OriginResolver
+
+
+class MemoryBackend:
+    def __init__(self, origins, delay=0):
+        self.origins = set(origins)
+        self.delay = delay
+        self.queries = []
+        self.fail = False
+
+    async def resolve(self, origin):
+        self.queries.append(origin)
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError("backend down")
+        return origin in self.origins
+
+
+def test_resolve_cached():
+    backend = MemoryBackend(["https://tenant.com"])
+    resolver = OriginResolver(backend)
+
+    async def main():
+        assert await resolver.resolve("https://tenant.com")
+        assert await resolver.resolve("https://tenant.com")
+        assert not await resolver.resolve("https://evil.com")
+        assert not await resolver.resolve("https://evil.com")
+
+    asyncio.run(main())
+    assert backend.queries == ["https://tenant.com", "https://evil.com"]
+    assert "https://tenant.com" in resolver
+    assert "https://evil.com" not in resolver
+    assert resolver.cached("https://evil.com") is False
+    assert resolver.cached("https://other.com") is None
+
+
+def test_resolve_single_flight():
+    backend = MemoryBackend(["https://tenant.com"], delay=0.01)
+    resolver = OriginResolver(backend)
+
+    async def main():
+        return await asyncio.gather(
+            *[resolver.resolve("https://tenant.com") for _ in range(20)]
+        )
+
+    assert asyncio.run(main()) == [True] * 20
+    assert backend.queries == ["https://tenant.com"]
+
+
+def test_resolve_separate_ttl(monkeypatch):
+    backend = MemoryBackend(["https://tenant.com"])
+    resolver = OriginResolver(backend, ttl=60, negative_ttl=5)
+    now = [1000.0]
+    monkeypatch.setattr("corslib.cache.time.monotonic", lambda: now[0])
+
+    async def main():
+        await resolver.resolve("https://tenant.com")
+        await resolver.resolve("https://new.com")
+        now[0] += 10
+        backend.origins.add("https://new.com")
+        assert await resolver.resolve("https://tenant.com")
+        assert await resolver.resolve("https://new.com")
+
+    asyncio.run(main())
+    assert backend.queries == [
+        "https://tenant.com",
+        "https://new.com",
+        "https://new.com",
+    ]
+
+
+def test_resolve_error_not_cached():
+    backend = MemoryBackend(["https://tenant.com"], delay=0.01)
+    backend.fail = True
+    resolver = OriginResolver(backend)
+
+    async def main():
+        results = await asyncio.gather(
+            resolver.resolve("https://tenant.com"),
+            resolver.resolve("https://tenant.com"),
+            return_exceptions=True,
+        )
+        assert all(isinstance(r, ConnectionError) for r in results)
+        backend.fail = False
+        return await resolver.resolve("https://tenant.com")
+
+    assert asyncio.run(main())
+    assert len(backend.queries) == 2
+
+
+def test_resolve_caller_cancelled():
+    backend = MemoryBackend(["https://tenant.com"], delay=0.01)
+    resolver = OriginResolver(backend)
+
+    async def main():
+        first = asyncio.ensure_future(resolver.resolve("https://tenant.com"))
+        second = asyncio.ensure_future(resolver.resolve("https://tenant.com"))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main())
+    assert backend.queries == ["https://tenant.com"]
+
+
+def test_policy_consults_resolved_origins():
+    backend = MemoryBackend(["https://tenant.com"])
+    resolver = OriginResolver(backend)
+    policy = Policy(
+        name="tenants",
+        allow_origin=[OriginRule(rule="https://app.com")],
+        origin_allowlist=resolver,
+    )
+    assert policy.response_headers("https://tenant.com") == {}
+    asyncio.run(resolver.resolve("https://tenant.com"))
+    assert policy.response_headers("https://tenant.com") == {
+        "Access-Control-Allow-Origin": "https://tenant.com",
+        "Vary": "Origin",
+    }
+    resolver.clear()
+    assert policy.response_headers("https://tenant.com") == {}
+    assert resolver.cache_info()["positive"].size == 0
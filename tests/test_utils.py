@@ -1,6 +1,6 @@
 import pytest
 
-from corslib.utils import is_request_credentialed
+from corslib.utils import CORSRequest, is_request_credentialed, parse_request_headers
 
 
 @pytest.mark.parametrize(
@@ -31,3 +31,71 @@ def test_credentialed_true(headers):
 )
 def test_credentialed_false(headers):
     assert is_request_credentialed(headers) is False
+
+
+@pytest.mark.parametrize(
+    "headers",
+    [
+        [
+            (b"host", b"example.com"),
+            (b"origin", b"https://app.com"),
+            (b"access-control-request-method", b"PUT"),
+            (b"access-control-request-headers", b"X-Custom"),
+            (b"cookie", b"id=1"),
+            (b"accept", b"*/*"),
+        ],
+        [
+            ("Host", "example.com"),
+            ("ORIGIN", "https://app.com"),
+            ("Access-Control-Request-Method", "PUT"),
+            ("access-control-request-headers", "X-Custom"),
+            ("Authorization", "Basic xxx"),
+            ("X-Custom", "abc"),
+        ],
+    ],
+    ids=["bytes", "str"],
+)
+def test_parse_request_headers(headers):
+    request = parse_request_headers(headers, "OPTIONS")
+
+    def convert(text):
+        return text.encode() if isinstance(headers[0][0], bytes) else text
+
+    assert request == CORSRequest(
+        origin=convert("https://app.com"),
+        request_method=convert("PUT"),
+        request_headers=convert("X-Custom"),
+        credentialed=True,
+        is_preflight=True,
+        host=convert("example.com"),
+    )
+    assert not hasattr(request, "__dict__")
+
+
+def test_parse_request_headers_not_preflight():
+    headers = [(b"origin", b"https://app.com"), (b"origin", b"https://other.com")]
+    assert parse_request_headers(headers, "OPTIONS") == CORSRequest(
+        origin=b"https://other.com"
+    )
+    headers.append((b"access-control-request-method", b"PUT"))
+    assert parse_request_headers(headers, "GET").is_preflight is False
+    assert parse_request_headers([]) == CORSRequest()
+
+
+def test_request_from_environ():
+    environ = {
+        "REQUEST_METHOD": "OPTIONS",
+        "HTTP_ORIGIN": "https://app.com",
+        "HTTP_ACCESS_CONTROL_REQUEST_METHOD": "PUT",
+        "HTTP_COOKIE": "id=1",
+    }
+    request = CORSRequest.from_environ(environ)
+    assert request.origin == "https://app.com"
+    assert request.is_preflight and request.credentialed
+    environ["HTTP_ACCESS_CONTROL_REQUEST_METHOD"] = ""
+    assert CORSRequest.from_environ(environ).is_preflight is False
+
+
+def test_request_from_environ_without_origin():
+    environ = {"REQUEST_METHOD": "OPTIONS", "HTTP_COOKIE": "id=1"}
+    assert CORSRequest.from_environ(environ) == CORSRequest()
@@ -0,0 +1,146 @@
+import pytest
+
+from corslib.policy import OriginRule, Policy
+from corslib.preflight import PreflightResponder
+from corslib.registry import PolicyRegistry
+from corslib.resolver import OriginResolver
+from corslib.wsgi import CORSMiddleware
+
+
+def app(environ, start_response):
+    start_response("200 OK", [("Content-Type", "text/plain")])
+    return [b"app"]
+
+
+class StartResponse:
+    def __call__(self, status, headers, exc_info=None):
+        self.status = status
+        self.headers = headers
+
+
+@pytest.fixture()
+def middleware():
+    policy = Policy(
+        name="policy1",
+        allow_credentials=True,
+        allow_origin=[OriginRule(rule="http://website.com")],
+        allow_methods=["GET", "PUT"],
+        max_age=600,
+    )
+    return CORSMiddleware(app, policy)
+
+
+def test_no_origin(middleware):
+    start_response = StartResponse()
+    body = middleware({"REQUEST_METHOD": "GET"}, start_response)
+    assert body == [b"app"]
+    assert start_response.headers == [("Content-Type", "text/plain")]
+
+
+def test_simple_request(middleware):
+    start_response = StartResponse()
+    environ = {
+        "REQUEST_METHOD": "GET",
+        "HTTP_ORIGIN": "http://website.com",
+        "HTTP_AUTHORIZATION": "Basic xxx",
+    }
+    body = middleware(environ, start_response)
+    assert body == [b"app"]
+    headers = dict(start_response.headers)
+    assert headers["Content-Type"] == "text/plain"
+    assert headers[Policy.ACCESS_CONTROL_ALLOW_ORIGIN] == "http://website.com"
+    assert headers[Policy.ACCESS_CONTROL_ALLOW_CREDENTIALS] == "true"
+
+
+def test_vary_merged(middleware):
+    def vary_app(environ, start_response):
+        start_response("200 OK", [("Vary", "Accept-Encoding")])
+        return [b"app"]
+
+    middleware.app = vary_app
+    start_response = StartResponse()
+    middleware({"HTTP_ORIGIN": "http://website.com"}, start_response)
+    assert start_response.headers[0] == ("Vary", "Accept-Encoding, Origin")
+    assert [name for name, _ in start_response.headers].count("Vary") == 1
+
+
+def test_simple_request_denied(middleware):
+    start_response = StartResponse()
+    environ = {"REQUEST_METHOD": "GET", "HTTP_ORIGIN": "http://other.com"}
+    middleware(environ, start_response)
+    assert start_response.headers == [("Content-Type", "text/plain")]
+
+
+def test_preflight(middleware):
+    start_response = StartResponse()
+    environ = {
+        "REQUEST_METHOD": "OPTIONS",
+        "HTTP_ORIGIN": "http://website.com",
+        "HTTP_ACCESS_CONTROL_REQUEST_METHOD": "PUT",
+    }
+    body = middleware(environ, start_response)
+    assert body == []
+    assert start_response.status == "204 No Content"
+    headers = dict(start_response.headers)
+    assert headers[Policy.ACCESS_CONTROL_ALLOW_METHODS] == "GET, PUT"
+    assert headers[Policy.ACCESS_CONTROL_MAX_AGE] == "600"
+    assert headers[Policy.ACCESS_CONTROL_ALLOW_CREDENTIALS] == "true"
+
+
+def test_preflight_responder(middleware):
+    middleware.preflight = PreflightResponder()
+    environ = {
+        "REQUEST_METHOD": "OPTIONS",
+        "HTTP_ORIGIN": "http://website.com",
+        "HTTP_ACCESS_CONTROL_REQUEST_METHOD": "PUT",
+    }
+    for _ in range(2):
+        start_response = StartResponse()
+        assert middleware(environ, start_response) == []
+        assert start_response.status == "204 No Content"
+        headers = dict(start_response.headers)
+        assert headers["access-control-allow-methods"] == "GET, PUT"
+        assert headers["access-control-max-age"] == "600"
+        assert headers["access-control-allow-credentials"] == "true"
+    assert middleware.preflight.cache_info().hits == 1
+
+
+def test_registry():
+    registry = PolicyRegistry()
+    registry.register(
+        "/api/", Policy(name="api", allow_origin=[OriginRule("http://website.com")])
+    )
+    middleware = CORSMiddleware(app, registry)
+    start_response = StartResponse()
+    environ = {
+        "REQUEST_METHOD": "GET",
+        "PATH_INFO": "/api/users",
+        "HTTP_ORIGIN": "http://website.com",
+    }
+    middleware(environ, start_response)
+    assert Policy.ACCESS_CONTROL_ALLOW_ORIGIN in dict(start_response.headers)
+    environ["PATH_INFO"] = "/static/app.js"
+    middleware(environ, start_response)
+    assert start_response.headers == [("Content-Type", "text/plain")]
+
+
+def test_origin_resolver():
+    class Backend:
+        queries = 0
+
+        async def resolve(self, origin):
+            self.queries += 1
+            return origin == "http://tenant.com"
+
+    backend = Backend()
+    policy = Policy(name="tenants", origin_allowlist=OriginResolver(backend))
+    middleware = CORSMiddleware(app, policy)
+    for _ in range(2):
+        start_response = StartResponse()
+        middleware({"HTTP_ORIGIN": "http://Tenant.com"}, start_response)
+        headers = dict(start_response.headers)
+        assert headers[Policy.ACCESS_CONTROL_ALLOW_ORIGIN] == "http://Tenant.com"
+    assert backend.queries == 1
+    start_response = StartResponse()
+    middleware({"HTTP_ORIGIN": "http://other.com"}, start_response)
+    assert start_response.headers == [("Content-Type", "text/plain")]